@@ -1,15 +1,54 @@
 import os
+import asyncio
+import threading
+import weakref
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
-from typing import Iterator
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Tuple
+
+from app.core.metrics.metrics import instrument_engine
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 
 # Retrieve the database URL from environment variables.
 DB_URL: str = os.getenv("DB_URL", "")
 if not DB_URL:
     raise EnvironmentError("DB_URL environment variable is not set.")
 
+# Async drivers used for each database backend by the async engine.
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """
+    Returns the connection pool settings for an engine on `url`, from environment variables:
+      - DB_POOL_SIZE (default 5): connections kept open in the pool.
+      - DB_MAX_OVERFLOW (default 10): connections opened on top of the pool under load.
+      - DB_POOL_TIMEOUT (default 30): seconds to wait for a free connection.
+      - DB_POOL_PRE_PING (default false): test connections before use, so that connections
+        dropped by the server or a proxy are replaced instead of failing a query.
+      - DB_POOL_RECYCLE (default -1, never): seconds after which connections are replaced.
+
+    SQLite picks its own pool class, so the size settings are not applied to it.
+    """
+    options: Dict[str, Any] = {
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes"),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "-1")),
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        )
+    return options
+
 # Initialize the SQLAlchemy engine using the provided DB_URL.
-engine = create_engine(DB_URL, echo=False)
+engine = create_engine(DB_URL, echo=False, **engine_options(DB_URL))
+
+# Record statement latencies for the /metrics endpoint.
+instrument_engine(engine)
 
 # Create a configured "SessionLocal" class.
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
@@ -17,6 +56,10 @@ SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 # Create a Base class for declarative class definitions.
 Base = declarative_base()
 
+# Async engine and session factory of each event loop (see AsyncSessionLocal).
+_async_engines: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[AsyncEngine, async_sessionmaker[AsyncSession]]]" = weakref.WeakKeyDictionary()
+_async_lock = threading.Lock()
+
 def get_session() -> Iterator[Session]:
     """
     Creates a new SQLAlchemy Session, yields it for use in database interactions,
@@ -27,3 +70,54 @@ def get_session() -> Iterator[Session]:
         yield session
     finally:
         session.close()
+
+def async_database_url(url: str) -> str:
+    """
+    Returns DB_ASYNC_URL if set, and otherwise `url` with its driver replaced by the async
+    driver of its backend (asyncpg for PostgreSQL, aiosqlite for SQLite).
+
+    Raises:
+        ValueError: If the backend has no supported async driver.
+    """
+    if os.getenv("DB_ASYNC_URL"):
+        return os.environ["DB_ASYNC_URL"]
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver is configured for the '{backend}' database backend; set DB_ASYNC_URL.")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def AsyncSessionLocal() -> "AsyncSession":
+    """
+    Creates a new AsyncSession, for use as `async with AsyncSessionLocal() as session` on an
+    event loop. Returned objects stay loaded after commit.
+
+    The connections of asyncpg and aiosqlite belong to the event loop that opened them, so
+    each loop gets its own async engine on the same database as `engine`, created on first
+    use with the same pool settings and closed by dispose_async_engine. The async driver (and
+    SQLAlchemy's asyncio extension) is only imported once this is called.
+
+    Raises:
+        RuntimeError: If no event loop is running.
+    """
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        if loop not in _async_engines:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            url = async_database_url(DB_URL)
+            async_engine = create_async_engine(url, echo=False, **engine_options(url))
+            instrument_engine(async_engine.sync_engine)
+            _async_engines[loop] = (async_engine, async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False))
+        session_factory = _async_engines[loop][1]
+    return session_factory()
+
+async def dispose_async_engine() -> None:
+    """
+    Closes the async engine of the running event loop, if AsyncSessionLocal created one.
+    Must be awaited before the loop is closed, e.g. at the end of the coroutine passed to asyncio.run.
+    """
+    with _async_lock:
+        engine_and_factory = _async_engines.pop(asyncio.get_running_loop(), None)
+    if engine_and_factory is not None:
+        await engine_and_factory[0].dispose()
@@ -1,12 +1,22 @@
 import os
-from typing import Dict
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
+import time
+import datetime
+from typing import TYPE_CHECKING, Dict, Tuple
 
-# OAuth token endpoint for Google
-GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
+from app.core.token_cache.token_cache import token_cache
+from app.core.http_client.http_client import get_http_session
+from app.core.metrics.metrics import http_timer
 
-def get_google_oauth_credentials() -> Credentials:
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
+# OAuth token endpoint for Google (overridable, e.g. to point benchmarks at a local stand-in)
+GOOGLE_TOKEN_URI = os.getenv("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token")
+
+# Key of the Google access token in the shared token cache.
+GOOGLE_TOKEN_CACHE_KEY = "google"
+
+def get_google_oauth_credentials() -> "Credentials":
     """
     Obtains Google OAuth credentials by using environment variables:
       - OAUTH_CLIENT_ID
@@ -14,7 +24,8 @@ def get_google_oauth_credentials() -> Credentials:
       - OAUTH_REFRESH_TOKEN
 
     Creates a Credentials object with no initial access token and refreshes it immediately,
-    returning valid credentials with an access token.
+    returning valid credentials with an access token. google-auth is imported on first use
+    to keep it out of the service's startup path.
     
     Returns:
         A google.oauth2.credentials.Credentials instance with a valid access token.
@@ -23,6 +34,9 @@ def get_google_oauth_credentials() -> Credentials:
         EnvironmentError: If one or more required environment variables are not set.
         google.auth.exceptions.RefreshError: If the token refresh operation fails.
     """
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
+
     client_id = os.getenv("OAUTH_CLIENT_ID")
     client_secret = os.getenv("OAUTH_CLIENT_SECRET")
     refresh_token = os.getenv("OAUTH_REFRESH_TOKEN")
@@ -39,13 +53,29 @@ def get_google_oauth_credentials() -> Credentials:
         client_secret=client_secret
     )
     
-    # Refresh the access token using a Request
-    creds.refresh(Request())
+    # Refresh the access token using a Request over the shared HTTP session
+    with http_timer("google_oauth", "token") as outcome:
+        creds.refresh(Request(session=get_http_session()))
+        outcome["status"] = 200
     return creds
 
+def _fetch_access_token() -> Tuple[str, float]:
+    """
+    Refreshes Google OAuth credentials and returns the access token with its expiry
+    as a Unix timestamp, as expected by the token cache.
+    """
+    creds = get_google_oauth_credentials()
+    if creds.expiry is None:
+        return creds.token, time.time() + 3600
+    # google-auth reports expiry as a naive UTC datetime.
+    return creds.token, creds.expiry.replace(tzinfo=datetime.timezone.utc).timestamp()
+
 def get_access_token() -> str:
     """
     Obtains a valid Google OAuth access token.
+
+    The token is served from the process-wide token cache and only refreshed
+    when it is close to expiring.
     
     Returns:
         The access token as a string.
@@ -54,8 +84,7 @@ def get_access_token() -> str:
         EnvironmentError: If required environment variables are missing.
         google.auth.exceptions.RefreshError: If token refresh fails.
     """
-    creds = get_google_oauth_credentials()
-    return creds.token
+    return token_cache.get(GOOGLE_TOKEN_CACHE_KEY, _fetch_access_token)
 
 def get_google_auth_headers() -> Dict[str, str]:
     """
@@ -0,0 +1,129 @@
+import os
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Optional, Tuple, Type
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+# requests and httpx are imported on first use, to keep them out of the service's startup path.
+_session: Optional["requests.Session"] = None
+_http2_client: Any = None
+_http_errors: Optional[Tuple[Type[Exception], ...]] = None
+_lock = threading.Lock()
+
+# Exceptions raised by post() for failed requests and error responses: requests.RequestException,
+# and httpx.HTTPError when httpx is installed. Declared here for type checkers; the value is
+# resolved by __getattr__ on first access, so that importing this module does not import the clients.
+HTTP_ERRORS: Tuple[Type[Exception], ...]
+
+
+def _httpx() -> Any:
+    try:
+        import httpx
+    except ImportError:  # HTTP/2 support is optional.
+        return None
+    return httpx
+
+
+def __getattr__(name: str) -> Tuple[Type[Exception], ...]:
+    # Only called for HTTP_ERRORS, which is declared above but not assigned.
+    global _http_errors
+    if name != "HTTP_ERRORS":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _http_errors is None:
+        import requests
+
+        httpx = _httpx()
+        _http_errors = (requests.RequestException,) + ((httpx.HTTPError,) if httpx else ())
+    return _http_errors
+
+
+def get_timeout() -> Tuple[float, float]:
+    """
+    Returns the (connect, read) timeout in seconds for outbound calls, from
+    HTTP_CONNECT_TIMEOUT_SECONDS (default 10) and HTTP_READ_TIMEOUT_SECONDS (default 120).
+    """
+    return (
+        float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10")),
+        float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "120")),
+    )
+
+
+def get_http_session() -> "requests.Session":
+    """
+    Returns the process-wide requests Session shared by all outbound integrations.
+
+    Connections are kept alive and reused across calls and pipeline runs. Each host gets a pool
+    of up to HTTP_POOL_MAXSIZE connections (default 16), and up to HTTP_POOL_CONNECTIONS hosts
+    (default 10) keep pools.
+
+    Returns:
+        The shared requests.Session.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                adapter = HTTPAdapter(
+                    pool_connections=int(os.getenv("HTTP_POOL_CONNECTIONS", "10")),
+                    pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", "16")),
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _get_http2_client() -> Any:
+    """
+    Returns the process-wide HTTP/2 httpx client, or None if HTTP_ENABLE_HTTP2 is not set.
+
+    Raises:
+        ImportError: If HTTP/2 is enabled but httpx with the h2 extra is not installed.
+    """
+    global _http2_client
+    if os.getenv("HTTP_ENABLE_HTTP2", "false").lower() not in ("1", "true", "yes"):
+        return None
+    if _http2_client is None:
+        with _lock:
+            if _http2_client is None:
+                httpx = _httpx()
+                if httpx is None:
+                    raise ImportError("HTTP_ENABLE_HTTP2 requires the 'httpx[http2]' package.")
+                connect_timeout, read_timeout = get_timeout()
+                max_connections = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+                _http2_client = httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                )
+    return _http2_client
+
+
+def post(url: str, **kwargs: Any) -> Any:
+    """
+    Sends a POST request over the shared connection pool.
+
+    Uses the HTTP/2 client when HTTP_ENABLE_HTTP2 is set and the pooled requests Session otherwise.
+    Both return responses with status_code, text, json() and raise_for_status().
+
+    Args:
+        url: The URL to post to.
+        **kwargs: Passed to the client's post method (headers, json, data, ...).
+            The default timeout applies unless one is given.
+
+    Returns:
+        The response.
+    """
+    client = _get_http2_client()
+    if client is not None:
+        return client.post(url, **kwargs)
+    kwargs.setdefault("timeout", get_timeout())
+    return get_http_session().post(url, **kwargs)
@@ -0,0 +1,188 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from prometheus_client.core import REGISTRY, CounterMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# Kinds of user identifiers that can be hashed.
+EMAIL = "email"
+PHONE = "phone"
+
+# Domains whose mailboxes ignore dots in the local part.
+_GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+
+_NON_DIGITS = re.compile(r"\D")
+
+# An identifier to hash: its kind and raw value.
+Identifier = Tuple[str, str]
+
+
+def normalize_email(value: str) -> Optional[str]:
+    """
+    Normalizes an email address as Google Ads expects before hashing: surrounding whitespace
+    removed, lowercased, and dots removed from the local part of gmail.com and googlemail.com
+    addresses.
+
+    Returns:
+        The normalized address, or None if the value is not an email address.
+    """
+    email = value.strip().lower()
+    local_part, at, domain = email.rpartition("@")
+    if not (at and local_part and domain) or " " in email:
+        return None
+    if domain in _GMAIL_DOMAINS:
+        local_part = local_part.replace(".", "")
+    return f"{local_part}@{domain}"
+
+
+def normalize_phone(value: str, default_country_code: str = "1") -> Optional[str]:
+    """
+    Normalizes a phone number to E.164 (e.g. "+15125550123") as Google Ads expects before
+    hashing. Numbers written without an international prefix ("+" or "00") are taken to be in
+    the country of `default_country_code`, with any trunk prefix "0" dropped.
+
+    Returns:
+        The normalized number, or None if it does not have between 8 and 15 digits.
+    """
+    stripped = value.strip()
+    digits = _NON_DIGITS.sub("", stripped)
+    if stripped.startswith("+"):
+        number = digits
+    elif digits.startswith("00"):
+        number = digits[2:]
+    elif digits.startswith(default_country_code) and len(digits) > 10:
+        number = digits
+    else:
+        number = default_country_code + digits.lstrip("0")
+    if not 8 <= len(number) <= 15:
+        return None
+    return "+" + number
+
+
+def normalize_and_hash(identifier: Identifier, default_country_code: str = "1") -> Optional[str]:
+    """
+    Returns the hex SHA-256 digest of a normalized identifier, or None if it cannot be normalized.
+    """
+    kind, value = identifier
+    normalized = normalize_email(value) if kind == EMAIL else normalize_phone(value, default_country_code)
+    if normalized is None:
+        return None
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def hash_batch(identifiers: Sequence[Identifier], default_country_code: str = "1") -> List[Optional[str]]:
+    """
+    Normalizes and hashes a batch of identifiers; run in the worker processes of the pool.
+    """
+    return [normalize_and_hash(identifier, default_country_code) for identifier in identifiers]
+
+
+class IdentifierHasher:
+    """
+    Normalizes and SHA-256-hashes user identifiers (email addresses and phone numbers) for
+    enhanced conversions, in batches.
+
+    Hashes are memoized in a bounded in-process cache, so an identifier that comes back in
+    later batches or runs is only hashed once; when the cache holds `cache_size` entries, the
+    least recently used are evicted. Batches with at least `pool_threshold` identifiers not in the cache
+    are split over a process pool of `max_processes` workers, started on first use and kept
+    for the life of the process. The workers are spawned rather than forked, since the service
+    runs threads (and gRPC channels) that must not be copied into a child.
+    """
+
+    def __init__(self, cache_size: int, pool_threshold: int, max_processes: int, default_country_code: str) -> None:
+        self.cache_size = cache_size
+        self.pool_threshold = pool_threshold
+        self.max_processes = max_processes
+        self.default_country_code = default_country_code
+        self._cache: "OrderedDict[Identifier, Optional[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "pooled": 0}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_processes, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _hash_misses(self, misses: List[Identifier]) -> List[Optional[str]]:
+        if len(misses) < self.pool_threshold or self.max_processes < 2:
+            return hash_batch(misses, self.default_country_code)
+
+        batch_size = -(-len(misses) // self.max_processes)
+        batches = [misses[start:start + batch_size] for start in range(0, len(misses), batch_size)]
+        futures = [self._executor().submit(hash_batch, batch, self.default_country_code) for batch in batches]
+        with self._lock:
+            self._stats["pooled"] += len(misses)
+        return [digest for future in futures for digest in future.result()]
+
+    def hash_all(self, identifiers: Sequence[Identifier]) -> Dict[Identifier, Optional[str]]:
+        """
+        Returns the hash of every given identifier (None for values that cannot be normalized).
+
+        Args:
+            identifiers: The identifiers to hash; duplicates are hashed once.
+
+        Returns:
+            A dictionary of identifier to hex SHA-256 digest.
+        """
+        unique = set(identifiers)
+        digests: Dict[Identifier, Optional[str]] = {}
+        with self._lock:
+            for identifier in unique:
+                if identifier in self._cache:
+                    digests[identifier] = self._cache[identifier]
+                    self._cache.move_to_end(identifier)
+            self._stats["hits"] += len(digests)
+            self._stats["misses"] += len(unique) - len(digests)
+        misses = [identifier for identifier in unique if identifier not in digests]
+        if not misses:
+            return digests
+
+        hashed = dict(zip(misses, self._hash_misses(misses)))
+        digests.update(hashed)
+        with self._lock:
+            self._cache.update(hashed)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return digests
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns counters for cache hits, cache misses and identifiers hashed in the process pool.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+# Shared hasher used by all pipeline runs in this process.
+identifier_hasher = IdentifierHasher(
+    cache_size=int(os.getenv("ENHANCED_CONVERSIONS_CACHE_SIZE", "200000")),
+    pool_threshold=int(os.getenv("ENHANCED_CONVERSIONS_POOL_THRESHOLD", "50000")),
+    max_processes=int(os.getenv("ENHANCED_CONVERSIONS_MAX_PROCESSES", "0")) or os.cpu_count() or 1,
+    default_country_code=os.getenv("ENHANCED_CONVERSIONS_DEFAULT_COUNTRY_CODE", "1"),
+)
+
+
+class _IdentifierHasherCollector:
+    """
+    Exposes the shared hasher counters on /metrics as identifier_hashing_events_total{event}.
+    """
+
+    def collect(self) -> Iterator[CounterMetricFamily]:
+        family = CounterMetricFamily("identifier_hashing_events", "User identifier hash cache hits, misses and identifiers hashed in the process pool.", labels=["event"])
+        for name, value in identifier_hasher.stats().items():
+            family.add_metric([name], value)
+        yield family
+
+
+REGISTRY.register(_IdentifierHasherCollector())
@@ -0,0 +1,204 @@
+import io
+import os
+import time
+import pstats
+import logging
+import cProfile
+import threading
+import datetime
+import tempfile
+from contextlib import contextmanager
+from functools import wraps
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_RUNS = Counter(
+    "pipeline_runs_total", "Pipeline runs by outcome.", ["status"]
+)
+PIPELINE_STAGE_DURATION = Histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each pipeline stage.", ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+PIPELINE_STAGE_RECORDS = Counter(
+    "pipeline_stage_records_total", "Records processed by each pipeline stage.", ["stage"]
+)
+HTTP_CLIENT_DURATION = Histogram(
+    "http_client_request_duration_seconds", "Latency of outbound HTTP calls.", ["service", "operation", "status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Latency of database statements.", ["statement"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+T = TypeVar("T")
+
+# Stage timings of the pipeline run executing in the current context, if any.
+_run_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("run_timings", default=None)
+# The upload targets of a run time their stages on several threads into the same timings.
+_run_timings_lock = threading.Lock()
+
+# Profiles of the worker threads of the run profiled in the current context, if any.
+_run_profiles: ContextVar[Optional[List[cProfile.Profile]]] = ContextVar("run_profiles", default=None)
+_run_profiles_lock = threading.Lock()
+# cProfile allows one active profiler per thread; set while one is enabled on this thread.
+_thread_profiling = threading.local()
+
+
+@contextmanager
+def collect_stage_timings() -> Iterator[Dict[str, float]]:
+    """
+    Collects the total time per stage of everything timed with stage_timer in this context.
+
+    Yields:
+        A dictionary of stage name to accumulated seconds, filled in as stages complete.
+    """
+    timings: Dict[str, float] = {}
+    token = _run_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _run_timings.reset(token)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """
+    Times a pipeline stage into pipeline_stage_duration_seconds and the current run's timings.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        PIPELINE_STAGE_DURATION.labels(stage).observe(elapsed)
+        timings = _run_timings.get()
+        if timings is not None:
+            with _run_timings_lock:
+                timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def record_stage_records(stage: str, count: int) -> None:
+    """
+    Counts records processed by a pipeline stage, from which throughput is derived.
+    """
+    PIPELINE_STAGE_RECORDS.labels(stage).inc(count)
+
+
+@contextmanager
+def http_timer(service: str, operation: str) -> Iterator[Dict[str, Any]]:
+    """
+    Times an outbound HTTP call into http_client_request_duration_seconds.
+
+    Yields:
+        A dictionary in which the caller sets "status" to the response status code;
+        calls that raise before setting it are recorded with status "error".
+    """
+    outcome: Dict[str, Any] = {"status": "error"}
+    start = time.perf_counter()
+    try:
+        yield outcome
+    finally:
+        HTTP_CLIENT_DURATION.labels(service, operation, str(outcome["status"])).observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Records the duration of every statement executed by `engine` into db_query_duration_seconds,
+    labelled by statement type (SELECT, INSERT, ...).
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_times"].pop()
+        statement_type = statement.lstrip().split(" ", 1)[0].upper()
+        DB_QUERY_DURATION.labels(statement_type).observe(elapsed)
+
+
+@contextmanager
+def capture_profile(enabled: bool, name: str) -> Iterator[Optional[str]]:
+    """
+    Profiles the enclosed block with cProfile when `enabled`.
+
+    The stats are written to PIPELINE_PROFILE_DIR (default: the system temp directory)
+    and the top functions by cumulative time are logged. The calling thread is profiled, and
+    so are the worker threads running functions wrapped with profiled(); their stats are
+    merged into the same profile.
+
+    Yields:
+        The path the profile will be written to, or None when profiling is disabled.
+    """
+    if not enabled:
+        yield None
+        return
+
+    profile_dir = os.getenv("PIPELINE_PROFILE_DIR", tempfile.gettempdir())
+    os.makedirs(profile_dir, exist_ok=True)
+    path = os.path.join(profile_dir, f"{name}-{datetime.datetime.utcnow():%Y%m%dT%H%M%S}.prof")
+
+    worker_profiles: List[cProfile.Profile] = []
+    token = _run_profiles.set(worker_profiles)
+    profiler = cProfile.Profile()
+    _thread_profiling.active = True
+    profiler.enable()
+    try:
+        yield path
+    finally:
+        profiler.disable()
+        _thread_profiling.active = False
+        _run_profiles.reset(token)
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        with _run_profiles_lock:
+            for worker_profile in worker_profiles:
+                stats.add(worker_profile)
+        stats.dump_stats(path)
+        stats.sort_stats("cumulative").print_stats(25)
+        logger.info(f"Profile written to {path} ({len(worker_profiles)} worker thread profile(s) merged).\n{summary.getvalue()}")
+
+
+def profiled(function: Callable[..., T]) -> Callable[..., T]:
+    """
+    Wraps a function that runs on a worker thread, in a copy of the context of a pipeline run,
+    so that its calls are added to the run's profile while capture_profile is profiling it.
+    Calls made outside a profiled run, or on a thread that is already being profiled, run as is.
+    """
+    @wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        worker_profiles = _run_profiles.get()
+        if worker_profiles is None or getattr(_thread_profiling, "active", False):
+            return function(*args, **kwargs)
+        profiler = cProfile.Profile()
+        _thread_profiling.active = True
+        profiler.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.disable()
+            _thread_profiling.active = False
+            with _run_profiles_lock:
+                worker_profiles.append(profiler)
+
+    return wrapper
+
+
+def metrics_payload() -> bytes:
+    """
+    Returns all metrics in the Prometheus text exposition format.
+    """
+    return generate_latest()
+
+
+# Content type of metrics_payload().
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
@@ -0,0 +1,158 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate adapts to throttling by the remote API (AIMD).
+
+    Callers take a token with acquire() before each request; tokens refill at `rate` per
+    second, up to one second's worth. Every successful request raises the rate additively
+    by `increase` (up to `max_rate`), and a throttled request cuts it multiplicatively by
+    `decrease_factor` (down to `min_rate`). The rate thus probes upwards until the remote
+    quota pushes back, and then settles just under it.
+
+    A throttling response only cuts the rate once per round: responses to requests that
+    were sent before the last cut are not counted again, so a burst of concurrent 429s
+    does not collapse the rate. When the API says how long to back off (Retry-After), no
+    token is handed out until then.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        increase: float,
+        decrease_factor: float,
+    ) -> None:
+        self.name = name
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self._tokens = 1.0
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease_at = float("-inf")
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"requests": 0, "throttled": 0, "decreases": 0}
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._tokens + (now - self._updated_at) * self.rate, max(1.0, self.rate))
+        self._updated_at = now
+
+    def acquire(self) -> float:
+        """
+        Blocks until a request may be sent.
+
+        Returns:
+            The time the token was taken (time.monotonic()), to be passed to record_throttle
+            if the request is throttled.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self._stats["requests"] += 1
+                    return now
+                else:
+                    wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def record_success(self) -> None:
+        """
+        Raises the rate additively after a request that was not throttled.
+        """
+        with self._lock:
+            self.rate = min(self.rate + self.increase, self.max_rate)
+
+    def record_throttle(self, sent_at: float, retry_after: Optional[float] = None) -> None:
+        """
+        Cuts the rate multiplicatively after a throttled request, and pauses the bucket for
+        `retry_after` seconds if given.
+
+        Args:
+            sent_at: The value acquire() returned for the throttled request.
+            retry_after: How long the API asked clients to wait, in seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._stats["throttled"] += 1
+            if sent_at >= self._last_decrease_at:
+                self._refill(now)
+                self.rate = max(self.rate * self.decrease_factor, self.min_rate)
+                self._tokens = min(self._tokens, 0.0)
+                self._last_decrease_at = now
+                self._stats["decreases"] += 1
+                logger.warning(f"Rate limiter '{self.name}' throttled; rate lowered to {self.rate:.2f} requests/s.")
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns counters for requests let through, throttled responses and rate decreases.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+class RateLimiterRegistry:
+    """
+    Process-wide rate limiters, one per key (e.g. per Google Ads customer), shared by all
+    threads and pipeline runs so that concurrent uploads draw on the same budget.
+    """
+
+    def __init__(self) -> None:
+        self._limiters: Dict[str, AdaptiveRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, create: Callable[[], AdaptiveRateLimiter]) -> AdaptiveRateLimiter:
+        """
+        Returns the limiter for `key`, creating it with `create` on first use.
+        """
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = create()
+            return limiter
+
+    def all(self) -> Dict[str, AdaptiveRateLimiter]:
+        with self._lock:
+            return dict(self._limiters)
+
+
+# Shared limiters used by all integrations in this process.
+rate_limiters = RateLimiterRegistry()
+
+
+class _RateLimiterCollector:
+    """
+    Exposes the current rate of each shared rate limiter on /metrics as
+    rate_limiter_requests_per_second{limiter}, and its counters as rate_limiter_events_total{limiter,event}.
+    """
+
+    def collect(self) -> Iterator[Any]:
+        rates = GaugeMetricFamily("rate_limiter_requests_per_second", "Current request rate allowed by each rate limiter.", labels=["limiter"])
+        events = CounterMetricFamily("rate_limiter_events", "Requests, throttled responses and rate decreases per rate limiter.", labels=["limiter", "event"])
+        for name, limiter in rate_limiters.all().items():
+            rates.add_metric([name], limiter.rate)
+            for event, value in limiter.stats().items():
+                events.add_metric([name, event], value)
+        yield rates
+        yield events
+
+
+REGISTRY.register(_RateLimiterCollector())
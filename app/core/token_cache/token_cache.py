@@ -0,0 +1,132 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from prometheus_client.core import REGISTRY, CounterMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# A fetch function returns the token value and its absolute expiry as a Unix timestamp.
+TokenFetcher = Callable[[], Tuple[Any, float]]
+
+
+class TokenCache:
+    """
+    Process-wide cache for OAuth access tokens.
+
+    Tokens are served from memory until `expiry_margin` seconds before they expire.
+    Once a token is within `refresh_window` seconds of expiring, it is still served but a
+    background refresh is started so callers rarely wait on the identity provider.
+    Refreshes are single-flight per key: concurrent callers never fetch the same token twice.
+    """
+
+    def __init__(self, expiry_margin: float = 60.0, refresh_window: float = 300.0) -> None:
+        self.expiry_margin = expiry_margin
+        self.refresh_window = refresh_window
+        self._tokens: Dict[str, Tuple[Any, float]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "background_refreshes": 0, "refresh_errors": 0}
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _count(self, stat: str) -> None:
+        with self._guard:
+            self._stats[stat] += 1
+
+    def _valid(self, key: str, now: float) -> Optional[Tuple[Any, float]]:
+        entry = self._tokens.get(key)
+        if entry and now < entry[1] - self.expiry_margin:
+            return entry
+        return None
+
+    def _background_refresh(self, key: str, fetch: TokenFetcher) -> None:
+        lock = self._lock_for(key)
+        # Another refresh for this key is already running.
+        if not lock.acquire(blocking=False):
+            return
+
+        def refresh() -> None:
+            try:
+                self._tokens[key] = fetch()
+                self._count("background_refreshes")
+            except Exception as exc:
+                # The current token is still valid; the next caller will retry.
+                self._count("refresh_errors")
+                logger.warning(f"Background refresh of token '{key}' failed: {exc}")
+            finally:
+                lock.release()
+
+        threading.Thread(target=refresh, name=f"token-refresh-{key}", daemon=True).start()
+
+    def get(self, key: str, fetch: TokenFetcher) -> Any:
+        """
+        Returns the cached token for `key`, fetching it with `fetch` if missing or expired.
+
+        Args:
+            key: Name of the token, e.g. "google" or "salesforce".
+            fetch: Function returning (token, expires_at) from the identity provider.
+
+        Returns:
+            The token value.
+
+        Raises:
+            Any exception raised by `fetch` when no valid token is cached.
+        """
+        now = time.time()
+        entry = self._valid(key, now)
+        if entry:
+            self._count("hits")
+            if now >= entry[1] - self.refresh_window:
+                self._background_refresh(key, fetch)
+            return entry[0]
+
+        with self._lock_for(key):
+            # The token may have been refreshed while waiting for the lock.
+            entry = self._valid(key, time.time())
+            if entry:
+                self._count("hits")
+                return entry[0]
+            self._count("misses")
+            logger.debug(f"Token cache miss for '{key}', fetching a new token.")
+            self._tokens[key] = fetch()
+            return self._tokens[key][0]
+
+    def invalidate(self, key: str) -> None:
+        """
+        Drops the cached token for `key`, e.g. after the provider rejected it.
+        """
+        self._tokens.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns counters for cache hits, misses, background refreshes and refresh errors.
+        """
+        with self._guard:
+            return dict(self._stats)
+
+
+# Shared cache used by all integrations in this process.
+token_cache = TokenCache(
+    expiry_margin=float(os.getenv("TOKEN_CACHE_EXPIRY_MARGIN_SECONDS", "60")),
+    refresh_window=float(os.getenv("TOKEN_CACHE_REFRESH_WINDOW_SECONDS", "300")),
+)
+
+
+class _TokenCacheCollector:
+    """
+    Exposes the shared token cache counters on /metrics as token_cache_events_total{event}.
+    """
+
+    def collect(self) -> Iterator[CounterMetricFamily]:
+        family = CounterMetricFamily("token_cache_events", "OAuth token cache hits, misses and refreshes.", labels=["event"])
+        for name, value in token_cache.stats().items():
+            family.add_metric([name], value)
+        yield family
+
+
+REGISTRY.register(_TokenCacheCollector())
@@ -4,26 +4,43 @@ from dotenv import load_dotenv
 # Load environment variables before any other import
 load_dotenv()
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.database.sql_adaptor import Base, engine
+from app.core.metrics.metrics import METRICS_CONTENT_TYPE, metrics_payload
 from app.pipeline.pipeline_endpoint import router as pipeline_router
-from typing import Any
+from app.pipeline.pipeline_scheduler import pipeline_scheduler, scheduler_enabled
+from app.pipeline.upload_status_endpoint import router as upload_status_router
+from typing import Any, AsyncIterator
 
 def create_app() -> FastAPI:
     """
     Creates and configures the FastAPI application.
 
     Steps:
-      1. Initializes the FastAPI app.
+      1. Initializes the FastAPI app, starting the pipeline scheduler on startup when
+         PIPELINE_SCHEDULER_ENABLED is set and stopping it on shutdown.
       2. Configures CORS middleware to allow all origins, credentials, methods, and headers.
-      3. Includes the pipeline router.
-      4. Calls Base.metadata.create_all(engine) to create all database tables.
+      3. Includes the pipeline and upload status routers.
+      4. Adds the /metrics route exposing Prometheus metrics.
+      5. When DB_CREATE_ALL is set, calls Base.metadata.create_all(engine) to create missing
+         tables (for local development). Otherwise the schema is managed by the Alembic
+         migrations (`alembic upgrade head`), which keeps startup free of database round trips.
 
     Returns:
         A configured FastAPI application instance.
     """
-    app: FastAPI = FastAPI()
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        if scheduler_enabled():
+            pipeline_scheduler.start()
+        try:
+            yield
+        finally:
+            pipeline_scheduler.stop()
+
+    app: FastAPI = FastAPI(lifespan=lifespan)
 
     # Configure CORS middleware with all origins allowed.
     app.add_middleware(
@@ -34,11 +51,18 @@ def create_app() -> FastAPI:
         allow_headers=["*"]
     )
 
-    # Include the pipeline router.
+    # Include the pipeline and upload status routers.
     app.include_router(pipeline_router)
+    app.include_router(upload_status_router)
+
+    # Expose pipeline, HTTP client and database metrics in Prometheus format.
+    @app.get("/metrics", include_in_schema=False)
+    def metrics() -> Response:
+        return Response(content=metrics_payload(), media_type=METRICS_CONTENT_TYPE)
 
-    # Create all tables defined in the SQLAlchemy models.
-    Base.metadata.create_all(bind=engine)
+    # Create all tables defined in the SQLAlchemy models, for development databases only.
+    if os.getenv("DB_CREATE_ALL", "false").lower() in ("1", "true", "yes"):
+        Base.metadata.create_all(bind=engine)
 
     return app
 
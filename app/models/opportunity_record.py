@@ -0,0 +1,113 @@
+import datetime
+from typing import Any, Dict, Iterable, Optional
+
+def parse_salesforce_datetime(value: Optional[str]) -> Optional[datetime.datetime]:
+    """
+    Parses a Salesforce datetime (e.g. "2024-01-31T10:15:00.000+0000") or date (e.g. "2024-01-31")
+    string into a timezone-aware UTC datetime. Returns None for empty values.
+    """
+    if not value:
+        return None
+    if len(value) == 10:
+        return datetime.datetime.fromisoformat(value).replace(tzinfo=datetime.timezone.utc)
+    parsed = datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z")
+    return parsed.astimezone(datetime.timezone.utc)
+
+def salesforce_field_value(record: Dict[str, Any], path: str) -> Any:
+    """
+    Returns the value of a field of a raw Salesforce record, following dotted relationship
+    paths such as "Account.Region__c". Missing relationships give None. Flat records, such as
+    Bulk API CSV rows, hold relationship fields under their dotted names.
+    """
+    if path in record:
+        return record[path]
+    value: Any = record
+    for name in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+def _as_filter_value(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+class OpportunityRecord:
+    """
+    Compact representation of a Salesforce Opportunity passed between pipeline stages.
+
+    Only the fields used by the pipeline are kept, and datetimes are parsed once into
+    timezone-aware UTC datetimes when the record is read from Salesforce. Additional fields
+    needed to route the record to upload targets are kept as strings in `fields`.
+
+    For enhanced conversions, the record also carries the raw email address and phone number
+    read from Salesforce, and their normalized SHA-256 hashes once the pipeline has computed
+    them (see enhanced_conversions.hash_user_identifiers). Only the hashes are stored or uploaded.
+    """
+
+    __slots__ = (
+        "salesforce_id", "gclid", "original_lead_created_datetime", "admission_date", "system_modstamp", "fields",
+        "email", "phone", "hashed_email", "hashed_phone",
+    )
+
+    def __init__(
+        self,
+        salesforce_id: str,
+        gclid: Optional[str],
+        original_lead_created_datetime: Optional[datetime.datetime],
+        admission_date: Optional[datetime.datetime],
+        system_modstamp: Optional[datetime.datetime] = None,
+        fields: Optional[Dict[str, Optional[str]]] = None,
+        email: Optional[str] = None,
+        phone: Optional[str] = None,
+        hashed_email: Optional[str] = None,
+        hashed_phone: Optional[str] = None,
+    ) -> None:
+        self.salesforce_id = salesforce_id
+        self.gclid = gclid
+        self.original_lead_created_datetime = original_lead_created_datetime
+        self.admission_date = admission_date
+        self.system_modstamp = system_modstamp
+        self.fields = fields
+        self.email = email
+        self.phone = phone
+        self.hashed_email = hashed_email
+        self.hashed_phone = hashed_phone
+
+    def field(self, name: str) -> Optional[str]:
+        """
+        Returns an additional field read from Salesforce, or None if it was not queried or is empty.
+        """
+        return self.fields.get(name) if self.fields else None
+
+    @classmethod
+    def from_salesforce(
+        cls,
+        record: Dict[str, Any],
+        extra_fields: Iterable[str] = (),
+        email_field: Optional[str] = None,
+        phone_field: Optional[str] = None,
+    ) -> "OpportunityRecord":
+        """
+        Builds a record from an Opportunity returned by the Salesforce API, keeping
+        the `extra_fields` (dotted paths allowed) in addition to the pipeline fields, and the
+        email address and phone number from `email_field` and `phone_field` when given.
+        """
+        return cls(
+            salesforce_id=record["Id"],
+            gclid=record.get("GCLID__c"),
+            original_lead_created_datetime=parse_salesforce_datetime(record.get("Original_Lead_Created_Date_Time__c")),
+            admission_date=parse_salesforce_datetime(record.get("Admission_Date__c")),
+            system_modstamp=parse_salesforce_datetime(record.get("SystemModstamp")),
+            fields={name: _as_filter_value(salesforce_field_value(record, name)) for name in extra_fields} or None,
+            email=(salesforce_field_value(record, email_field) or None) if email_field else None,
+            phone=(salesforce_field_value(record, phone_field) or None) if phone_field else None,
+        )
+
+    def __repr__(self):
+        return (f"<OpportunityRecord(salesforce_id='{self.salesforce_id}', gclid='{self.gclid}', "
+                f"original_lead_created_datetime='{self.original_lead_created_datetime}', "
+                f"admission_date='{self.admission_date}', system_modstamp='{self.system_modstamp}')>")
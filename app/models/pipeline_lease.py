@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, DateTime
+from app.core.database.sql_adaptor import Base
+import datetime
+
+class PipelineLease(Base):
+    __tablename__ = "pipeline_lease"
+
+    name = Column(String, primary_key=True, comment="Name of the leased run, e.g. 'pipeline' or 'pipeline:partition-0-of-4'.")
+    owner = Column(String, nullable=False, comment="Instance and run holding the lease.")
+    acquired_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, comment="When the current owner acquired the lease (UTC).")
+    heartbeat_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, comment="When the owner last renewed the lease (UTC).")
+    expires_at = Column(DateTime, nullable=False, comment="When the lease lapses unless renewed (UTC); other instances may then take it over.")
+
+    def __repr__(self):
+        return (f"<PipelineLease(name='{self.name}', owner='{self.owner}', acquired_at='{self.acquired_at}', "
+                f"heartbeat_at='{self.heartbeat_at}', expires_at='{self.expires_at}')>")
@@ -0,0 +1,27 @@
+from typing import Optional
+from sqlalchemy import Integer, String, DateTime, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database.sql_adaptor import Base
+import datetime
+
+class PipelineRun(Base):
+    __tablename__ = "pipeline_run"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String, nullable=False, index=True, comment="Name of the run, e.g. 'pipeline' or 'pipeline:partition-0-of-4'.")
+    status: Mapped[str] = mapped_column(String, nullable=False, comment="'running', 'succeeded', 'failed', or 'abandoned' when it was too old to resume.")
+    modified_since: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True, comment="SystemModstamp lower bound (UTC) of the run's Salesforce query; null for a full-window run.")
+    last_salesforce_id: Mapped[Optional[str]] = mapped_column(String, nullable=True, comment="Id of the last Salesforce record of the last committed chunk; a resumed run queries the records after it.")
+    watermark: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True, comment="Highest SystemModstamp (UTC) among the records of the committed chunks.")
+    chunks_committed: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment="Number of chunks uploaded and stored for every target.")
+    records_committed: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment="Number of Salesforce records in the committed chunks.")
+    resumed_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment="How many times the run was resumed after an interruption.")
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True, comment="Error that made the last attempt fail.")
+    started_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow, nullable=False, comment="When the run first started (UTC).")
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, nullable=False, comment="When the run last recorded progress (UTC).")
+    finished_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True, comment="When the run succeeded, failed or was abandoned (UTC).")
+
+    def __repr__(self):
+        return (f"<PipelineRun(id={self.id}, name='{self.name}', status='{self.status}', "
+                f"last_salesforce_id='{self.last_salesforce_id}', chunks_committed={self.chunks_committed}, "
+                f"started_at='{self.started_at}')>")
@@ -0,0 +1,21 @@
+from typing import Optional
+from sqlalchemy import Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database.sql_adaptor import Base
+import datetime
+
+class PipelineRunChunk(Base):
+    __tablename__ = "pipeline_run_chunk"
+
+    run_id: Mapped[int] = mapped_column(Integer, ForeignKey("pipeline_run.id", ondelete="CASCADE"), primary_key=True, comment="The pipeline_run the chunk belongs to.")
+    chunk_index: Mapped[int] = mapped_column(Integer, primary_key=True, comment="Position of the chunk in the run, counted across resumes.")
+    target: Mapped[str] = mapped_column(String, primary_key=True, comment="Name of the upload target the chunk's conversions were uploaded to.")
+    status: Mapped[str] = mapped_column(String, nullable=False, comment="'uploaded' once Google Ads accepted the upload, 'stored' once its results were committed.")
+    uploaded_count: Mapped[int] = mapped_column(Integer, nullable=False, comment="Number of conversions Google Ads accepted.")
+    failed_count: Mapped[int] = mapped_column(Integer, nullable=False, comment="Number of conversions Google Ads rejected.")
+    payload: Mapped[Optional[str]] = mapped_column(Text, nullable=True, comment="JSON upload results still to be stored; replayed by a resumed run and cleared once stored.")
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, nullable=False, comment="When the chunk last changed status (UTC).")
+
+    def __repr__(self):
+        return (f"<PipelineRunChunk(run_id={self.run_id}, chunk_index={self.chunk_index}, target='{self.target}', "
+                f"status='{self.status}', uploaded_count={self.uploaded_count}, failed_count={self.failed_count})>")
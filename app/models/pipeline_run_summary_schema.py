@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Dict, Optional
+from pydantic import BaseModel
+
+class PipelineTargetCountsRead(BaseModel):
+    uploaded: int
+    stored: int
+    failed: int
+
+class PipelineRunSummaryRead(BaseModel):
+    run_id: Optional[int] = None
+    started_at: datetime
+    finished_at: datetime
+    fetched: int
+    uploaded: int
+    stored: int
+    failed: int
+    targets: Dict[str, PipelineTargetCountsRead]
+    stage_seconds: Dict[str, float]
@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+class PipelineSchedulerRead(BaseModel):
+    enabled: bool
+    running: bool
+    interval_seconds: float
+    min_interval_seconds: float
+    max_interval_seconds: float
+    next_run_at: Optional[datetime] = None
+    last_run_started_at: Optional[datetime] = None
+    last_run_finished_at: Optional[datetime] = None
+    last_run_status: Optional[str] = None
+    last_run_records: Optional[int] = None
+    last_job_id: Optional[str] = None
+    last_error: Optional[str] = None
@@ -0,0 +1,17 @@
+from typing import Optional
+from sqlalchemy import String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database.sql_adaptor import Base
+import datetime
+
+class SyncWatermark(Base):
+    __tablename__ = "sync_watermark"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True, comment="Name of the synchronised source, e.g. 'salesforce_opportunity'.")
+    watermark: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True, comment="Highest SystemModstamp (UTC) seen by the last successful run.")
+    last_full_sync: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True, comment="When the last successful full-window reconciliation run started (UTC).")
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, nullable=False, comment="The date and time when this watermark was last updated.")
+
+    def __repr__(self):
+        return (f"<SyncWatermark(name='{self.name}', watermark='{self.watermark}', "
+                f"last_full_sync='{self.last_full_sync}', updated_at='{self.updated_at}')>")
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime
+from app.core.database.sql_adaptor import Base
+import datetime
+
+class UploadDailySummary(Base):
+    __tablename__ = "upload_daily_summary"
+
+    day = Column(Date, primary_key=True, comment="UTC day on which the uploads were recorded (upload_status.timestamp).")
+    target = Column(String, primary_key=True, comment="Name of the upload target the conversions were uploaded to.")
+    status = Column(String, primary_key=True, comment="Upload status indicator, e.g., 'successful'.")
+    conversion_action = Column(String, nullable=True, comment="Conversion action resource name of the target when the day was rolled up; null if the target was no longer configured.")
+    count = Column(Integer, nullable=False, comment="Number of upload_status rows for the day, target and status.")
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, comment="The date and time when this summary row was last recomputed.")
+
+    def __repr__(self):
+        return (f"<UploadDailySummary(day='{self.day}', target='{self.target}', status='{self.status}', "
+                f"conversion_action='{self.conversion_action}', count={self.count}, updated_at='{self.updated_at}')>")
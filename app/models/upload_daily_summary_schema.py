@@ -0,0 +1,14 @@
+from datetime import date, datetime
+from typing import Optional
+from pydantic import BaseModel
+
+class UploadDailySummaryRead(BaseModel):
+    day: date
+    target: str
+    status: str
+    conversion_action: Optional[str] = None
+    count: int
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
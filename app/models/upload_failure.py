@@ -0,0 +1,32 @@
+from typing import Optional
+from sqlalchemy import Integer, String, DateTime, Text, Boolean, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database.sql_adaptor import Base
+import datetime
+
+class UploadFailure(Base):
+    __tablename__ = "upload_failure"
+    __table_args__ = (
+        UniqueConstraint("salesforce_id", "target", name="uq_upload_failure_salesforce_id_target"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    salesforce_id: Mapped[str] = mapped_column(String, nullable=False, index=True, comment="Salesforce Opportunity Id of the conversion that failed to upload.")
+    target: Mapped[str] = mapped_column(String, nullable=False, default="default", server_default="default", comment="Name of the upload target the conversion failed to upload to.")
+    gclid: Mapped[Optional[str]] = mapped_column(String, nullable=True, comment="The GCLID value (GCLID__c) from the Salesforce record, used for conversion tracking.")
+    original_lead_created_datetime: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, comment="The Original_Lead_Created_Date_Time__c field from the Salesforce record capturing when the lead was created.")
+    admission_date: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, comment="The Admission_Date__c field from the Salesforce record indicating the date of admission.")
+    hashed_email: Mapped[Optional[str]] = mapped_column(String, nullable=True, comment="SHA-256 hash of the normalized email address, for enhanced conversions.")
+    hashed_phone: Mapped[Optional[str]] = mapped_column(String, nullable=True, comment="SHA-256 hash of the normalized E.164 phone number, for enhanced conversions.")
+    error_code: Mapped[Optional[str]] = mapped_column(String, nullable=True, comment="Google Ads error code of the last attempt, e.g. 'EVENT_NOT_FOUND'.")
+    error_details: Mapped[Optional[str]] = mapped_column(Text, nullable=True, comment="JSON error returned by Google Ads for the last attempt.")
+    attempts: Mapped[int] = mapped_column(Integer, default=1, nullable=False, comment="Number of upload attempts made so far.")
+    permanent: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False, comment="True if the error cannot be fixed by retrying; the conversion is no longer retried.")
+    next_retry_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True, index=True, comment="When the conversion is next due for a retry; null for permanent failures.")
+    first_failed_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow, nullable=False, comment="The date and time of the first failed attempt.")
+    last_failed_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow, nullable=False, comment="The date and time of the last failed attempt.")
+
+    def __repr__(self):
+        return (f"<UploadFailure(id={self.id}, salesforce_id='{self.salesforce_id}', target='{self.target}', gclid='{self.gclid}', "
+                f"error_code='{self.error_code}', attempts={self.attempts}, permanent={self.permanent}, "
+                f"next_retry_at='{self.next_retry_at}')>")
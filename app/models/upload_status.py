@@ -1,21 +1,28 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, UniqueConstraint
 from app.core.database.sql_adaptor import Base
 import datetime
 
 class UploadStatus(Base):
     __tablename__ = "upload_status"
+    __table_args__ = (
+        UniqueConstraint("salesforce_id", "target", name="uq_upload_status_salesforce_id_target"),
+        # Serves the pages of one run's rows, which are read in id order (see upload_status_reader).
+        Index("ix_upload_status_run_id_id", "run_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    salesforce_id = Column(String, nullable=False, comment="Primary key for the upload record entry: Salesforce Opportunity Id from the query result.")
+    salesforce_id = Column(String, nullable=False, index=True, comment="Salesforce Opportunity Id from the query result; unique per upload target.")
+    target = Column(String, nullable=False, default="default", server_default="default", comment="Name of the upload target (Google Ads customer and conversion action) the conversion was uploaded to.")
     gclid = Column(String, nullable=True, comment="The GCLID value (GCLID__c) from the Salesforce record, used for conversion tracking.")
     original_lead_created_datetime = Column(DateTime, nullable=False, comment="The Original_Lead_Created_Date_Time__c field from the Salesforce record capturing when the lead was created.")
     admission_date = Column(DateTime, nullable=False, comment="The Admission_Date__c field from the Salesforce record indicating the date of admission.")
-    status = Column(String, nullable=False, comment="Upload status indicator, e.g., 'successful' or 'failed'.")
-    timestamp = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, comment="The date and time when this upload status was recorded.")
+    status = Column(String, nullable=False, index=True, comment="Upload status indicator, e.g., 'successful' or 'failed'.")
+    timestamp = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, index=True, comment="The date and time when this upload status was recorded.")
     error_details = Column(Text, nullable=True, comment="Contains error details if the upload failed, otherwise null.")
+    run_id = Column(Integer, nullable=True, comment="ID of the pipeline_run that stored this row; null for runs without checkpoints and rows stored before runs were recorded.")
     
     def __repr__(self):
-        return (f"<UploadStatus(id={self.id}, salesforce_id='{self.salesforce_id}', "
+        return (f"<UploadStatus(id={self.id}, salesforce_id='{self.salesforce_id}', target='{self.target}', "
                 f"gclid='{self.gclid}', original_lead_created_datetime='{self.original_lead_created_datetime}', "
                 f"admission_date='{self.admission_date}', status='{self.status}', "
-                f"timestamp='{self.timestamp}', error_details='{self.error_details}')>")
+                f"timestamp='{self.timestamp}', error_details='{self.error_details}', run_id={self.run_id})>")
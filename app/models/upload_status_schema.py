@@ -1,9 +1,10 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
 class UploadStatusBase(BaseModel):
     salesforce_id: str
+    target: str = "default"
     gclid: Optional[str] = None
     original_lead_created_datetime: datetime
     admission_date: datetime
@@ -16,6 +17,12 @@ class UploadStatusCreate(UploadStatusBase):
 class UploadStatusRead(UploadStatusBase):
     id: int
     timestamp: datetime
+    run_id: Optional[int] = None
 
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+class UploadStatusPage(BaseModel):
+    items: List[UploadStatusRead]
+    # Pass as `cursor` to get the next page; null on the last page.
+    next_cursor: Optional[int] = None
@@ -0,0 +1,68 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.identifier_hashing.identifier_hashing import EMAIL, PHONE, Identifier, identifier_hasher
+from app.models.opportunity_record import OpportunityRecord
+
+
+def identifier_fields() -> Tuple[Optional[str], Optional[str]]:
+    """
+    Returns the Salesforce fields holding the email address and phone number used for
+    enhanced conversions: SALESFORCE_EMAIL_FIELD and SALESFORCE_PHONE_FIELD, as paths from
+    the Opportunity (e.g. "Contact__r.Email"), or None when not configured.
+    """
+    return os.getenv("SALESFORCE_EMAIL_FIELD") or None, os.getenv("SALESFORCE_PHONE_FIELD") or None
+
+
+def enhanced_conversions_enabled() -> bool:
+    """
+    Returns whether enhanced conversions are enabled, i.e. an email or phone field is configured.
+    """
+    return any(identifier_fields())
+
+
+def hash_user_identifiers(records: Iterable[OpportunityRecord]) -> int:
+    """
+    Normalizes and hashes the email addresses and phone numbers of the given records in one
+    batch, setting their hashed_email and hashed_phone. Records that already carry hashes
+    (e.g. failures loaded for a retry) are left alone.
+
+    Identical values are hashed once per batch, and values seen by earlier batches come from
+    the shared hasher's cache; large batches are hashed on its process pool (see
+    identifier_hashing.IdentifierHasher).
+
+    Args:
+        records: The records about to be uploaded.
+
+    Returns:
+        The number of records that ended up with at least one hashed identifier.
+    """
+    pending: List[Tuple[OpportunityRecord, Optional[Identifier], Optional[Identifier]]] = []
+    for record in records:
+        if record.hashed_email or record.hashed_phone:
+            continue
+        email = (EMAIL, record.email) if record.email else None
+        phone = (PHONE, record.phone) if record.phone else None
+        if email or phone:
+            pending.append((record, email, phone))
+
+    digests = identifier_hasher.hash_all([identifier for _, *identifiers in pending for identifier in identifiers if identifier])
+    hashed_count = 0
+    for record, email, phone in pending:
+        record.hashed_email = digests[email] if email else None
+        record.hashed_phone = digests[phone] if phone else None
+        hashed_count += bool(record.hashed_email or record.hashed_phone)
+    return hashed_count
+
+
+def build_user_identifiers(record: OpportunityRecord) -> List[Dict[str, Any]]:
+    """
+    Returns the userIdentifiers entries of a conversion for the record's hashed email address
+    and phone number.
+    """
+    identifiers: List[Dict[str, Any]] = []
+    if record.hashed_email:
+        identifiers.append({"hashedEmail": record.hashed_email, "userIdentifierSource": "FIRST_PARTY"})
+    if record.hashed_phone:
+        identifiers.append({"hashedPhoneNumber": record.hashed_phone, "userIdentifierSource": "FIRST_PARTY"})
+    return identifiers
@@ -1,37 +1,97 @@
 import os
-from typing import List, Dict, Any
-from app.core.database.sql_adaptor import SessionLocal
+import logging
+from typing import Dict, List, Set, Tuple
+from sqlalchemy import select, union
+from sqlalchemy.sql.selectable import CompoundSelect
+from app.core.database.sql_adaptor import SessionLocal, AsyncSessionLocal
 from app.models.upload_status import UploadStatus
+from app.models.upload_failure import UploadFailure
+from app.models.opportunity_record import OpportunityRecord
 
-def filter_unprocessed(sales_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+logger = logging.getLogger(__name__)
+
+def _processed_keys_query(salesforce_ids: List[str]) -> CompoundSelect:
+    """
+    Selects the (salesforce_id, target) pairs among `salesforce_ids` that are present in the
+    upload_status or upload_failure tables.
+    """
+    return union(
+        select(UploadStatus.salesforce_id, UploadStatus.target).where(UploadStatus.salesforce_id.in_(salesforce_ids)),
+        select(UploadFailure.salesforce_id, UploadFailure.target).where(UploadFailure.salesforce_id.in_(salesforce_ids)),
+    )
+
+def _candidate_batches(assignments: Dict[str, List[OpportunityRecord]]) -> List[List[str]]:
+    batch_size = int(os.getenv("FILTER_BATCH_SIZE", "500"))
+    candidate_ids = list({row.salesforce_id for rows in assignments.values() for row in rows})
+    return [candidate_ids[start:start + batch_size] for start in range(0, len(candidate_ids), batch_size)]
+
+def _remove_processed(
+    assignments: Dict[str, List[OpportunityRecord]], processed_keys: Set[Tuple[str, str]]
+) -> Dict[str, List[OpportunityRecord]]:
+    # Filter sales data to include only rows which haven't been processed for their target.
+    filtered_data = {
+        target: [row for row in rows if (row.salesforce_id, target) not in processed_keys]
+        for target, rows in assignments.items()
+    }
+
+    # Log the count of filtered records.
+    filtered_count = sum(len(rows) for rows in assignments.values()) - sum(len(rows) for rows in filtered_data.values())
+    logger.info(f"Filtered out {filtered_count} records that were already processed.")
+
+    return filtered_data
+
+def filter_unprocessed(assignments: Dict[str, List[OpportunityRecord]]) -> Dict[str, List[OpportunityRecord]]:
     """
     Filters out rows that have already been processed.
-    It checks each record from the raw sales data (provided by salesforce_query)
-    against the UploadStatus records in the database.
-    
-    A record is considered processed if its Salesforce ID is already present in the database.
-    
+    It checks each record from the raw sales data (provided by salesforce_query and assigned
+    to upload targets) against the UploadStatus and UploadFailure records in the database.
+
+    A record is considered processed for a target if its Salesforce ID is already present in the
+    database for that target, either as an upload or in the failure queue, where failed uploads
+    are retried separately. All targets are checked in a single pass: only the IDs of the given
+    batch are looked up, in IN-list queries of FILTER_BATCH_SIZE IDs (default 500) served by the
+    indexes on salesforce_id.
+
     Args:
-        sales_data: List of dictionaries containing sales data, where each dictionary
-                    is expected to have an "Id" key representing the Salesforce Opportunity Id.
-    
+        assignments: Dictionary of upload target name to the OpportunityRecords assigned to it.
+
     Returns:
-        List of dictionaries that haven't been processed yet.
-        
+        Dictionary of upload target name to the OpportunityRecords that haven't been processed
+        for that target yet.
+
     Raises:
         Any exceptions raised by database queries will propagate.
     """
+    processed_keys: Set[Tuple[str, str]] = set()
+
     # Open a new database session.
     with SessionLocal() as session:
-        # Retrieve a set of all processed Salesforce IDs from the upload_status table.
-        processed_records = session.query(UploadStatus.salesforce_id).all()
-        processed_ids = {record[0] for record in processed_records}
+        # Retrieve the (ID, target) pairs already present in the upload_status or upload_failure tables.
+        for batch in _candidate_batches(assignments):
+            processed_keys.update((record[0], record[1]) for record in session.execute(_processed_keys_query(batch)))
 
-    # Filter sales data to include only rows which haven't been processed.
-    filtered_data = [row for row in sales_data if row.get("Id") not in processed_ids]
+    return _remove_processed(assignments, processed_keys)
 
-    # Log the count of filtered records.
-    filtered_count = len(sales_data) - len(filtered_data)
-    print(f"[filter_unprocessed] Filtered out {filtered_count} records that were already processed.")
+async def filter_unprocessed_async(assignments: Dict[str, List[OpportunityRecord]]) -> Dict[str, List[OpportunityRecord]]:
+    """
+    Async version of filter_unprocessed, running the same lookups on the async engine so that
+    the pipeline can overlap them with its Salesforce and Google Ads calls (see PIPELINE_ASYNC_DB).
 
-    return filtered_data
+    Args:
+        assignments: Dictionary of upload target name to the OpportunityRecords assigned to it.
+
+    Returns:
+        Dictionary of upload target name to the OpportunityRecords that haven't been processed
+        for that target yet.
+
+    Raises:
+        Any exceptions raised by database queries will propagate.
+    """
+    processed_keys: Set[Tuple[str, str]] = set()
+
+    async with AsyncSessionLocal() as session:
+        for batch in _candidate_batches(assignments):
+            result = await session.execute(_processed_keys_query(batch))
+            processed_keys.update((record[0], record[1]) for record in result)
+
+    return _remove_processed(assignments, processed_keys)
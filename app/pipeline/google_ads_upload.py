@@ -1,83 +1,409 @@
 import os
-import requests
-from datetime import datetime
-from typing import List, Dict, Any
+import json
+import logging
+import datetime
+import contextvars
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, List, Dict, Any, Optional, Tuple, Type, TypeVar
 
 from app.core.google_auth.google_auth import get_access_token
+from app.core.http_client import http_client
+from app.core.metrics.metrics import http_timer, profiled
+from app.core.rate_limiter.rate_limiter import AdaptiveRateLimiter, rate_limiters
+from app.models.opportunity_record import OpportunityRecord
+from app.pipeline.upload_targets import UploadTarget, default_upload_target
+from app.pipeline.enhanced_conversions import build_user_identifiers
 
+logger = logging.getLogger(__name__)
 
-def upload_conversions(filtered_records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    action_id = 462477827
-    customer_id = os.getenv("GADS_CUSTOMER")
-    api_version = "v18"
+T = TypeVar("T")
 
-    access_token = get_access_token()
+# Upload backends selectable with GADS_UPLOAD_BACKEND.
+BACKEND_REST = "rest"
+BACKEND_GRPC = "grpc"
 
-    conversion_objects = []
-    for record in filtered_records:
-        lead_created_time = record.get(
-            "Original_Lead_Created_Date_Time__c"
-        ) or record.get("Admission_Date__c")
-        gclid = record.get("GCLID__c")
+# Google Ads API version used by both upload backends.
+API_VERSION = "v18"
+
+# Google Ads rejects uploadClickConversions requests with more than 2000 conversions.
+MAX_CONVERSIONS_PER_REQUEST = 2000
+
+# Error code reported for conversions whose upload was throttled until the retries ran out.
+THROTTLED_ERROR_CODE = {"quotaError": "RESOURCE_EXHAUSTED"}
+
+# Error reported for records without a GCLID whose email address and phone number cannot be
+# normalized, so they are never sent; the code Google Ads uses for identifiers it rejects, so
+# that the failure is queued as permanent (see store_failure.PERMANENT_ERROR_CODES).
+INVALID_USER_IDENTIFIER_ERROR_CODE = {"conversionUploadError": "INVALID_USER_IDENTIFIER"}
+
+
+class UploadThrottled(Exception):
+    """
+    Raised when Google Ads keeps throttling an upload request after all retries.
+    """
+
+
+def customer_rate_limiter(customer_id: Optional[str]) -> AdaptiveRateLimiter:
+    """
+    Returns the shared rate limiter for uploads to a Google Ads customer, created on first use.
+
+    Configured by environment variables:
+      - GADS_RATE_LIMIT_INITIAL_RPS (default 5): requests per second to start with.
+      - GADS_RATE_LIMIT_MIN_RPS (default 0.1) / GADS_RATE_LIMIT_MAX_RPS (default 20): bounds of the rate.
+      - GADS_RATE_LIMIT_CUSTOMER_MAX_RPS: JSON object of customer ID to its own maximum rate,
+        e.g. {"1234567890": 5}, for customers with a smaller budget.
+      - GADS_RATE_LIMIT_INCREASE (default 0.1): requests per second added after each accepted request.
+      - GADS_RATE_LIMIT_DECREASE_FACTOR (default 0.5): factor applied to the rate when throttled.
+    """
+    def create() -> AdaptiveRateLimiter:
+        budgets = json.loads(os.getenv("GADS_RATE_LIMIT_CUSTOMER_MAX_RPS", "{}"))
+        return AdaptiveRateLimiter(
+            name=f"google_ads:{customer_id}",
+            rate=float(os.getenv("GADS_RATE_LIMIT_INITIAL_RPS", "5")),
+            min_rate=float(os.getenv("GADS_RATE_LIMIT_MIN_RPS", "0.1")),
+            max_rate=float(budgets.get(str(customer_id), os.getenv("GADS_RATE_LIMIT_MAX_RPS", "20"))),
+            increase=float(os.getenv("GADS_RATE_LIMIT_INCREASE", "0.1")),
+            decrease_factor=float(os.getenv("GADS_RATE_LIMIT_DECREASE_FACTOR", "0.5")),
+        )
+
+    return rate_limiters.get(f"google_ads:{customer_id}", create)
+
+
+def _is_throttled(response: Any) -> bool:
+    """
+    Returns whether Google Ads rejected a request for exceeding a rate or quota limit:
+    HTTP 429, or a RESOURCE_EXHAUSTED error under another status.
+    """
+    return response.status_code == 429 or (response.status_code >= 400 and "RESOURCE_EXHAUSTED" in response.text)
+
+
+def _parse_delay(value: Any) -> Optional[float]:
+    # Retry-After holds seconds or an HTTP date; Google's retryDelay holds a duration like "30s".
+    value = str(value).strip()
+    try:
+        return max(float(value.rstrip("s")), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_after(response: Any) -> Optional[float]:
+    """
+    Returns how long Google Ads asked clients to wait before retrying, in seconds: the
+    Retry-After header, or the retryDelay of the error details (RetryInfo, or the
+    quotaErrorDetails of a GoogleAdsFailure). None if the response does not say.
+    """
+    if response.headers.get("Retry-After"):
+        return _parse_delay(response.headers["Retry-After"])
+    try:
+        details = response.json().get("error", {}).get("details", [])
+    except (ValueError, AttributeError):
+        return None
+    for detail in details:
+        if detail.get("retryDelay"):
+            return _parse_delay(detail["retryDelay"])
+        for error in detail.get("errors", []):
+            retry_delay = error.get("details", {}).get("quotaErrorDetails", {}).get("retryDelay")
+            if retry_delay:
+                return _parse_delay(retry_delay)
+    return None
 
-        if not (gclid and lead_created_time):
+
+class RequestThrottled(Exception):
+    """
+    Raised by an upload send function when Google Ads throttled the request.
+
+    Attributes:
+        retry_after: How long Google Ads asked clients to wait, in seconds, if it said.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def call_with_throttling(send: Callable[[], T], limiter: AdaptiveRateLimiter) -> T:
+    """
+    Sends an upload request with `send` at the pace allowed by `limiter`, retrying it while
+    Google Ads throttles it (`send` raises RequestThrottled).
+
+    Each throttled request slows the limiter down and is retried after the delay Google Ads
+    asked for, or else after GADS_RETRY_BACKOFF_SECONDS (default 1) doubled per attempt, for
+    up to GADS_UPLOAD_MAX_RETRIES retries (default 5). Requests asking for a wait longer than
+    GADS_RETRY_MAX_DELAY_SECONDS (default 300), e.g. after the daily quota ran out, are not retried.
+
+    Returns:
+        What `send` returned for the first request that was not throttled.
+
+    Raises:
+        UploadThrottled: If the request is still throttled after the retries.
+        Any other exception raised by `send`.
+    """
+    max_retries = int(os.getenv("GADS_UPLOAD_MAX_RETRIES", "5"))
+    backoff = float(os.getenv("GADS_RETRY_BACKOFF_SECONDS", "1"))
+    max_delay = float(os.getenv("GADS_RETRY_MAX_DELAY_SECONDS", "300"))
+
+    attempt = 0
+    while True:
+        sent_at = limiter.acquire()
+        try:
+            result = send()
+        except RequestThrottled as throttled:
+            delay = throttled.retry_after if throttled.retry_after is not None else backoff * 2 ** attempt
+            if attempt == max_retries or delay > max_delay:
+                limiter.record_throttle(sent_at)
+                raise UploadThrottled(
+                    f"Google Ads throttled the upload after {attempt + 1} attempt(s)"
+                    + (f" and asked to wait {delay:.0f}s" if delay > max_delay else "") + f": {throttled}"
+                ) from throttled
+            limiter.record_throttle(sent_at, delay)
+            logger.warning(f"Google Ads throttled an upload; retrying in {delay:.1f}s.")
+            attempt += 1
             continue
+        limiter.record_success()
+        return result
 
-        formatted_date = datetime.strptime(lead_created_time, "%Y-%m-%dT%H:%M:%S.%f%z")
-        formatted_date = formatted_date.strftime("%Y-%m-%d %H:%M:%S%z")
-        formatted_date = formatted_date[:-2] + ":" + formatted_date[-2:]
 
-        conversion = {
-            "conversionAction": f"customers/{customer_id}/conversionActions/{action_id}",
-            "gclid": gclid,
-            "conversionValue": 1,
-            "conversionDateTime": formatted_date,
-            "currencyCode": "USD",
-        }
-        conversion_objects.append(conversion)
+def _build_conversion(record: OpportunityRecord, conversion_action: str) -> Optional[Dict[str, Any]]:
+    """
+    Builds the uploadClickConversions payload entry for a single Salesforce record.
 
-    if not conversion_objects:
-        return []
-
-    url = f"https://googleads.googleapis.com/{api_version}/customers/{customer_id}:uploadClickConversions"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json",
-        "developer-token": os.getenv("GADS_DEVELOPER_TOKEN"),
-        "login-customer-id": os.getenv("GADS_LOGIN_CUSTOMER_ID"),
+    Records with hashed user identifiers (enhanced conversions for leads) carry them as
+    userIdentifiers, next to the GCLID if they have one, so that Google Ads can match the
+    conversion on either.
+
+    Returns:
+        The conversion dictionary, or None if the record has neither a GCLID nor a hashed
+        identifier, or no lead time.
+    """
+    lead_created_time = record.original_lead_created_datetime or record.admission_date
+    user_identifiers = build_user_identifiers(record)
+
+    if not ((record.gclid or user_identifiers) and lead_created_time):
+        return None
+
+    formatted_date = lead_created_time.strftime("%Y-%m-%d %H:%M:%S%z")
+    formatted_date = formatted_date[:-2] + ":" + formatted_date[-2:]
+
+    conversion: Dict[str, Any] = {
+        "conversionAction": conversion_action,
+        "conversionValue": 1,
+        "conversionDateTime": formatted_date,
+        "currencyCode": "USD",
     }
+    if record.gclid:
+        conversion["gclid"] = record.gclid
+    if user_identifiers:
+        conversion["userIdentifiers"] = user_identifiers
+    return conversion
+
+
+def _upload_chunk(
+    url: str,
+    headers: Dict[str, str],
+    conversions: List[Dict[str, Any]],
+    records: List[OpportunityRecord],
+    offset: int,
+    limiter: AdaptiveRateLimiter,
+) -> List[Dict[str, Any]]:
+    """
+    Sends one chunk of conversions to uploadClickConversions.
+
+    Partial failure indexes reported by Google Ads are relative to the chunk; they are
+    shifted by `offset` so that they refer to positions in the full conversion list.
+
+    Args:
+        url: The uploadClickConversions endpoint.
+        headers: Request headers including authorization.
+        conversions: The conversions in this chunk.
+        records: The records the conversions were built from, in the same order.
+        offset: Position of the first conversion of this chunk in the full list.
+        limiter: The rate limiter of the customer the conversions are uploaded to.
+
+    Returns:
+        One result dictionary per conversion in the chunk, in the same order, each carrying
+        its source OpportunityRecord under "record".
+
+    Raises:
+        UploadThrottled: If Google Ads kept throttling the request.
+        One of http_client.HTTP_ERRORS if the request fails.
+    """
     payload = {
-        "conversions": conversion_objects,
+        "conversions": conversions,
         "partialFailure": True,
     }
 
-    response = requests.post(url, headers=headers, json=payload)
-    if not response.ok:
-        print(response.text)
-        response.raise_for_status()
+    def send() -> Dict[str, Any]:
+        with http_timer("google_ads", "uploadClickConversions") as outcome:
+            response = http_client.post(url, headers=headers, json=payload)
+            outcome["status"] = response.status_code
+        if _is_throttled(response):
+            raise RequestThrottled(f"HTTP {response.status_code}: {response.text[:500]}", _retry_after(response))
+        if response.status_code >= 400:
+            logger.debug(f"uploadClickConversions failed with HTTP {response.status_code}: {response.text}")
+            response.raise_for_status()
+        return response.json()
 
-    conversion_response = response.json()
-    results = []
+    conversion_response = call_with_throttling(send, limiter)
+
+    # Extract error details and re-map chunk-local indexes onto global positions.
+    error_details = []
     if "partialFailureError" in conversion_response:
-        # Extract error details
-        error_details = conversion_response["partialFailureError"]["details"][0][
-            "errors"
-        ]
-        error_by_index = {
-            error["location"]["fieldPathElements"][0]["index"]: error
-            for error in error_details
-        }
+        error_details = conversion_response["partialFailureError"]["details"][0]["errors"]
+    error_by_index = {}
+    for error in error_details:
+        local_index = error["location"]["fieldPathElements"][0]["index"]
+        error["location"]["fieldPathElements"][0]["index"] = offset + local_index
+        error_by_index[local_index] = error
+
+    # Map results with original GCLIDs and records
+    results = []
+    for idx, (original_conversion, record) in enumerate(zip(conversions, records)):
+        result = {"gclid": original_conversion.get("gclid"), "record": record}
+        if idx in error_by_index:
+            result["error"] = error_by_index[idx]
+        else:
+            # Copy successful conversion data
+            result.update(conversion_response["results"][idx])
+        results.append(result)
+    return results
+
+
+def upload_conversions(
+    filtered_records: List[OpportunityRecord], target: Optional[UploadTarget] = None
+) -> List[Dict[str, Any]]:
+    """
+    Uploads click conversions for the given Salesforce records to the customer and
+    conversion action of an upload target.
+
+    Conversions are split into chunks of GADS_UPLOAD_CHUNK_SIZE (default and maximum 2000)
+    which are sent concurrently by up to the target's max_workers, or GADS_UPLOAD_MAX_WORKERS
+    (default 4), threads. GADS_UPLOAD_BACKEND selects the transport: "rest" (default) posts
+    JSON over the shared, keep-alive connection pool, and "grpc" sends protobuf messages
+    through the google-ads client library over a persistent gRPC channel (see google_ads_grpc).
+    Both return the same result dictionaries.
+    Results are returned in conversion order, so partial failure indexes refer to
+    positions in the full upload. If a chunk request fails as a whole, each of its
+    conversions is reported with an "error" entry while other chunks are kept.
+
+    Requests are paced by the customer's adaptive rate limiter (see customer_rate_limiter),
+    shared with concurrent uploads to the same customer, and retried while Google Ads
+    throttles them. Conversions of chunks that are still throttled after the retries are
+    reported with a RESOURCE_EXHAUSTED quota error, so that they are queued for a later retry
+    instead of failing the run.
+
+    Args:
+        filtered_records: Salesforce records that have not been uploaded yet.
+        target: The upload target; defaults to GADS_CUSTOMER and the default conversion action.
+
+    Records without a GCLID whose user identifiers could not be normalized (see
+    enhanced_conversions.hash_user_identifiers) cannot be matched, and are returned as failed
+    with an INVALID_USER_IDENTIFIER error rather than sent.
 
-        # Map results with original GCLIDs
-        for idx, original_conversion in enumerate(conversion_objects):
-            result = {"gclid": original_conversion["gclid"]}
-            if idx in error_by_index:
-                result["error"] = error_by_index[idx]
-            else:
-                # Copy successful conversion data
-                result.update(conversion_response["results"][idx])
-            results.append(result)
+    Returns:
+        One result dictionary per uploaded conversion, carrying its OpportunityRecord under
+        "record"; failed conversions carry an "error" key.
+
+    Raises:
+        ValueError: If GADS_UPLOAD_BACKEND is not "rest" or "grpc", or GADS_UPLOAD_CHUNK_SIZE is below 1.
+        EnvironmentError: If GADS_DEVELOPER_TOKEN is not set.
+        One of the backend's request errors (http_client.HTTP_ERRORS, or google_ads_grpc.grpc_errors())
+        if every chunk request fails, other than by throttling.
+    """
+    target = target or default_upload_target()
+    backend = os.getenv("GADS_UPLOAD_BACKEND", BACKEND_REST).lower()
+    if backend not in (BACKEND_REST, BACKEND_GRPC):
+        raise ValueError(f"GADS_UPLOAD_BACKEND must be '{BACKEND_REST}' or '{BACKEND_GRPC}', got '{backend}'.")
+    chunk_size = min(int(os.getenv("GADS_UPLOAD_CHUNK_SIZE", str(MAX_CONVERSIONS_PER_REQUEST))), MAX_CONVERSIONS_PER_REQUEST)
+    if chunk_size < 1:
+        raise ValueError(f"GADS_UPLOAD_CHUNK_SIZE must be at least 1, got {chunk_size}.")
+    max_workers = target.max_workers or int(os.getenv("GADS_UPLOAD_MAX_WORKERS", "4"))
+
+    conversion_objects = []
+    conversion_records = []
+    results: List[Dict[str, Any]] = []
+    for record in filtered_records:
+        conversion = _build_conversion(record, target.conversion_action)
+        if conversion:
+            conversion_objects.append(conversion)
+            conversion_records.append(record)
+        elif not (record.gclid or record.hashed_email or record.hashed_phone) and (record.email or record.phone):
+            results.append({
+                "gclid": None,
+                "record": record,
+                "error": {
+                    "errorCode": dict(INVALID_USER_IDENTIFIER_ERROR_CODE),
+                    "message": "The record has no GCLID, and its email address and phone number could not be normalized.",
+                },
+            })
+    if results:
+        logger.warning(f"{len(results)} record(s) for target '{target.name}' have no GCLID and no valid user identifier.")
+
+    if not conversion_objects:
+        return results
+
+    developer_token = os.getenv("GADS_DEVELOPER_TOKEN")
+    if not developer_token:
+        raise EnvironmentError("GADS_DEVELOPER_TOKEN environment variable is not set.")
+
+    request_errors: Tuple[Type[Exception], ...]
+    if backend == BACKEND_GRPC:
+        # Imported on first use, to keep the client library out of the service's startup path.
+        from app.pipeline import google_ads_grpc
+
+        upload_chunk = partial(google_ads_grpc.upload_chunk, target)
+        request_errors = google_ads_grpc.grpc_errors()
     else:
-        results = conversion_response.get("results", [])
+        access_token = get_access_token()
+
+        api_base_url = os.getenv("GADS_API_BASE_URL", "https://googleads.googleapis.com")
+        url = f"{api_base_url}/{API_VERSION}/customers/{target.customer_id}:uploadClickConversions"
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+            "developer-token": developer_token,
+        }
+        if target.login_customer_id:
+            headers["login-customer-id"] = target.login_customer_id
+        upload_chunk = partial(_upload_chunk, url, headers)
+        request_errors = http_client.HTTP_ERRORS
+    limiter = customer_rate_limiter(target.customer_id)
+
+    offsets = range(0, len(conversion_objects), chunk_size)
+    chunks = [conversion_objects[offset:offset + chunk_size] for offset in offsets]
+    record_chunks = [conversion_records[offset:offset + chunk_size] for offset in offsets]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        # Chunks run in a copy of this context, so they are profiled with the run when it is.
+        futures = [
+            executor.submit(contextvars.copy_context().run, profiled(upload_chunk), chunk, record_chunk, offset, limiter)
+            for chunk, record_chunk, offset in zip(chunks, record_chunks, offsets)
+        ]
+
+    chunk_errors: List[Exception] = []
+    for chunk, record_chunk, offset, future in zip(chunks, record_chunks, offsets, futures):
+        try:
+            results.extend(future.result())
+        except UploadThrottled as exc:
+            logger.error(f"Upload of conversions {offset}-{offset + len(chunk) - 1} to target '{target.name}' was throttled: {exc}")
+            results.extend(
+                {"gclid": conversion.get("gclid"), "record": record, "error": {"errorCode": dict(THROTTLED_ERROR_CODE), "message": str(exc)}}
+                for conversion, record in zip(chunk, record_chunk)
+            )
+        except request_errors as exc:
+            logger.error(f"Upload of conversions {offset}-{offset + len(chunk) - 1} to target '{target.name}' failed: {exc}")
+            chunk_errors.append(exc)
+            results.extend(
+                {"gclid": conversion.get("gclid"), "record": record, "error": {"message": str(exc)}}
+                for conversion, record in zip(chunk, record_chunk)
+            )
+
+    if len(chunk_errors) == len(chunks):
+        raise chunk_errors[0]
 
     return results
@@ -1,128 +1,179 @@
-from fastapi import APIRouter
-from typing import List, Dict, Any, Tuple
+import asyncio
 import logging
-
-from app.pipeline.salesforce_query import query_salesforce
-from app.pipeline.filter_unprocessed import filter_unprocessed
-from app.pipeline.google_ads_upload import upload_conversions
-from app.pipeline.store_success import store_success_records
+from functools import partial
+from typing import Any, Dict, Optional, Union
+
+from fastapi import APIRouter, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.models.pipeline_job_schema import PipelineJobRead
+from app.models.pipeline_run_summary_schema import PipelineRunSummaryRead
+from app.models.pipeline_scheduler_schema import PipelineSchedulerRead
+from app.pipeline.pipeline_jobs import JOB_FAILED, JOB_SUCCEEDED, JobLimitExceeded, PipelineJob, job_manager
+from app.pipeline.pipeline_runner import run_pipeline
+from app.pipeline.upload_status_reader import iter_upload_status_ndjson, run_filters
+from app.pipeline.run_coordinator import LeaseUnavailable, Partition, resolve_partition, start_or_join
+from app.pipeline.pipeline_scheduler import pipeline_scheduler, scheduler_enabled
 
 router = APIRouter()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Media type of the JSON Lines streams of stored records.
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
-def partition_upload_results(
-    upload_results: List[Dict[str, Any]]
-) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-    """
-    Partitions the upload results into successful and failed conversions.
 
-    Success is determined by the absence of an "error" key in the result.
-    
-    Args:
-        upload_results: List of dictionaries returned by the google_ads_upload module.
-    
-    Returns:
-        A tuple containing two lists:
-         - successful_results: List of dictionaries for successful uploads.
-         - failed_results: List of dictionaries for failed uploads.
+def _records_response(summary: Dict[str, Any]) -> StreamingResponse:
     """
-    successful_results = []
-    failed_results = []
-    for result in upload_results:
-        if "error" in result:
-            failed_results.append(result)
-        else:
-            successful_results.append(result)
-    return successful_results, failed_results
-
-
-def map_success_to_store_data(
-    successful_results: List[Dict[str, Any]], filtered_records: List[Dict[str, Any]]
-) -> List[Dict[str, Any]]:
+    Streams the upload_status rows stored by a pipeline run as JSON Lines, read from the
+    database page by page (see upload_status_reader.iter_upload_status_ndjson).
     """
-    Matches each successful upload result with its corresponding original sales record
-    (based on matching GCLID value) and prepares the data for storing success in the database.
+    headers = {"X-Pipeline-Run-Id": str(summary["run_id"])} if summary["run_id"] is not None else None
+    return StreamingResponse(iter_upload_status_ndjson(run_filters(summary)), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+@router.get(
+    "/pipeline",
+    response_model=Union[PipelineJobRead, PipelineRunSummaryRead],
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def orchestrate_pipeline(
+    response: Response,
+    wait: bool = False,
+    records: bool = False,
+    profile: bool = False,
+    partition: Optional[int] = None,
+    partitions: Optional[int] = None,
+) -> Union[PipelineJobRead, PipelineRunSummaryRead, StreamingResponse]:
+    """
+    Starts a pipeline run (see pipeline_runner.run_pipeline) as a background job on a
+    worker thread and returns its job ID immediately. Progress and results are available
+    from /pipeline/jobs/{job_id}, /pipeline/jobs/{job_id}/result and
+    /pipeline/jobs/{job_id}/records.
 
-    The resulting dictionary includes:
-      - salesforce_id: The Opportunity Id from the original record.
-      - gclid: The GCLID value.
-      - original_lead_created_datetime: Value from "Original_Lead_Created_Date_Time__c" in the original record.
-      - admission_date: Value from "Admission_Date__c" in the original record.
-      - status: Static string "successful".
-      - error_details: None.
+    Runs are coordinated across instances through a lease row (see run_coordinator): a
+    trigger arriving while this instance is already running the same (partition of the)
+    pipeline joins that job, flagged by the X-Pipeline-Joined header, and a trigger arriving
+    while another instance holds the lease is rejected.
 
     Args:
-        successful_results: The list of successful upload results from google_ads_upload.
-        filtered_records: The list of filtered sales records from Salesforce.
+        wait: If true, waits for the job to finish and returns the run summary instead
+              (counts and per-stage timings), without blocking the event loop.
+        records: If true, waits for the job to finish like `wait` and streams the records
+              the run stored as JSON Lines instead of the summary.
+        profile: If true, captures a cProfile profile of the run (see PIPELINE_PROFILE_DIR).
+        partition, partitions: Only process partition `partition` (0-based) of `partitions`
+              hash partitions of the records, so that several instances can split one run.
+              Required when PIPELINE_PARTITIONS is above 1, and `partitions` must match it.
 
     Returns:
-        List of dictionaries ready to be stored using store_success_records.
+        The created or joined job, the run summary when `wait` is set, or a stream of the
+        stored records when `records` is set.
+
+    Raises:
+        HTTPException(409): If another instance is running the same (partition of the) pipeline.
+        HTTPException(422): If only one of partition and partitions is given, they are out of
+            range or do not match PIPELINE_PARTITIONS.
+        HTTPException(429): If PIPELINE_MAX_CONCURRENT_JOBS jobs are already in progress.
     """
-    # Create mapping from gclid to original record
-    gclid_to_record = {record.get("GCLID__c"): record for record in filtered_records if record.get("GCLID__c")}
-    store_data = []
-    for result in successful_results:
-        gclid = result.get("gclid")
-        original_record = gclid_to_record.get(gclid)
-        if original_record:
-            data = {
-                "salesforce_id": original_record.get("Id"),
-                "gclid": original_record.get("GCLID__c"),
-                "original_lead_created_datetime": original_record.get("Original_Lead_Created_Date_Time__c"),
-                "admission_date": original_record.get("Admission_Date__c"),
-                "status": "successful",
-                "error_details": None,
-            }
-            store_data.append(data)
-    return store_data
-
-
-@router.get("/pipeline", response_model=List[Dict[str, Any]])
-async def orchestrate_pipeline() -> List[Dict[str, Any]]:
+    try:
+        run_partition: Optional[Partition] = resolve_partition(partition, partitions)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
+    try:
+        job, joined = await run_in_threadpool(
+            start_or_join, run_partition, partial(run_pipeline, profile=profile, partition=run_partition)
+        )
+    except LeaseUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    except JobLimitExceeded as exc:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc))
+    if joined:
+        response.headers["X-Pipeline-Joined"] = "true"
+        logger.info(f"Joined pipeline job {job.job_id} already in progress.")
+    else:
+        logger.info(f"Started pipeline job {job.job_id}.")
+
+    if wait or records:
+        summary = await asyncio.wrap_future(job.future)
+        if records:
+            return _records_response(summary)
+        response.status_code = status.HTTP_200_OK
+        return PipelineRunSummaryRead.model_validate(summary)
+    return PipelineJobRead.model_validate(job)
+
+
+@router.get("/pipeline/scheduler", response_model=PipelineSchedulerRead)
+async def get_pipeline_scheduler() -> PipelineSchedulerRead:
     """
-    Orchestrates the data pipeline by sequentially invoking:
-      1. salesforce_query to fetch Salesforce data.
-      2. filter_unprocessed to filter out already processed records.
-      3. google_ads_upload to upload conversions to Google Ads.
-      4. Partition the upload results into successful and failed conversions.
-      5. store_success to store successful conversion uploads into the database.
-    
-    Logging is added between each step for debugging.
-    
-    Returns:
-        A list of dictionaries representing the stored successful upload records.
-    
+    Returns the state of the in-process scheduler: its current interval, when it runs next
+    and the outcome of its last run.
+    """
+    return PipelineSchedulerRead(enabled=scheduler_enabled(), **pipeline_scheduler.state())
+
+
+@router.get("/pipeline/jobs/{job_id}", response_model=PipelineJobRead)
+async def get_pipeline_job(job_id: str) -> PipelineJobRead:
+    """
+    Returns the status of a pipeline job.
+
     Raises:
-        Any exceptions from the modules invoked will propagate.
+        HTTPException(404): If the job is unknown.
     """
-    logger.info("Starting pipeline orchestration.")
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Pipeline job {job_id} not found.")
+    return PipelineJobRead.model_validate(job)
 
-    # Step 1: Query Salesforce data.
-    sales_data: List[Dict[str, Any]] = query_salesforce()
-    logger.info(f"Fetched {len(sales_data)} records from Salesforce.")
 
-    # Step 2: Filter out already processed records.
-    filtered_data: List[Dict[str, Any]] = filter_unprocessed(sales_data)
-    logger.info(f"{len(sales_data) - len(filtered_data)} records filtered out; {len(filtered_data)} records remain for processing.")
+def _succeeded_job(job_id: str) -> PipelineJob:
+    """
+    Returns a pipeline job that finished successfully.
+
+    Raises:
+        HTTPException(404): If the job is unknown.
+        HTTPException(409): If the job has not finished yet.
+        HTTPException(500): If the job failed; the detail carries the error.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Pipeline job {job_id} not found.")
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=job.error)
+    if job.status != JOB_SUCCEEDED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Pipeline job {job_id} is {job.status}.")
+    return job
+
+
+@router.get("/pipeline/jobs/{job_id}/result", response_model=PipelineRunSummaryRead)
+async def get_pipeline_job_result(job_id: str) -> PipelineRunSummaryRead:
+    """
+    Returns the summary of a finished pipeline job: the counts of fetched, uploaded, stored
+    and failed conversions, per target and in total, and the time spent in each stage.
 
-    # Step 3: Upload conversions to Google Ads.
-    upload_results: List[Dict[str, Any]] = upload_conversions(filtered_data)
-    logger.info(f"Google Ads upload attempted on {len(filtered_data)} records; received {len(upload_results)} upload result(s).")
+    Raises:
+        HTTPException(404): If the job is unknown.
+        HTTPException(409): If the job has not finished yet.
+        HTTPException(500): If the job failed; the detail carries the error.
+    """
+    return PipelineRunSummaryRead.model_validate(_succeeded_job(job_id).result)
 
-    # Step 4: Partition upload results into successful and failed.
-    successful_results, failed_results = partition_upload_results(upload_results)
-    logger.info(f"{len(successful_results)} successful uploads; {len(failed_results)} failed uploads.")
 
-    # Step 5: Prepare and store successful conversion data.
-    if successful_results:
-        store_data: List[Dict[str, Any]] = map_success_to_store_data(successful_results, filtered_data)
-        stored_successes = store_success_records(store_data)
-        logger.info(f"Stored {len(stored_successes)} successful upload record(s) in the database.")
-    else:
-        stored_successes = []
-        logger.info("No successful uploads to store.")
+@router.get("/pipeline/jobs/{job_id}/records", response_class=StreamingResponse)
+async def get_pipeline_job_records(job_id: str) -> StreamingResponse:
+    """
+    Streams the upload_status rows stored by a finished pipeline job as JSON Lines, one
+    UploadStatusRead object per line in id order. The rows are read from the database page by
+    page while the response is written, so the run's records are never held in memory at once.
+    The X-Pipeline-Run-Id header carries the run_id of checkpointed runs, whose records can
+    also be paged through with /upload-status?run_id=<run_id>.
 
-    return [record.__dict__ for record in stored_successes]
+    Raises:
+        HTTPException(404): If the job is unknown.
+        HTTPException(409): If the job has not finished yet.
+        HTTPException(500): If the job failed; the detail carries the error.
+    """
+    return _records_response(_succeeded_job(job_id).result)
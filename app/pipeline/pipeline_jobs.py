@@ -0,0 +1,123 @@
+import os
+import uuid
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle states.
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class JobLimitExceeded(Exception):
+    """
+    Raised when a job is submitted while the maximum number of concurrent jobs is active.
+    """
+
+
+@dataclass
+class PipelineJob:
+    job_id: str
+    key: Optional[str] = None
+    status: str = JOB_PENDING
+    created_at: datetime.datetime = field(default_factory=datetime.datetime.utcnow)
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+    result: Any = None
+    error: Optional[str] = None
+    # Resolved with the result (or exception) of the job when it finishes.
+    future: Future = field(default_factory=Future, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status in (JOB_PENDING, JOB_RUNNING)
+
+
+class JobManager:
+    """
+    Runs pipeline jobs on a worker thread pool and keeps their status and results in memory.
+
+    At most `max_concurrent_jobs` jobs may be pending or running at once (0 means no limit),
+    and only the `history_size` most recent jobs are retained.
+    """
+
+    def __init__(self, max_concurrent_jobs: int = 1, history_size: int = 100) -> None:
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_jobs or 8, thread_name_prefix="pipeline-job")
+        self._jobs: "OrderedDict[str, PipelineJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _run(self, job: PipelineJob, target: Callable[[], Any]) -> None:
+        job.status = JOB_RUNNING
+        job.started_at = datetime.datetime.utcnow()
+        try:
+            job.result = target()
+        except Exception as exc:
+            logger.exception(f"Pipeline job {job.job_id} failed.")
+            job.error = str(exc)
+            job.status = JOB_FAILED
+            job.finished_at = datetime.datetime.utcnow()
+            job.future.set_exception(exc)
+            return
+        job.status = JOB_SUCCEEDED
+        job.finished_at = datetime.datetime.utcnow()
+        job.future.set_result(job.result)
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def submit(self, target: Callable[[], Any], key: Optional[str] = None) -> PipelineJob:
+        """
+        Starts `target` as a new background job, optionally tagged with a `key`
+        identifying the work it does (see find_active).
+
+        Returns:
+            The created PipelineJob.
+
+        Raises:
+            JobLimitExceeded: If the maximum number of concurrent jobs is already active.
+        """
+        with self._lock:
+            if self.max_concurrent_jobs and len(self.active_jobs()) >= self.max_concurrent_jobs:
+                raise JobLimitExceeded(f"{self.max_concurrent_jobs} pipeline job(s) already in progress.")
+            job = PipelineJob(job_id=uuid.uuid4().hex, key=key)
+            self._jobs[job.job_id] = job
+            self._prune()
+            self._executor.submit(self._run, job, target)
+        return job
+
+    def get(self, job_id: str) -> Optional[PipelineJob]:
+        """
+        Returns the job with the given ID, or None if it is unknown or was pruned.
+        """
+        return self._jobs.get(job_id)
+
+    def find_active(self, key: str) -> Optional[PipelineJob]:
+        """
+        Returns the pending or running job submitted with the given key, if any.
+        """
+        return next((job for job in self.active_jobs() if job.key == key), None)
+
+    def active_jobs(self) -> List[PipelineJob]:
+        """
+        Returns the jobs that are pending or running.
+        """
+        return [job for job in list(self._jobs.values()) if job.active]
+
+
+# Shared job manager for the pipeline endpoints.
+job_manager = JobManager(
+    max_concurrent_jobs=int(os.getenv("PIPELINE_MAX_CONCURRENT_JOBS", "1")),
+    history_size=int(os.getenv("PIPELINE_JOB_HISTORY_SIZE", "100")),
+)
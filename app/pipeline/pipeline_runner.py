@@ -0,0 +1,794 @@
+from typing import List, Dict, Any, Tuple, Optional, Iterator, Callable
+import os
+import asyncio
+import itertools
+import contextvars
+import datetime
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.metrics.metrics import PIPELINE_RUNS, capture_profile, collect_stage_timings, profiled, record_stage_records, stage_timer
+from app.models.upload_status import UploadStatus
+from app.models.upload_failure import UploadFailure
+from app.models.opportunity_record import OpportunityRecord
+from app.pipeline.salesforce_query import query_salesforce, iter_salesforce_chunks
+from app.core.database.sql_adaptor import dispose_async_engine
+from app.pipeline.filter_unprocessed import filter_unprocessed, filter_unprocessed_async
+from app.pipeline.google_ads_upload import upload_conversions
+from app.pipeline.store_success import store_success_records, store_success_records_async
+from app.pipeline.store_failure import store_failed_records, load_due_failures, clear_failures
+from app.pipeline.sync_watermark import SALESFORCE_WATERMARK_NAME, get_sync_start, latest_modstamp, save_sync_watermark
+from app.pipeline.run_coordinator import LeaseLost, Partition, check_lease, lease_name
+from app.pipeline.run_checkpoint import RunCheckpoint, checkpoints_enabled, start_run
+from app.pipeline.upload_targets import UploadTarget, assign_targets, load_upload_targets
+from app.pipeline.upload_summary import refresh_daily_summary
+from app.pipeline.upload_status_retention import archive_upload_status, retention_days
+from app.pipeline.enhanced_conversions import enhanced_conversions_enabled, hash_user_identifiers
+from app.pipeline.run_summary import collect_run_summary, current_run_id, record_fetched, record_target_counts, set_run_id
+
+logger = logging.getLogger(__name__)
+
+
+def partition_upload_results(
+    upload_results: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Partitions the upload results into successful and failed conversions.
+
+    Success is determined by the absence of an "error" key in the result.
+    
+    Args:
+        upload_results: List of dictionaries returned by the google_ads_upload module.
+    
+    Returns:
+        A tuple containing two lists:
+         - successful_results: List of dictionaries for successful uploads.
+         - failed_results: List of dictionaries for failed uploads.
+    """
+    successful_results = []
+    failed_results = []
+    for result in upload_results:
+        if "error" in result:
+            failed_results.append(result)
+        else:
+            successful_results.append(result)
+    return successful_results, failed_results
+
+
+def map_success_to_store_data(successful_results: List[Dict[str, Any]], target_name: str) -> List[Dict[str, Any]]:
+    """
+    Prepares the successful upload results for storing in the database, using the
+    OpportunityRecord each result carries under "record".
+
+    The resulting dictionary includes:
+      - salesforce_id: The Opportunity Id from the original record.
+      - target: The name of the upload target.
+      - gclid: The GCLID value.
+      - original_lead_created_datetime: When the lead was created, from the original record.
+      - admission_date: The admission date from the original record.
+      - status: Static string "successful".
+      - error_details: None.
+
+    Args:
+        successful_results: The list of successful upload results from google_ads_upload.
+        target_name: The upload target the results belong to.
+
+    Returns:
+        List of dictionaries ready to be stored using store_success_records.
+    """
+    store_data = []
+    for result in successful_results:
+        original_record: OpportunityRecord = result["record"]
+        store_data.append({
+            "salesforce_id": original_record.salesforce_id,
+            "target": target_name,
+            "gclid": original_record.gclid,
+            "original_lead_created_datetime": original_record.original_lead_created_datetime,
+            "admission_date": original_record.admission_date,
+            "status": "successful",
+            "error_details": None,
+        })
+    return store_data
+
+
+def map_failure_to_store_data(failed_results: List[Dict[str, Any]], target_name: str) -> List[Dict[str, Any]]:
+    """
+    Prepares the failed upload results for the failure queue, using the OpportunityRecord
+    each result carries under "record".
+
+    The resulting dictionary includes salesforce_id, target, gclid, original_lead_created_datetime
+    and admission_date as in map_success_to_store_data, the hashed_email and hashed_phone of
+    enhanced conversions, so that the conversion can be retried without reading Salesforce
+    again, plus the "error" returned by Google Ads.
+
+    Args:
+        failed_results: The list of failed upload results from google_ads_upload.
+        target_name: The upload target the results belong to.
+
+    Returns:
+        List of dictionaries ready to be stored using store_failed_records.
+    """
+    failure_data = []
+    for result in failed_results:
+        original_record: OpportunityRecord = result["record"]
+        failure_data.append({
+            "salesforce_id": original_record.salesforce_id,
+            "target": target_name,
+            "gclid": original_record.gclid,
+            "original_lead_created_datetime": original_record.original_lead_created_datetime,
+            "admission_date": original_record.admission_date,
+            "hashed_email": original_record.hashed_email,
+            "hashed_phone": original_record.hashed_phone,
+            "error": result["error"],
+        })
+    return failure_data
+
+
+def store_upload_results(
+    store_data: List[Dict[str, Any]], failure_data: List[Dict[str, Any]], target_name: str
+) -> List[UploadStatus]:
+    """
+    Queues the failed conversions of an upload target for retry and stores the successful ones,
+    tagged with the pipeline_run of the run in progress, and counts both in the run's summary.
+
+    Args:
+        store_data: The successful conversions, from map_success_to_store_data.
+        failure_data: The failed conversions, from map_failure_to_store_data.
+        target_name: The upload target the results belong to.
+
+    Returns:
+        The UploadStatus records stored for the successful conversions.
+    """
+    # Queue failed conversions for a targeted retry.
+    if failure_data:
+        with stage_timer("store_failure"):
+            queued_failures = store_failed_records(failure_data)
+        _count_queued_failures(queued_failures, target_name)
+
+    # Store successful conversion data.
+    if not store_data:
+        logger.info(f"[{target_name}] No successful uploads to store.")
+        return []
+
+    with stage_timer("store_success"):
+        stored_successes = store_success_records(store_data, run_id=current_run_id())
+    _count_stored_successes(stored_successes, target_name)
+    return stored_successes
+
+
+async def store_upload_results_async(
+    store_data: List[Dict[str, Any]], failure_data: List[Dict[str, Any]], target_name: str
+) -> List[UploadStatus]:
+    """
+    Async version of store_upload_results: the successful conversions are stored on the async
+    engine while the failed ones are queued on a worker thread.
+    """
+    async def queue_failures() -> None:
+        if failure_data:
+            with stage_timer("store_failure"):
+                queued_failures = await asyncio.to_thread(profiled(store_failed_records), failure_data)
+            _count_queued_failures(queued_failures, target_name)
+
+    async def store_successes() -> List[UploadStatus]:
+        if not store_data:
+            logger.info(f"[{target_name}] No successful uploads to store.")
+            return []
+        with stage_timer("store_success"):
+            stored_successes = await store_success_records_async(store_data, run_id=current_run_id())
+        _count_stored_successes(stored_successes, target_name)
+        return stored_successes
+
+    _, stored_successes = await asyncio.gather(queue_failures(), store_successes())
+    return stored_successes
+
+
+def _count_queued_failures(queued_failures: List[UploadFailure], target_name: str) -> None:
+    record_stage_records("store_failure", len(queued_failures))
+    record_target_counts(target_name, failed=len(queued_failures))
+    permanent_count = sum(1 for failure in queued_failures if failure.permanent)
+    logger.info(f"[{target_name}] Queued {len(queued_failures)} failed upload(s) for retry; {permanent_count} will not be retried.")
+
+
+def _count_stored_successes(stored_successes: List[UploadStatus], target_name: str) -> None:
+    record_stage_records("store_success", len(stored_successes))
+    record_target_counts(target_name, stored=len(stored_successes))
+    logger.info(f"[{target_name}] Stored {len(stored_successes)} successful upload record(s) in the database.")
+
+
+def upload_and_store(
+    records: List[OpportunityRecord],
+    target: UploadTarget,
+    checkpoint: Optional[RunCheckpoint] = None,
+    chunk_index: int = 0,
+) -> List[str]:
+    """
+    Uploads the given records to the Google Ads customer and conversion action of an
+    upload target, stores the successful conversions and queues the failed ones for retry.
+
+    With a checkpoint, the upload results are committed to it before they are stored, so a
+    run interrupted in between stores them when it is resumed rather than uploading again.
+
+    Args:
+        records: Salesforce records that have not been uploaded to the target yet.
+        target: The upload target.
+        checkpoint: The checkpoint of the run, if it is checkpointed.
+        chunk_index: The chunk of the run the records belong to.
+
+    Returns:
+        The Salesforce IDs of the conversions Google Ads accepted, including those whose
+        upload_status row already existed and was not inserted again.
+    """
+    store_data, failure_data = upload_target_records(records, target, checkpoint, chunk_index)
+    store_upload_results(store_data, failure_data, target.name)
+    if checkpoint is not None:
+        with stage_timer("checkpoint"):
+            checkpoint.record_stored(chunk_index, target.name)
+    return [data["salesforce_id"] for data in store_data]
+
+
+def upload_target_records(
+    records: List[OpportunityRecord],
+    target: UploadTarget,
+    checkpoint: Optional[RunCheckpoint] = None,
+    chunk_index: int = 0,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    The upload half of upload_and_store: uploads the records to an upload target and, with a
+    checkpoint, commits the results to it.
+
+    Returns:
+        The successful and failed conversions, from map_success_to_store_data and
+        map_failure_to_store_data, ready to be stored.
+    """
+    # Do not upload once another instance may have taken over the run.
+    check_lease()
+
+    # Upload conversions to Google Ads.
+    with stage_timer("upload"):
+        upload_results: List[Dict[str, Any]] = upload_conversions(records, target)
+    record_stage_records("upload", len(upload_results))
+    record_target_counts(target.name, uploaded=len(upload_results))
+    logger.info(f"[{target.name}] Google Ads upload attempted on {len(records)} records; received {len(upload_results)} upload result(s).")
+
+    # Partition upload results into successful and failed.
+    successful_results, failed_results = partition_upload_results(upload_results)
+    logger.info(f"[{target.name}] {len(successful_results)} successful uploads; {len(failed_results)} failed uploads.")
+
+    store_data: List[Dict[str, Any]] = map_success_to_store_data(successful_results, target.name)
+    failure_data: List[Dict[str, Any]] = map_failure_to_store_data(failed_results, target.name)
+    if checkpoint is not None:
+        with stage_timer("checkpoint"):
+            checkpoint.record_uploaded(chunk_index, target.name, store_data, failure_data)
+    return store_data, failure_data
+
+
+def run_for_targets(
+    records_by_target: Dict[str, List[OpportunityRecord]],
+    targets: List[UploadTarget],
+    process: Callable[[List[OpportunityRecord], UploadTarget], List[str]],
+) -> List[str]:
+    """
+    Runs `process` for the records of every upload target, with targets in parallel on up to
+    PIPELINE_TARGET_MAX_WORKERS threads (default: one per target).
+
+    Targets are isolated from each other: a target that fails does not stop the others.
+    Once all targets have finished, the first error is raised so the run is reported as
+    failed and the sync watermark is not advanced past records that were not uploaded.
+
+    Returns:
+        The Salesforce IDs returned by `process` for all targets.
+    """
+    work = [(target, records_by_target.get(target.name, [])) for target in targets]
+    work = [(target, records) for target, records in work if records]
+    if not work:
+        return []
+
+    max_workers = int(os.getenv("PIPELINE_TARGET_MAX_WORKERS", "0")) or len(work)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(work))), thread_name_prefix="pipeline-target") as executor:
+        # Each target runs in a copy of this context so its stages are added to the run's timings
+        # (and, when the run is profiled, its calls to the run's profile).
+        futures = [
+            executor.submit(contextvars.copy_context().run, profiled(process), records, target)
+            for target, records in work
+        ]
+
+    uploaded_ids: List[str] = []
+    errors: List[Exception] = []
+    for (target, _), future in zip(work, futures):
+        try:
+            uploaded_ids.extend(future.result())
+        except Exception as exc:
+            logger.error(f"[{target.name}] Upload target failed: {exc}")
+            errors.append(exc)
+
+    if errors:
+        raise errors[0]
+    return uploaded_ids
+
+
+def process_sales_batch(
+    sales_data: List[OpportunityRecord],
+    targets: List[UploadTarget],
+    checkpoint: Optional[RunCheckpoint] = None,
+    chunk_index: int = 0,
+) -> List[str]:
+    """
+    Runs one batch of Salesforce records through the filter, upload and store stages:
+      1. assign_targets to route the records to the upload targets whose filters they match.
+      2. filter_unprocessed to filter out records already processed for each target.
+         With enhanced conversions, the email addresses and phone numbers of the remaining
+         records are then normalized and hashed in one batch (see hash_user_identifiers).
+      3. google_ads_upload to upload conversions to Google Ads, for all targets in parallel.
+      4. Partition the upload results into successful and failed conversions.
+      5. store_success to store successful conversion uploads into the database,
+         and store_failure to queue failed ones for retry.
+
+    Args:
+        sales_data: Salesforce records as returned by salesforce_query.
+        targets: The upload targets.
+        checkpoint: The checkpoint of the run, if it is checkpointed (see upload_and_store).
+        chunk_index: The chunk of the run the batch is.
+
+    Returns:
+        The Salesforce IDs of the conversions uploaded successfully for this batch, once per target.
+    """
+    # Route the records to their targets and filter out already processed ones in one pass.
+    with stage_timer("filter"):
+        assigned_data = assign_targets(sales_data, targets)
+        filtered_data: Dict[str, List[OpportunityRecord]] = filter_unprocessed(assigned_data)
+    _log_filtered(sales_data, assigned_data, filtered_data, targets)
+
+    # Hash the user identifiers of the records to upload, once across targets.
+    if enhanced_conversions_enabled():
+        _hash_identifiers(filtered_data)
+
+    return run_for_targets(filtered_data, targets, partial(upload_and_store, checkpoint=checkpoint, chunk_index=chunk_index))
+
+
+def _log_filtered(
+    sales_data: List[OpportunityRecord],
+    assigned_data: Dict[str, List[OpportunityRecord]],
+    filtered_data: Dict[str, List[OpportunityRecord]],
+    targets: List[UploadTarget],
+) -> None:
+    record_stage_records("filter", len(sales_data))
+    for target in targets:
+        logger.info(
+            f"[{target.name}] {len(assigned_data[target.name]) - len(filtered_data[target.name])} records filtered out; "
+            f"{len(filtered_data[target.name])} records remain for processing."
+        )
+
+
+def _hash_identifiers(filtered_data: Dict[str, List[OpportunityRecord]]) -> None:
+    with stage_timer("hash_identifiers"):
+        unique_records = {id(record): record for records in filtered_data.values() for record in records}
+        hashed_count = hash_user_identifiers(unique_records.values())
+    record_stage_records("hash_identifiers", len(unique_records))
+    logger.info(f"Hashed the user identifiers of {hashed_count} of {len(unique_records)} records.")
+
+
+def _retry_target(records: List[OpportunityRecord], target: UploadTarget) -> List[str]:
+    """
+    Re-uploads the due failures of one target and removes the successful ones from the queue.
+
+    Failures are cleared for every conversion Google Ads accepted, not only those whose
+    upload_status row was inserted: a conversion whose row already exists (e.g. stored by a
+    run that was interrupted before clearing its failure) would otherwise stay queued forever.
+    """
+    logger.info(f"[{target.name}] Retrying {len(records)} failed upload(s).")
+    uploaded_ids = upload_and_store(records, target)
+    with stage_timer("retry_clear"):
+        clear_failures(uploaded_ids, target.name)
+    return uploaded_ids
+
+
+def retry_failed_uploads(targets: List[UploadTarget], partition: Optional[Partition] = None) -> List[str]:
+    """
+    Re-uploads the queued failures that are due for a retry, up to UPLOAD_RETRY_BATCH_SIZE
+    (default 10000) per run. Permanent failures are never retried. Conversions that succeed
+    are stored and removed from the queue; the others are rescheduled with a longer backoff.
+    Failures of targets that are no longer configured are left in the queue.
+
+    Args:
+        targets: The upload targets.
+        partition: If given, only failures of records in this partition are retried.
+
+    Returns:
+        The Salesforce IDs of the conversions that succeeded on retry.
+    """
+    with stage_timer("retry_load"):
+        due_records = load_due_failures(int(os.getenv("UPLOAD_RETRY_BATCH_SIZE", "10000")))
+    if partition is not None:
+        due_records = {
+            target_name: [record for record in records if partition.contains(record.salesforce_id)]
+            for target_name, records in due_records.items()
+        }
+        due_records = {target_name: records for target_name, records in due_records.items() if records}
+    if not due_records:
+        logger.info("No failed uploads are due for retry.")
+        return []
+
+    configured_names = {target.name for target in targets}
+    for target_name in due_records.keys() - configured_names:
+        logger.warning(f"Skipping {len(due_records[target_name])} failed upload(s) for unknown target '{target_name}'.")
+
+    return run_for_targets(due_records, targets, _retry_target)
+
+
+def _timed_chunks(chunks: Iterator[List[OpportunityRecord]]) -> Iterator[List[OpportunityRecord]]:
+    """
+    Yields the chunks of a lazy Salesforce query, timing each fetch as the "salesforce_fetch" stage.
+    """
+    while True:
+        with stage_timer("salesforce_fetch"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        record_stage_records("salesforce_fetch", len(chunk))
+        record_fetched(len(chunk))
+        yield chunk
+
+
+def run_pipeline(profile: bool = False, partition: Optional[Partition] = None) -> Dict[str, Any]:
+    """
+    Runs the data pipeline synchronously by sequentially invoking:
+      0. Stores the upload results an interrupted run left unstored, when resuming it.
+      1. retry_failed_uploads to re-upload queued failures that are due (unless PIPELINE_RETRY_FAILURES is false).
+      2. salesforce_query to fetch Salesforce data.
+      3. process_sales_batch to filter, upload and store the fetched records.
+      4. Advances the Salesforce sync watermark used by incremental runs.
+      5. refresh_daily_summary to roll the uploads recorded since the run started up into
+         the upload_daily_summary table.
+      6. archive_upload_status to archive upload_status months past the retention period
+         (only when UPLOAD_STATUS_RETENTION_DAYS is set, and only in the first partition of
+         partitioned runs).
+
+    The upload targets (see upload_targets.load_upload_targets) share the Salesforce query
+    and the filter pass; uploads and stores then run per target, in parallel. Stage timings
+    are summed over targets.
+
+    When PIPELINE_STREAMING is enabled, Salesforce result pages are consumed lazily in
+    chunks of PIPELINE_CHUNK_SIZE records (default 2000). Each chunk is filtered, uploaded
+    and committed before the next one is requested, so memory use does not grow with
+    the size of the run. With PIPELINE_ASYNC_DB, the database work runs on the async engine
+    and the results of a chunk are stored while the next chunk is uploaded.
+
+    With a partition, only the records whose Id hashes into it are processed, so several
+    instances can split one run; each partition keeps its own sync watermark.
+
+    Unless PIPELINE_CHECKPOINTS is false, runs are checkpointed (see
+    run_checkpoint.RunCheckpoint): records are queried in Id order and committed chunk by
+    chunk (the streaming chunks, or PIPELINE_CHECKPOINT_SIZE records otherwise), and upload
+    results are committed before they are stored. A run that fails or dies part-way is
+    resumed by the next run of the same partition: it first stores the results that were
+    uploaded but not stored, then continues after the last committed chunk with the
+    original query window.
+
+    Every stage is timed into the /metrics histograms and the per-stage totals of the run
+    are logged at the end.
+
+    The run returns a compact summary rather than the records it stored, so its memory use
+    and response size do not grow with the number of conversions: the counts of fetched,
+    uploaded, stored and failed conversions (per target and in total) and the per-stage
+    timings. The stored upload_status rows are tagged with the run_id of checkpointed runs
+    and can be read back page by page (see upload_status_reader).
+    
+    Logging is added between each step for debugging.
+
+    Args:
+        profile: Capture a cProfile profile of the run (also enabled by PIPELINE_PROFILE).
+        partition: The share of records to process; all records if None.
+    
+    Returns:
+        The run summary (see run_summary.RunSummary.to_dict).
+    
+    Raises:
+        Any exceptions from the modules invoked will propagate.
+    """
+    profile = profile or os.getenv("PIPELINE_PROFILE", "false").lower() in ("1", "true", "yes")
+    with capture_profile(profile, "pipeline"), collect_stage_timings() as timings, collect_run_summary() as summary:
+        try:
+            _run_stages(partition)
+        except Exception:
+            PIPELINE_RUNS.labels("failed").inc()
+            raise
+        PIPELINE_RUNS.labels("succeeded").inc()
+
+    logger.info("Stage timings: " + ", ".join(f"{stage}={seconds:.3f}s" for stage, seconds in timings.items()))
+    return summary.to_dict(timings)
+
+
+def _in_partition(records: List[OpportunityRecord], partition: Optional[Partition]) -> List[OpportunityRecord]:
+    if partition is None:
+        return records
+    return [record for record in records if partition.contains(record.salesforce_id)]
+
+
+def _replay_uploads(checkpoint: RunCheckpoint) -> None:
+    """
+    Stores the upload results that an interrupted run committed to its checkpoint but did not store.
+    """
+    for run_id, chunk_index, target_name, store_data, failure_data in checkpoint.pending_uploads():
+        logger.info(
+            f"[{target_name}] Storing {len(store_data) + len(failure_data)} upload result(s) of chunk {chunk_index} "
+            f"of run {run_id}, uploaded before the run was interrupted."
+        )
+        store_upload_results(store_data, failure_data, target_name)
+        checkpoint.record_stored(chunk_index, target_name, run_id)
+
+
+def _checkpoint_chunks(records: List[OpportunityRecord]) -> Iterator[List[OpportunityRecord]]:
+    """
+    Splits the records of a non-streaming checkpointed run into the chunks it commits, of
+    PIPELINE_CHECKPOINT_SIZE records (default 20000).
+    """
+    checkpoint_size = int(os.getenv("PIPELINE_CHECKPOINT_SIZE", "20000"))
+    for start in range(0, len(records), checkpoint_size):
+        yield records[start:start + checkpoint_size]
+
+
+def _process_salesforce_records(
+    targets: List[UploadTarget],
+    modified_since: Optional[datetime.datetime],
+    partition: Optional[Partition],
+    checkpoint: Optional[RunCheckpoint],
+) -> Optional[datetime.datetime]:
+    """
+    Fetches the Salesforce records of the run and processes them, in chunks when streaming or
+    checkpointed. A checkpointed run queries the records in Id order, starting after the last
+    committed chunk of a resumed run, and commits each chunk once it is stored.
+
+    Returns:
+        The highest SystemModstamp seen by the run.
+    """
+    streaming = os.getenv("PIPELINE_STREAMING", "false").lower() in ("1", "true", "yes")
+    after_id = checkpoint.last_salesforce_id if checkpoint is not None else None
+    order_by_id = checkpoint is not None
+
+    chunks: Iterator[List[OpportunityRecord]]
+    if streaming:
+        chunk_size = int(os.getenv("PIPELINE_CHUNK_SIZE", "2000"))
+        chunks = _timed_chunks(iter_salesforce_chunks(modified_since, chunk_size, targets, after_id, order_by_id))
+    else:
+        with stage_timer("salesforce_fetch"):
+            sales_data: List[OpportunityRecord] = query_salesforce(modified_since, targets, after_id, order_by_id)
+        record_stage_records("salesforce_fetch", len(sales_data))
+        record_fetched(len(sales_data))
+        logger.info(f"Fetched {len(sales_data)} records from Salesforce.")
+        chunks = _checkpoint_chunks(sales_data) if checkpoint is not None else iter([sales_data])
+
+    watermark: Optional[datetime.datetime] = checkpoint.watermark if checkpoint is not None else None
+    first_chunk_index = checkpoint.next_chunk_index if checkpoint is not None else 0
+    log_chunks = streaming or checkpoint is not None
+    if os.getenv("PIPELINE_ASYNC_DB", "false").lower() in ("1", "true", "yes"):
+        return asyncio.run(
+            _process_chunks_async(chunks, targets, partition, checkpoint, first_chunk_index, watermark, log_chunks)
+        )
+
+    for chunk_index, sales_chunk in enumerate(chunks, start=first_chunk_index):
+        check_lease()
+        if log_chunks:
+            logger.info(f"Processing chunk {chunk_index} with {len(sales_chunk)} records from Salesforce.")
+        process_sales_batch(_in_partition(sales_chunk, partition), targets, checkpoint, chunk_index)
+        if checkpoint is not None:
+            with stage_timer("checkpoint"):
+                checkpoint.commit_chunk(chunk_index, sales_chunk)
+        watermark = _later_watermark(watermark, sales_chunk)
+    return watermark
+
+
+def _later_watermark(
+    watermark: Optional[datetime.datetime], sales_chunk: List[OpportunityRecord]
+) -> Optional[datetime.datetime]:
+    chunk_watermark = latest_modstamp(sales_chunk)
+    if chunk_watermark is not None and (watermark is None or chunk_watermark > watermark):
+        return chunk_watermark
+    return watermark
+
+
+async def _process_chunks_async(
+    chunks: Iterator[List[OpportunityRecord]],
+    targets: List[UploadTarget],
+    partition: Optional[Partition],
+    checkpoint: Optional[RunCheckpoint],
+    first_chunk_index: int,
+    watermark: Optional[datetime.datetime],
+    log_chunks: bool,
+) -> Optional[datetime.datetime]:
+    """
+    The chunk loop of _process_salesforce_records when PIPELINE_ASYNC_DB is enabled.
+
+    The filter lookups and the upload_status inserts run on the async engine, and the results
+    of a chunk are stored while the next chunk is fetched, filtered and uploaded, so the
+    database work of one chunk overlaps the Google Ads requests of the next. At most one
+    chunk is being stored at a time, and a checkpointed chunk is only committed once it is
+    stored. Salesforce fetches, uploads and the checkpoint and failure writes keep using their
+    synchronous clients on worker threads.
+
+    Returns:
+        The highest SystemModstamp seen by the run.
+    """
+    pending_store: Optional[asyncio.Task[None]] = None
+    try:
+        for chunk_index in itertools.count(first_chunk_index):
+            sales_chunk: Optional[List[OpportunityRecord]] = await asyncio.to_thread(next, chunks, None)
+            if sales_chunk is None:
+                break
+            check_lease()
+            if log_chunks:
+                logger.info(f"Processing chunk {chunk_index} with {len(sales_chunk)} records from Salesforce.")
+            uploads, errors = await _upload_batch_async(_in_partition(sales_chunk, partition), targets, checkpoint, chunk_index)
+
+            if pending_store is not None:
+                await pending_store
+            # A chunk whose upload failed for a target is stored but not committed, like process_sales_batch.
+            pending_store = asyncio.create_task(
+                _store_batch_async(uploads, checkpoint, chunk_index, None if errors else sales_chunk)
+            )
+            if errors:
+                raise errors[0]
+            watermark = _later_watermark(watermark, sales_chunk)
+
+        if pending_store is not None:
+            await pending_store
+    finally:
+        if pending_store is not None:
+            await asyncio.gather(pending_store, return_exceptions=True)
+        await dispose_async_engine()
+    return watermark
+
+
+async def _upload_batch_async(
+    sales_data: List[OpportunityRecord],
+    targets: List[UploadTarget],
+    checkpoint: Optional[RunCheckpoint],
+    chunk_index: int,
+) -> Tuple[List[Tuple[UploadTarget, List[Dict[str, Any]], List[Dict[str, Any]]]], List[BaseException]]:
+    """
+    The filter and upload stages of process_sales_batch, with the filter lookups on the async
+    engine and the uploads of the targets running in parallel on up to
+    PIPELINE_TARGET_MAX_WORKERS threads, as in run_for_targets.
+
+    Returns:
+        The upload target, successful and failed conversions of every target that uploaded,
+        and the errors of the targets that failed.
+    """
+    with stage_timer("filter"):
+        assigned_data = assign_targets(sales_data, targets)
+        filtered_data = await filter_unprocessed_async(assigned_data)
+    _log_filtered(sales_data, assigned_data, filtered_data, targets)
+
+    if enhanced_conversions_enabled():
+        await asyncio.to_thread(_hash_identifiers, filtered_data)
+
+    work = [(target, filtered_data.get(target.name, [])) for target in targets]
+    work = [(target, records) for target, records in work if records]
+    max_workers = int(os.getenv("PIPELINE_TARGET_MAX_WORKERS", "0")) or len(work)
+    slots = asyncio.Semaphore(max(1, min(max_workers, len(work))))
+
+    async def upload(records: List[OpportunityRecord], target: UploadTarget) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        async with slots:
+            return await asyncio.to_thread(profiled(upload_target_records), records, target, checkpoint, chunk_index)
+
+    results = await asyncio.gather(*(upload(records, target) for target, records in work), return_exceptions=True)
+    uploads: List[Tuple[UploadTarget, List[Dict[str, Any]], List[Dict[str, Any]]]] = []
+    errors: List[BaseException] = []
+    for (target, _), result in zip(work, results):
+        if isinstance(result, BaseException):
+            logger.error(f"[{target.name}] Upload target failed: {result}")
+            errors.append(result)
+        else:
+            uploads.append((target, *result))
+    return uploads, errors
+
+
+async def _store_batch_async(
+    uploads: List[Tuple[UploadTarget, List[Dict[str, Any]], List[Dict[str, Any]]]],
+    checkpoint: Optional[RunCheckpoint],
+    chunk_index: int,
+    sales_chunk: Optional[List[OpportunityRecord]],
+) -> None:
+    """
+    Stores the upload results of a chunk for all targets and, with a checkpoint, records them
+    as stored and commits the chunk (unless sales_chunk is None).
+    """
+    async def store(target: UploadTarget, store_data: List[Dict[str, Any]], failure_data: List[Dict[str, Any]]) -> None:
+        await store_upload_results_async(store_data, failure_data, target.name)
+        if checkpoint is not None:
+            with stage_timer("checkpoint"):
+                await asyncio.to_thread(checkpoint.record_stored, chunk_index, target.name)
+
+    results = await asyncio.gather(*(store(*upload) for upload in uploads), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for (target, _, _), result in zip(uploads, results):
+        if isinstance(result, BaseException):
+            logger.error(f"[{target.name}] Upload target failed: {result}")
+    if errors:
+        raise errors[0]
+
+    if checkpoint is not None and sales_chunk is not None:
+        with stage_timer("checkpoint"):
+            await asyncio.to_thread(checkpoint.commit_chunk, chunk_index, sales_chunk)
+
+
+def _run_stages(partition: Optional[Partition] = None) -> None:
+    """
+    Executes the stages of run_pipeline, counting their work into the run summary of the context.
+    """
+    logger.info("Starting pipeline orchestration" + (f" for {partition.name}." if partition else "."))
+    started_at = datetime.datetime.utcnow()
+
+    targets = load_upload_targets()
+    # Reject invalid retention settings before uploading rather than once the run is done.
+    retention_days()
+    logger.info(f"Uploading to {len(targets)} target(s): {', '.join(target.name for target in targets)}.")
+
+    # Query Salesforce data, incrementally if a recent watermark is available.
+    watermark_name = SALESFORCE_WATERMARK_NAME if partition is None else f"{SALESFORCE_WATERMARK_NAME}:{partition.name}"
+    modified_since = get_sync_start(watermark_name)
+
+    # Resume an interrupted run with its original query window, or record a new one.
+    checkpoint: Optional[RunCheckpoint] = None
+    if checkpoints_enabled():
+        with stage_timer("checkpoint"):
+            checkpoint = start_run(lease_name(partition), modified_since)
+        modified_since, started_at = checkpoint.modified_since, checkpoint.started_at
+        set_run_id(checkpoint.id)
+
+    if modified_since is None:
+        logger.info("Querying Salesforce over the full window.")
+    else:
+        logger.info(f"Querying Salesforce for records modified since {modified_since.isoformat()}.")
+
+    try:
+        _run_sync_stages(targets, modified_since, started_at, watermark_name, partition, checkpoint)
+    except LeaseLost as exc:
+        if checkpoint is not None:
+            checkpoint.abandon(exc)
+        raise
+    except Exception as exc:
+        if checkpoint is not None:
+            checkpoint.finish(exc)
+        raise
+    if checkpoint is not None:
+        checkpoint.finish()
+
+
+def _run_sync_stages(
+    targets: List[UploadTarget],
+    modified_since: Optional[datetime.datetime],
+    started_at: datetime.datetime,
+    watermark_name: str,
+    partition: Optional[Partition],
+    checkpoint: Optional[RunCheckpoint],
+) -> None:
+    """
+    Executes the stages of run_pipeline that follow the start (or resumption) of the run.
+    """
+    # Store the results an interrupted run uploaded but did not store.
+    if checkpoint is not None:
+        with stage_timer("replay"):
+            _replay_uploads(checkpoint)
+
+    # Retry previously failed conversions that are due, before fetching new ones.
+    if os.getenv("PIPELINE_RETRY_FAILURES", "true").lower() in ("1", "true", "yes"):
+        with stage_timer("retry"):
+            retry_failed_uploads(targets, partition)
+
+    watermark = _process_salesforce_records(targets, modified_since, partition, checkpoint)
+
+    # Advance the sync watermark now that the run has completed, unless another instance took it over.
+    check_lease()
+    with stage_timer("watermark"):
+        save_sync_watermark(watermark, full_sync=modified_since is None, started_at=started_at, name=watermark_name)
+
+    # Roll the uploads recorded during this run up into the daily summaries.
+    with stage_timer("summary"):
+        refresh_daily_summary(started_at.date(), targets=targets)
+
+    # Archive upload_status months past the retention period. Partitioned runs leave this
+    # to the first partition, so that instances do not archive the same months concurrently.
+    if (partition is None or partition.index == 0) and retention_days() is not None:
+        with stage_timer("retention"):
+            archive_upload_status()
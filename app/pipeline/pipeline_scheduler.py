@@ -0,0 +1,186 @@
+import os
+import random
+import logging
+import datetime
+import threading
+from functools import partial
+from typing import Any, Dict, Optional, Tuple
+
+from app.pipeline.pipeline_jobs import JOB_FAILED, JobLimitExceeded, PipelineJob
+from app.pipeline.pipeline_runner import run_pipeline
+from app.pipeline.run_coordinator import LeaseUnavailable, all_partitions, start_or_join
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of scheduled runs.
+RUN_SUCCEEDED = "succeeded"
+RUN_FAILED = "failed"
+RUN_SKIPPED = "skipped"
+
+
+class PipelineScheduler:
+    """
+    Runs the pipeline periodically on a background thread, adapting the interval to the backlog.
+
+    After a run that stored at least `busy_records` conversions the interval is halved (down to
+    `min_interval`); after a run that stored nothing, or failed, it is doubled (up to
+    `max_interval`). Each wait is randomized by +/- `jitter` (a fraction of the interval) so
+    that instances do not fire in lockstep. Runs go through run_coordinator.start_or_join, so
+    at most one run is in progress at a time: a run already started through /pipeline is
+    joined, and a run held by another instance is skipped. When the pipeline is partitioned
+    (PIPELINE_PARTITIONS), each scheduled run takes the first free partition, starting from a
+    random one, so that the instances' schedulers share the partitions between them.
+    """
+
+    def __init__(
+        self,
+        min_interval: float,
+        max_interval: float,
+        initial_interval: float,
+        busy_records: int,
+        jitter: float,
+    ) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.interval = min(max(initial_interval, self.min_interval), self.max_interval)
+        self.busy_records = busy_records
+        self.jitter = jitter
+        self.next_run_at: Optional[datetime.datetime] = None
+        self.last_run_started_at: Optional[datetime.datetime] = None
+        self.last_run_finished_at: Optional[datetime.datetime] = None
+        self.last_run_status: Optional[str] = None
+        self.last_run_records: Optional[int] = None
+        self.last_job_id: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Starts the scheduler thread; the first run happens after one (jittered) interval.
+        """
+        if self.running:
+            return
+        self._stop.clear()
+        first_run_at = self._schedule_next()
+        self._thread = threading.Thread(target=self._loop, name="pipeline-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Pipeline scheduler started; first run at {first_run_at.isoformat()}Z.")
+
+    def stop(self) -> None:
+        """
+        Stops the scheduler thread. A run in progress is left to finish on its job thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.next_run_at = None
+
+    def _schedule_next(self) -> datetime.datetime:
+        """
+        Sets and returns the time of the next run, one jittered interval from now.
+        """
+        delay = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+        next_run_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=max(delay, 0.0))
+        self.next_run_at = next_run_at
+        return next_run_at
+
+    def _loop(self) -> None:
+        # stop() clears next_run_at, so the loop keeps its own copy of the time it waits for.
+        next_run_at = self.next_run_at or self._schedule_next()
+        while not self._stop.wait(max((next_run_at - datetime.datetime.utcnow()).total_seconds(), 0.0)):
+            self.run_once()
+            next_run_at = self._schedule_next()
+            logger.info(f"Next scheduled pipeline run in {self.interval:.0f}s (at {next_run_at.isoformat()}Z).")
+
+    def run_once(self) -> None:
+        """
+        Runs (or joins) the pipeline, waits for it to finish and adapts the interval.
+        """
+        self.last_run_started_at = datetime.datetime.utcnow()
+        self.last_error = None
+        try:
+            job, joined = self._start_job()
+        except (LeaseUnavailable, JobLimitExceeded) as exc:
+            logger.info(f"Skipping scheduled pipeline run: {exc}")
+            self._record(RUN_SKIPPED, None, str(exc))
+            return
+
+        self.last_job_id = job.job_id
+        logger.info(f"{'Joined' if joined else 'Started'} scheduled pipeline job {job.job_id}.")
+        try:
+            stored_count = job.future.result()["stored"]
+        except Exception as exc:
+            self._record(RUN_FAILED, None, job.error if job.status == JOB_FAILED else str(exc))
+            self.interval = min(self.interval * 2, self.max_interval)
+            return
+
+        self._record(RUN_SUCCEEDED, stored_count, None)
+        if stored_count >= self.busy_records:
+            self.interval = max(self.interval / 2, self.min_interval)
+        elif not stored_count:
+            self.interval = min(self.interval * 2, self.max_interval)
+
+    def _start_job(self) -> Tuple[PipelineJob, bool]:
+        """
+        Starts or joins a run of the first partition whose lease is free, starting from a random one.
+
+        Raises:
+            LeaseUnavailable: If other instances hold the leases of all partitions.
+            JobLimitExceeded: If PIPELINE_MAX_CONCURRENT_JOBS jobs are already in progress.
+        """
+        partitions = all_partitions()
+        offset = random.randrange(len(partitions))
+        partitions = partitions[offset:] + partitions[:offset]
+        for partition in partitions[:-1]:
+            try:
+                return start_or_join(partition, partial(run_pipeline, partition=partition))
+            except LeaseUnavailable as exc:
+                logger.info(f"Trying the next partition: {exc}")
+        return start_or_join(partitions[-1], partial(run_pipeline, partition=partitions[-1]))
+
+    def _record(self, status: str, records: Optional[int], error: Optional[str]) -> None:
+        self.last_run_finished_at = datetime.datetime.utcnow()
+        self.last_run_status = status
+        self.last_run_records = records
+        self.last_error = error
+
+    def state(self) -> Dict[str, Any]:
+        """
+        Returns the scheduler state for the /pipeline/scheduler endpoint.
+        """
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "min_interval_seconds": self.min_interval,
+            "max_interval_seconds": self.max_interval,
+            "next_run_at": self.next_run_at,
+            "last_run_started_at": self.last_run_started_at,
+            "last_run_finished_at": self.last_run_finished_at,
+            "last_run_status": self.last_run_status,
+            "last_run_records": self.last_run_records,
+            "last_job_id": self.last_job_id,
+            "last_error": self.last_error,
+        }
+
+
+def scheduler_enabled() -> bool:
+    """
+    Returns whether the in-process scheduler should run (PIPELINE_SCHEDULER_ENABLED, default false).
+    """
+    return os.getenv("PIPELINE_SCHEDULER_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+# Shared scheduler, started by create_app when enabled.
+pipeline_scheduler = PipelineScheduler(
+    min_interval=float(os.getenv("PIPELINE_SCHEDULER_MIN_INTERVAL_SECONDS", "60")),
+    max_interval=float(os.getenv("PIPELINE_SCHEDULER_MAX_INTERVAL_SECONDS", "3600")),
+    initial_interval=float(os.getenv("PIPELINE_SCHEDULER_INITIAL_INTERVAL_SECONDS", "300")),
+    busy_records=int(os.getenv("PIPELINE_SCHEDULER_BUSY_RECORDS", "1000")),
+    jitter=float(os.getenv("PIPELINE_SCHEDULER_JITTER", "0.1")),
+)
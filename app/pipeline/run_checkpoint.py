@@ -0,0 +1,281 @@
+import os
+import json
+import logging
+import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+
+from app.core.database.sql_adaptor import SessionLocal
+from app.models.pipeline_run import PipelineRun
+from app.models.pipeline_run_chunk import PipelineRunChunk
+from app.models.opportunity_record import OpportunityRecord
+from app.pipeline.sync_watermark import latest_modstamp
+
+logger = logging.getLogger(__name__)
+
+# Statuses of pipeline_run rows.
+RUN_RUNNING = "running"
+RUN_SUCCEEDED = "succeeded"
+RUN_FAILED = "failed"
+RUN_ABANDONED = "abandoned"
+
+# Statuses of pipeline_run_chunk rows.
+CHUNK_UPLOADED = "uploaded"
+CHUNK_STORED = "stored"
+
+
+def checkpoints_enabled() -> bool:
+    """
+    Returns whether runs are checkpointed (PIPELINE_CHECKPOINTS, default true).
+    """
+    return os.getenv("PIPELINE_CHECKPOINTS", "true").lower() in ("1", "true", "yes")
+
+
+def _serialize(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class RunCheckpoint:
+    """
+    The progress of one pipeline run, committed to the pipeline_run and pipeline_run_chunk
+    tables as the run goes, so that a run interrupted by a crash or a timeout is resumed by
+    the next run instead of starting over.
+
+    Records are fetched from Salesforce in Id order and processed in chunks. For each chunk
+    and upload target, the upload results are committed as soon as Google Ads returns them
+    (status "uploaded", with the results as payload), and marked "stored" once the
+    upload_status and upload_failure rows are written. When every target has stored its
+    results, the chunk is committed: the run's cursor moves to the chunk's last Salesforce Id.
+
+    A resumed run first stores the results of chunks that were uploaded but not stored, so
+    those conversions are not uploaded again, then queries the records after the cursor with
+    the original run's query window.
+    """
+
+    def __init__(self, run: PipelineRun, resumed: bool) -> None:
+        self.id: int = run.id
+        self.name: str = run.name
+        self.resumed = resumed
+        self.modified_since: Optional[datetime.datetime] = run.modified_since
+        self.started_at: datetime.datetime = run.started_at
+        self.last_salesforce_id: Optional[str] = run.last_salesforce_id
+        self.watermark: Optional[datetime.datetime] = run.watermark
+        self.next_chunk_index: int = run.chunks_committed
+        self.records_committed: int = run.records_committed
+        self.resumed_count: int = run.resumed_count
+
+    def record_uploaded(
+        self,
+        chunk_index: int,
+        target_name: str,
+        success_data: List[Dict[str, Any]],
+        failure_data: List[Dict[str, Any]],
+    ) -> None:
+        """
+        Commits the upload results of a chunk for one target, before they are stored.
+
+        Args:
+            chunk_index: The chunk the results belong to.
+            target_name: The upload target.
+            success_data: The successful conversions, as passed to store_success_records.
+            failure_data: The failed conversions, as passed to store_failed_records.
+        """
+        payload = json.dumps({"successes": success_data, "failures": failure_data}, default=_serialize)
+        with SessionLocal() as session:
+            # A resumed run processes the chunk after its last committed one again, under the same index.
+            session.merge(PipelineRunChunk(
+                run_id=self.id,
+                chunk_index=chunk_index,
+                target=target_name,
+                status=CHUNK_UPLOADED,
+                uploaded_count=len(success_data),
+                failed_count=len(failure_data),
+                payload=payload,
+                updated_at=datetime.datetime.utcnow(),
+            ))
+            session.commit()
+
+    def record_stored(self, chunk_index: int, target_name: str, run_id: Optional[int] = None) -> None:
+        """
+        Marks the upload results of a chunk for one target as stored, dropping their payload.
+
+        Args:
+            chunk_index: The chunk the results belong to.
+            target_name: The upload target.
+            run_id: The run the chunk belongs to, if not this one (see pending_uploads).
+        """
+        with SessionLocal() as session:
+            session.execute(
+                update(PipelineRunChunk)
+                .where(
+                    PipelineRunChunk.run_id == (run_id if run_id is not None else self.id),
+                    PipelineRunChunk.chunk_index == chunk_index,
+                    PipelineRunChunk.target == target_name,
+                )
+                .values(status=CHUNK_STORED, payload=None, updated_at=datetime.datetime.utcnow())
+            )
+            session.commit()
+
+    def pending_uploads(self) -> List[Tuple[int, int, str, List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """
+        Returns the upload results that were committed but not stored, by this run or by
+        earlier runs of the same name that were abandoned, oldest first.
+
+        Returns:
+            Tuples of run ID, chunk index, target name, successful conversions and failed conversions.
+        """
+        with SessionLocal() as session:
+            chunks = session.scalars(
+                select(PipelineRunChunk)
+                .join(PipelineRun, PipelineRun.id == PipelineRunChunk.run_id)
+                .where(PipelineRun.name == self.name, PipelineRunChunk.status == CHUNK_UPLOADED)
+                .order_by(PipelineRunChunk.run_id, PipelineRunChunk.chunk_index, PipelineRunChunk.target)
+            ).all()
+        pending = []
+        for chunk in chunks:
+            # Uploaded chunks always carry their results; they are only cleared once stored.
+            payload = json.loads(chunk.payload or "{}")
+            pending.append((chunk.run_id, chunk.chunk_index, chunk.target, payload.get("successes", []), payload.get("failures", [])))
+        return pending
+
+    def commit_chunk(self, chunk_index: int, records: List[OpportunityRecord]) -> None:
+        """
+        Moves the run's cursor past a chunk whose results were stored for every target.
+
+        Args:
+            chunk_index: The chunk.
+            records: All Salesforce records of the chunk, in Id order, before any partition filter.
+        """
+        chunk_watermark = latest_modstamp(records)
+        if chunk_watermark is not None and (self.watermark is None or chunk_watermark > self.watermark):
+            self.watermark = chunk_watermark
+        if records:
+            self.last_salesforce_id = records[-1].salesforce_id
+        self.next_chunk_index = chunk_index + 1
+        self.records_committed += len(records)
+
+        with SessionLocal() as session:
+            session.execute(
+                update(PipelineRun)
+                .where(PipelineRun.id == self.id)
+                .values(
+                    last_salesforce_id=self.last_salesforce_id,
+                    watermark=self.watermark,
+                    chunks_committed=self.next_chunk_index,
+                    records_committed=self.records_committed,
+                    updated_at=datetime.datetime.utcnow(),
+                )
+            )
+            session.commit()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """
+        Records the outcome of the run. A failed run keeps its chunks, to be resumed by the
+        next run; a successful one no longer needs them, nor those of the abandoned runs
+        whose results it stored.
+
+        Args:
+            error: The exception that made the run fail, or None if it succeeded.
+        """
+        now = datetime.datetime.utcnow()
+        with SessionLocal() as session:
+            session.execute(
+                update(PipelineRun)
+                .where(PipelineRun.id == self.id)
+                .values(
+                    status=RUN_FAILED if error is not None else RUN_SUCCEEDED,
+                    error=repr(error) if error is not None else None,
+                    updated_at=now,
+                    finished_at=now,
+                )
+            )
+            if error is None:
+                abandoned_runs = select(PipelineRun.id).where(PipelineRun.name == self.name, PipelineRun.status == RUN_ABANDONED)
+                session.execute(
+                    delete(PipelineRunChunk).where(
+                        (PipelineRunChunk.run_id == self.id) | PipelineRunChunk.run_id.in_(abandoned_runs)
+                    )
+                )
+            session.commit()
+
+    def abandon(self, error: BaseException) -> None:
+        """
+        Marks the run abandoned after it lost its lease, so that it is not resumed: another
+        instance may have started over in the meantime. Its uploaded but unstored results are
+        still stored by the next run. A run that another instance has resumed since (and so
+        owns now) is left alone.
+
+        Args:
+            error: The exception that stopped the run.
+        """
+        now = datetime.datetime.utcnow()
+        with SessionLocal() as session:
+            abandoned = session.execute(
+                update(PipelineRun)
+                .where(
+                    PipelineRun.id == self.id,
+                    PipelineRun.status == RUN_RUNNING,
+                    PipelineRun.resumed_count == self.resumed_count,
+                )
+                .values(status=RUN_ABANDONED, error=repr(error), updated_at=now, finished_at=now)
+            ).rowcount
+            session.commit()
+        if not abandoned:
+            logger.warning(f"Pipeline run {self.id} was resumed by another instance; leaving it running.")
+
+
+def start_run(name: str, modified_since: Optional[datetime.datetime]) -> RunCheckpoint:
+    """
+    Resumes the last unfinished run of the given name, or starts a new one.
+
+    A run is unfinished when it failed or never finished (its process died). It is resumed
+    if it started less than PIPELINE_RESUME_MAX_AGE_HOURS ago (default 24); older unfinished
+    runs are marked abandoned, since their query window has moved on, and a new run starts;
+    their uploaded but unstored results are still stored by the new run.
+    Callers must hold the run lease of `name`, so that no live run is resumed twice.
+
+    Args:
+        name: Name of the run, e.g. run_coordinator.lease_name(partition).
+        modified_since: SystemModstamp lower bound for a new run; a resumed run keeps its own.
+
+    Returns:
+        The checkpoint of the resumed or new run.
+    """
+    now = datetime.datetime.utcnow()
+    max_age = datetime.timedelta(hours=float(os.getenv("PIPELINE_RESUME_MAX_AGE_HOURS", "24")))
+
+    with SessionLocal(expire_on_commit=False) as session:
+        unfinished = session.scalars(
+            select(PipelineRun)
+            .where(PipelineRun.name == name, PipelineRun.status.in_((RUN_RUNNING, RUN_FAILED)))
+            .order_by(PipelineRun.started_at.desc(), PipelineRun.id.desc())
+        ).all()
+
+        run: Optional[PipelineRun] = None
+        for candidate in unfinished:
+            if run is None and now - candidate.started_at < max_age:
+                run = candidate
+                run.status = RUN_RUNNING
+                run.resumed_count += 1
+                run.finished_at = None
+            else:
+                candidate.status = RUN_ABANDONED
+                candidate.finished_at = now
+
+        resumed = run is not None
+        if run is None:
+            run = PipelineRun(name=name, status=RUN_RUNNING, modified_since=modified_since, started_at=now, updated_at=now,
+                              chunks_committed=0, records_committed=0, resumed_count=0)
+            session.add(run)
+        session.commit()
+
+    checkpoint = RunCheckpoint(run, resumed)
+    if resumed:
+        logger.info(
+            f"Resuming pipeline run {run.id} ('{name}', started {run.started_at.isoformat()}Z) after "
+            f"{run.chunks_committed} committed chunk(s) and {run.records_committed} record(s)."
+        )
+    return checkpoint
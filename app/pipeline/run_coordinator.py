@@ -0,0 +1,285 @@
+import os
+import uuid
+import zlib
+import socket
+import logging
+import datetime
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.database.sql_adaptor import SessionLocal
+from app.models.pipeline_lease import PipelineLease
+from app.pipeline.pipeline_jobs import PipelineJob, JobLimitExceeded, job_manager
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in lease rows.
+INSTANCE_ID = os.getenv("PIPELINE_INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+# Serializes starting jobs in this process, so concurrent triggers join the same job.
+_start_lock = threading.Lock()
+
+# The lease held by the pipeline job running in the current context, if any.
+_current_lease: ContextVar[Optional["RunLease"]] = ContextVar("run_lease", default=None)
+
+
+class LeaseUnavailable(Exception):
+    """
+    Raised when a run lease is held by another instance.
+    """
+
+
+class LeaseLost(Exception):
+    """
+    Raised by check_lease when the run lease of the job in progress was lost or has lapsed.
+    """
+
+
+@dataclass(frozen=True)
+class Partition:
+    """
+    A share of the Salesforce records, selected by a stable hash of their Id, so that several
+    instances can split one large run: partition `index` of `count` (0 <= index < count).
+    """
+    index: int
+    count: int
+
+    def __post_init__(self) -> None:
+        if self.count < 1 or not 0 <= self.index < self.count:
+            raise ValueError(f"Invalid partition {self.index} of {self.count}.")
+
+    @property
+    def name(self) -> str:
+        return f"partition-{self.index}-of-{self.count}"
+
+    def contains(self, salesforce_id: str) -> bool:
+        return zlib.crc32(salesforce_id.encode()) % self.count == self.index
+
+
+def partition_count() -> int:
+    """
+    Returns the number of partitions the pipeline is split into (PIPELINE_PARTITIONS, default 1).
+
+    The count is fixed by configuration rather than chosen per trigger, because each partition
+    has its own lease: runs with different counts (or an unpartitioned run next to
+    partitioned ones) would hold different leases over overlapping records.
+    """
+    count = int(os.getenv("PIPELINE_PARTITIONS", "1"))
+    if count < 1:
+        raise ValueError(f"PIPELINE_PARTITIONS must be at least 1, got {count}.")
+    return count
+
+
+def resolve_partition(index: Optional[int], count: Optional[int]) -> Optional[Partition]:
+    """
+    Returns the partition requested by a trigger, checked against PIPELINE_PARTITIONS.
+
+    Args:
+        index: The 0-based partition to run, or None for an unpartitioned run.
+        count: The number of partitions the trigger expects; must be given with `index`.
+
+    Returns:
+        The partition, or None when the pipeline is not partitioned (a single partition is the
+        whole pipeline).
+
+    Raises:
+        ValueError: If only one of index and count is given, the count does not match
+            PIPELINE_PARTITIONS, the index is out of range, or no partition is given while the
+            pipeline is partitioned.
+    """
+    configured = partition_count()
+    if index is None and count is None:
+        if configured > 1:
+            raise ValueError(f"The pipeline is split into {configured} partitions (PIPELINE_PARTITIONS); a partition must be given.")
+        return None
+    if index is None or count is None:
+        raise ValueError("partition and partitions must be given together.")
+    if count != configured:
+        raise ValueError(f"partitions must be {configured} (PIPELINE_PARTITIONS), got {count}.")
+    partition = Partition(index, count)
+    return partition if count > 1 else None
+
+
+def all_partitions() -> List[Optional[Partition]]:
+    """
+    Returns the partitions of the pipeline under PIPELINE_PARTITIONS: [None] when it is not partitioned.
+    """
+    count = partition_count()
+    return [None] if count == 1 else [Partition(index, count) for index in range(count)]
+
+
+def lease_name(partition: Optional[Partition]) -> str:
+    """
+    Returns the name of the lease guarding runs of the given partition (or of unpartitioned runs).
+    """
+    return "pipeline" if partition is None else f"pipeline:{partition.name}"
+
+
+class RunLease:
+    """
+    A time-limited lease on a pipeline run, stored as a row in the pipeline_lease table so that
+    it works on any database and across instances.
+
+    The lease lapses after PIPELINE_LEASE_TTL_SECONDS (default 300) unless renewed, so a crashed
+    instance cannot block runs for longer than that. While held, it is renewed by a heartbeat
+    thread every PIPELINE_LEASE_HEARTBEAT_SECONDS (default a third of the TTL).
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.owner = f"{INSTANCE_ID}/{uuid.uuid4().hex[:8]}"
+        self.ttl = datetime.timedelta(seconds=float(os.getenv("PIPELINE_LEASE_TTL_SECONDS", "300")))
+        self.heartbeat_interval = float(os.getenv("PIPELINE_LEASE_HEARTBEAT_SECONDS", "0")) or self.ttl.total_seconds() / 3
+        self.lost = False
+        self.expires_at: Optional[datetime.datetime] = None
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def acquire(self) -> None:
+        """
+        Takes the lease if it is free or has lapsed, and starts renewing it.
+
+        Raises:
+            LeaseUnavailable: If another owner holds an unexpired lease.
+        """
+        now = datetime.datetime.utcnow()
+        expires_at = now + self.ttl
+        values = {"owner": self.owner, "acquired_at": now, "heartbeat_at": now, "expires_at": expires_at}
+        with SessionLocal() as session:
+            # Take over a lapsed lease; the expiry condition makes this safe against concurrent takeovers.
+            taken_over = session.execute(
+                update(PipelineLease)
+                .where(PipelineLease.name == self.name, PipelineLease.expires_at < now)
+                .values(**values)
+            ).rowcount
+            if not taken_over:
+                session.add(PipelineLease(name=self.name, **values))
+            try:
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+                holder = session.get(PipelineLease, self.name)
+                raise LeaseUnavailable(
+                    f"Pipeline run '{self.name}' is in progress on {holder.owner if holder else 'another instance'}"
+                    + (f" (lease expires {holder.expires_at.isoformat()}Z)." if holder else ".")
+                )
+        self.expires_at = expires_at
+
+        self._heartbeat = threading.Thread(target=self._renew_until_released, name=f"lease-{self.name}", daemon=True)
+        self._heartbeat.start()
+
+    def _renew_until_released(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                if not self.renew():
+                    self.lost = True
+                    logger.error(f"Lease on pipeline run '{self.name}' was lost; another instance may start the same run.")
+                    return
+            except Exception:
+                logger.exception(f"Failed to renew the lease on pipeline run '{self.name}'.")
+
+    def renew(self) -> bool:
+        """
+        Extends the lease by its TTL.
+
+        Returns:
+            False if the lease is no longer held by this owner.
+        """
+        now = datetime.datetime.utcnow()
+        with SessionLocal() as session:
+            renewed = session.execute(
+                update(PipelineLease)
+                .where(PipelineLease.name == self.name, PipelineLease.owner == self.owner)
+                .values(heartbeat_at=now, expires_at=now + self.ttl)
+            ).rowcount
+            session.commit()
+        if renewed:
+            self.expires_at = now + self.ttl
+        return bool(renewed)
+
+    @property
+    def held(self) -> bool:
+        """
+        Whether the lease is still held: it was acquired, renewals have not found it taken
+        over, and it has not lapsed (e.g. because the database was unreachable for a whole TTL).
+        """
+        return not self.lost and self.expires_at is not None and datetime.datetime.utcnow() < self.expires_at
+
+    def release(self) -> None:
+        """
+        Stops the heartbeat and frees the lease, if still held by this owner.
+        """
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        with SessionLocal() as session:
+            session.execute(delete(PipelineLease).where(PipelineLease.name == self.name, PipelineLease.owner == self.owner))
+            session.commit()
+
+
+def check_lease() -> None:
+    """
+    Stops the pipeline job in progress if it no longer holds its run lease, since another
+    instance may then have started the same run. Long-running jobs call this between units
+    of work (chunks, upload targets); outside of a job started by start_or_join it does nothing.
+
+    Raises:
+        LeaseLost: If the lease of the job was lost or has lapsed.
+    """
+    lease = _current_lease.get()
+    if lease is not None and not lease.held:
+        raise LeaseLost(f"Lease on pipeline run '{lease.name}' was lost; stopping the run.")
+
+
+def _run_with_lease(lease: RunLease, target: Callable[[], Any]) -> Any:
+    token = _current_lease.set(lease)
+    try:
+        return target()
+    finally:
+        _current_lease.reset(token)
+        lease.release()
+
+
+def start_or_join(partition: Optional[Partition], target: Callable[[], Any]) -> Tuple[PipelineJob, bool]:
+    """
+    Starts `target` as a pipeline job holding the run lease for `partition`, or joins the job
+    already running it in this process.
+
+    Triggers in other instances are rejected while the lease is held, so the same records
+    are never filtered and uploaded by two runs at once. Should the lease be lost anyway
+    (its heartbeat failed for longer than the TTL), the job stops at its next check_lease
+    call and fails with LeaseLost.
+
+    Returns:
+        The job, and whether it was already in progress.
+
+    Raises:
+        ValueError: If `partition` does not match PIPELINE_PARTITIONS (see resolve_partition).
+        LeaseUnavailable: If another instance holds the lease.
+        JobLimitExceeded: If PIPELINE_MAX_CONCURRENT_JOBS jobs are already in progress.
+    """
+    # Only partitions of the configured count are mutually exclusive through their leases.
+    if partition not in all_partitions():
+        raise ValueError(
+            f"Cannot run {partition.name if partition is not None else 'the unpartitioned pipeline'}: "
+            f"the pipeline is split into {partition_count()} partition(s) (PIPELINE_PARTITIONS)."
+        )
+    name = lease_name(partition)
+    with _start_lock:
+        job = job_manager.find_active(name)
+        if job is not None:
+            return job, True
+
+        lease = RunLease(name)
+        lease.acquire()
+        try:
+            job = job_manager.submit(lambda: _run_with_lease(lease, target), key=name)
+        except JobLimitExceeded:
+            lease.release()
+            raise
+        return job, False
@@ -0,0 +1,114 @@
+import datetime
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+# Counters of the pipeline run in progress in the current context, if any.
+_current_summary: ContextVar[Optional["RunSummary"]] = ContextVar("run_summary", default=None)
+
+
+class RunSummary:
+    """
+    What one pipeline run did: the records it fetched from Salesforce and, per upload target,
+    the conversions it uploaded, stored and queued for retry. It is the compact result of
+    run_pipeline, returned by /pipeline instead of the stored records themselves, which are
+    read back from upload_status by run_id (see upload_status_reader).
+
+    The upload targets of a run are processed on several threads; the counters are updated
+    under a lock.
+    """
+
+    def __init__(self) -> None:
+        self.run_id: Optional[int] = None
+        self.started_at = datetime.datetime.utcnow()
+        self.finished_at: Optional[datetime.datetime] = None
+        self.fetched = 0
+        self.targets: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add_fetched(self, count: int) -> None:
+        with self._lock:
+            self.fetched += count
+
+    def add_target_counts(self, target_name: str, uploaded: int = 0, stored: int = 0, failed: int = 0) -> None:
+        with self._lock:
+            counts = self.targets.setdefault(target_name, {"uploaded": 0, "stored": 0, "failed": 0})
+            counts["uploaded"] += uploaded
+            counts["stored"] += stored
+            counts["failed"] += failed
+
+    def to_dict(self, stage_seconds: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Returns the summary as served by /pipeline (see PipelineRunSummaryRead).
+
+        Args:
+            stage_seconds: The total time per stage of the run, from collect_stage_timings.
+        """
+        with self._lock:
+            targets = {name: dict(counts) for name, counts in self.targets.items()}
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "fetched": self.fetched,
+            "uploaded": sum(counts["uploaded"] for counts in targets.values()),
+            "stored": sum(counts["stored"] for counts in targets.values()),
+            "failed": sum(counts["failed"] for counts in targets.values()),
+            "targets": targets,
+            "stage_seconds": dict(stage_seconds),
+        }
+
+
+@contextmanager
+def collect_run_summary() -> Iterator[RunSummary]:
+    """
+    Collects the counts recorded with record_fetched and record_target_counts in this context,
+    including the threads started with a copy of it.
+
+    Yields:
+        The summary of the run, completed with its finish time when the context exits.
+    """
+    summary = RunSummary()
+    token = _current_summary.set(summary)
+    try:
+        yield summary
+    finally:
+        summary.finished_at = datetime.datetime.utcnow()
+        _current_summary.reset(token)
+
+
+def current_run_id() -> Optional[int]:
+    """
+    Returns the ID of the pipeline_run row of the run in progress, or None outside of a run
+    or when the run is not checkpointed.
+    """
+    summary = _current_summary.get()
+    return summary.run_id if summary is not None else None
+
+
+def set_run_id(run_id: int) -> None:
+    """
+    Sets the ID of the pipeline_run row of the run in progress, once the run is recorded.
+    """
+    summary = _current_summary.get()
+    if summary is not None:
+        summary.run_id = run_id
+
+
+def record_fetched(count: int) -> None:
+    """
+    Counts records fetched from Salesforce by the run in progress.
+    """
+    summary = _current_summary.get()
+    if summary is not None:
+        summary.add_fetched(count)
+
+
+def record_target_counts(target_name: str, uploaded: int = 0, stored: int = 0, failed: int = 0) -> None:
+    """
+    Counts conversions uploaded, stored and queued for retry for an upload target by the run in progress.
+    """
+    summary = _current_summary.get()
+    if summary is not None:
+        summary.add_target_counts(target_name, uploaded, stored, failed)
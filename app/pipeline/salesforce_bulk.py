@@ -0,0 +1,212 @@
+import io
+import os
+import csv
+import time
+import logging
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app.core.http_client import http_client
+from app.core.metrics.metrics import http_timer
+
+logger = logging.getLogger(__name__)
+
+# Salesforce REST API version used for Bulk API 2.0 query jobs.
+SALESFORCE_API_VERSION = "55.0"
+
+# Terminal Bulk API 2.0 job states.
+BULK_JOB_COMPLETE = "JobComplete"
+BULK_JOB_FAILED_STATES = ("Failed", "Aborted")
+
+
+class SalesforceBulkQueryError(Exception):
+    """
+    Raised when a Bulk API 2.0 query job fails, is aborted or does not finish in time.
+    """
+
+
+def _headers(access_token: str, accept: str = "application/json") -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json",
+        "Accept": accept,
+    }
+
+
+def _check_response(response: Any, url: str, operation: str) -> None:
+    """
+    Raises SalesforceExpiredSession for rejected sessions, so callers can retry with a new
+    token, and the requests HTTPError for other error responses.
+    """
+    if response.status_code == 401:
+        from simple_salesforce.exceptions import SalesforceExpiredSession  # type: ignore[import-untyped]
+        raise SalesforceExpiredSession(url, response.status_code, operation, response.content)
+    response.raise_for_status()
+
+
+def create_query_job(instance_url: str, access_token: str, soql_query: str) -> str:
+    """
+    Submits a Bulk API 2.0 query job.
+
+    Returns:
+        The job ID.
+
+    Raises:
+        SalesforceExpiredSession: If Salesforce rejects the session.
+        One of http_client.HTTP_ERRORS if the request fails.
+    """
+    url = f"{instance_url}/services/data/v{SALESFORCE_API_VERSION}/jobs/query"
+    payload = {"operation": "query", "query": soql_query, "contentType": "CSV", "columnDelimiter": "COMMA", "lineEnding": "LF"}
+    with http_timer("salesforce", "bulk_create") as outcome:
+        response = http_client.get_http_session().post(
+            url, json=payload, headers=_headers(access_token), timeout=http_client.get_timeout()
+        )
+        outcome["status"] = response.status_code
+    _check_response(response, url, "jobs/query")
+    return response.json()["id"]
+
+
+def wait_for_query_job(instance_url: str, access_token: str, job_id: str) -> Dict[str, Any]:
+    """
+    Polls a query job until it completes.
+
+    The poll interval starts at half a second and doubles up to SALESFORCE_BULK_POLL_SECONDS
+    (default 5); the job must complete within SALESFORCE_BULK_TIMEOUT_SECONDS (default 3600).
+
+    Returns:
+        The job info of the completed job.
+
+    Raises:
+        SalesforceBulkQueryError: If the job fails, is aborted or times out.
+        One of http_client.HTTP_ERRORS if a request fails.
+    """
+    url = f"{instance_url}/services/data/v{SALESFORCE_API_VERSION}/jobs/query/{job_id}"
+    max_interval = float(os.getenv("SALESFORCE_BULK_POLL_SECONDS", "5"))
+    deadline = time.monotonic() + float(os.getenv("SALESFORCE_BULK_TIMEOUT_SECONDS", "3600"))
+    interval = min(0.5, max_interval)
+
+    while True:
+        with http_timer("salesforce", "bulk_poll") as outcome:
+            response = http_client.get_http_session().get(url, headers=_headers(access_token), timeout=http_client.get_timeout())
+            outcome["status"] = response.status_code
+        _check_response(response, url, "jobs/query")
+        job_info = response.json()
+
+        if job_info["state"] == BULK_JOB_COMPLETE:
+            return job_info
+        if job_info["state"] in BULK_JOB_FAILED_STATES:
+            raise SalesforceBulkQueryError(
+                f"Bulk query job {job_id} ended in state {job_info['state']}: {job_info.get('errorMessage')}"
+            )
+        if time.monotonic() + interval > deadline:
+            raise SalesforceBulkQueryError(f"Bulk query job {job_id} did not complete in time (state {job_info['state']}).")
+
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
+
+
+def _request_results_page(url: str, params: Dict[str, str], access_token: str) -> Any:
+    """
+    Requests one page of query job results, returning the response with its body not yet read.
+
+    Raises:
+        SalesforceExpiredSession: If Salesforce rejects the session.
+        One of http_client.HTTP_ERRORS if the request fails.
+    """
+    with http_timer("salesforce", "bulk_results") as outcome:
+        response = http_client.get_http_session().get(
+            url, params=params, headers=_headers(access_token, accept="text/csv"),
+            timeout=http_client.get_timeout(), stream=True,
+        )
+        outcome["status"] = response.status_code
+    try:
+        _check_response(response, url, "jobs/query/results")
+    except Exception:
+        response.close()
+        raise
+    return response
+
+
+def iter_query_results(
+    instance_url: str,
+    access_token: str,
+    job_id: str,
+    renew_access_token: Optional[Callable[[], str]] = None,
+) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Streams the CSV results of a completed query job.
+
+    Results are fetched in pages of up to SALESFORCE_BULK_PAGE_SIZE records (default 50000),
+    following the Sforce-Locator header, and parsed row by row while they are downloaded.
+    Downloading a large job can outlast the session: if Salesforce rejects the session when a
+    page is requested, the page is requested again once with the token from `renew_access_token`.
+
+    Args:
+        instance_url, access_token: The Salesforce instance and session.
+        job_id: The completed query job.
+        renew_access_token: Returns a new access token after the session expired; without
+            it, an expired session ends the download.
+
+    Yields:
+        One dictionary per record, keyed by the selected field names (relationship fields
+        keep their dotted names); empty values are None.
+
+    Raises:
+        SalesforceExpiredSession: If Salesforce rejects the session (again).
+        One of http_client.HTTP_ERRORS if a request fails.
+    """
+    from simple_salesforce.exceptions import SalesforceExpiredSession
+
+    url = f"{instance_url}/services/data/v{SALESFORCE_API_VERSION}/jobs/query/{job_id}/results"
+    page_size = int(os.getenv("SALESFORCE_BULK_PAGE_SIZE", "50000"))
+    locator: Optional[str] = None
+
+    while True:
+        params = {"maxRecords": str(page_size)}
+        if locator:
+            params["locator"] = locator
+        try:
+            response = _request_results_page(url, params, access_token)
+        except SalesforceExpiredSession:
+            if renew_access_token is None:
+                raise
+            logger.info(f"Salesforce session expired while downloading the results of bulk query job {job_id}; renewing it.")
+            access_token = renew_access_token()
+            response = _request_results_page(url, params, access_token)
+        with response:
+            response.raw.decode_content = True
+            # Keep the stream open at EOF so the text wrapper can finish reading it.
+            response.raw.auto_close = False
+            reader = csv.DictReader(io.TextIOWrapper(response.raw, encoding="utf-8", newline=""))
+            for row in reader:
+                yield {name: value or None for name, value in row.items()}
+
+        locator = response.headers.get("Sforce-Locator")
+        if not locator or locator == "null":
+            return
+
+
+def iter_bulk_query(
+    instance_url: str,
+    access_token: str,
+    soql_query: str,
+    renew_access_token: Optional[Callable[[], str]] = None,
+) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Runs a SOQL query as a Bulk API 2.0 query job over the shared HTTP session and streams its records.
+
+    The job is created and waited for before this function returns; its results are
+    downloaded lazily as the returned iterator is consumed, renewing the session with
+    `renew_access_token` if it expires meanwhile (see iter_query_results).
+
+    Returns:
+        An iterator of one dictionary per record, as from iter_query_results.
+
+    Raises:
+        SalesforceExpiredSession: If Salesforce rejects the session when the job is created.
+        SalesforceBulkQueryError: If the job fails, is aborted or times out.
+        One of http_client.HTTP_ERRORS if a request fails.
+    """
+    job_id = create_query_job(instance_url, access_token, soql_query)
+    job_info = wait_for_query_job(instance_url, access_token, job_id)
+    logger.info(f"Bulk query job {job_id} completed with {job_info.get('numberRecordsProcessed')} records.")
+    return iter_query_results(instance_url, access_token, job_id, renew_access_token)
@@ -1,13 +1,40 @@
 import os
-import requests
-from typing import List, Dict, Any
-from simple_salesforce import Salesforce
+import time
+import logging
+import datetime
+import itertools
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple, Optional, Iterator, Callable
 
-def get_salesforce_access_token() -> Dict[str, str]:
+from app.core.token_cache.token_cache import token_cache
+from app.core.http_client import http_client
+from app.core.metrics.metrics import http_timer
+from app.models.opportunity_record import OpportunityRecord
+from app.pipeline.upload_targets import UploadTarget, build_target_condition, filter_fields
+from app.pipeline.salesforce_bulk import iter_bulk_query
+from app.pipeline.enhanced_conversions import identifier_fields
+
+if TYPE_CHECKING:
+    from simple_salesforce import Salesforce
+
+logger = logging.getLogger(__name__)
+
+# Query modes: REST query/queryMore pages, Bulk API 2.0 jobs, or chosen by expected row count.
+QUERY_MODE_REST = "rest"
+QUERY_MODE_BULK = "bulk"
+QUERY_MODE_AUTO = "auto"
+
+# Key of the Salesforce session in the shared token cache.
+SALESFORCE_TOKEN_CACHE_KEY = "salesforce"
+
+# Maximum number of records Salesforce returns per REST query page.
+SALESFORCE_PAGE_SIZE = 2000
+
+def _fetch_salesforce_access_token() -> Tuple[Dict[str, str], float]:
     """
-    Obtains an OAuth 2.0 access token from Salesforce.
+    Requests a new OAuth 2.0 access token from Salesforce.
 
-    This function makes a POST request to the hardcoded Salesforce OAuth token endpoint using
+    This function makes a POST request to the Salesforce OAuth token endpoint on
+    SALESFORCE_LOGIN_URL (default https://login.salesforce.com) using
     the following environment variables:
       - SALESFORCE_CLIENT_ID
       - SALESFORCE_CLIENT_SECRET
@@ -16,16 +43,19 @@ def get_salesforce_access_token() -> Dict[str, str]:
       - SALESFORCE_SECURITY_TOKEN (optional)
 
     The password is combined with the security token (if provided) to authenticate.
+    The password grant does not report an expiry, so the token is assumed to be valid
+    for SALESFORCE_TOKEN_TTL_SECONDS (default 3600).
     
     Returns:
-        A dictionary containing 'access_token' and 'instance_url'.
+        A tuple of a dictionary containing 'access_token' and 'instance_url', and the
+        token expiry as a Unix timestamp.
     
     Raises:
         EnvironmentError: If any of the required environment variables (except the security token) is missing.
-        requests.HTTPError: If the POST request fails.
+        One of http_client.HTTP_ERRORS if the POST request fails.
         ValueError: If the response JSON does not contain the required keys.
     """
-    token_url = "https://login.salesforce.com/services/oauth2/token"
+    token_url = os.getenv("SALESFORCE_LOGIN_URL", "https://login.salesforce.com") + "/services/oauth2/token"
     client_id = os.getenv("SALESFORCE_CLIENT_ID")
     client_secret = os.getenv("SALESFORCE_CLIENT_SECRET")
     username = os.getenv("SALESFORCE_USERNAME")
@@ -45,24 +75,44 @@ def get_salesforce_access_token() -> Dict[str, str]:
         "password": combined_password
     }
 
-    response = requests.post(token_url, data=payload)
+    with http_timer("salesforce", "oauth_token") as outcome:
+        response = http_client.post(token_url, data=payload)
+        outcome["status"] = response.status_code
     response.raise_for_status()
     auth_response = response.json()
 
     if "access_token" not in auth_response or "instance_url" not in auth_response:
         raise ValueError("Salesforce OAuth response missing access_token or instance_url.")
 
-    return {
+    auth_data = {
         "access_token": auth_response["access_token"],
         "instance_url": auth_response["instance_url"]
     }
+    return auth_data, time.time() + float(os.getenv("SALESFORCE_TOKEN_TTL_SECONDS", "3600"))
 
-def get_salesforce_connection() -> Salesforce:
+def get_salesforce_access_token() -> Dict[str, str]:
+    """
+    Obtains an OAuth 2.0 access token from Salesforce.
+
+    The token is served from the process-wide token cache and only requested
+    again when it is close to expiring or has been invalidated.
+
+    Returns:
+        A dictionary containing 'access_token' and 'instance_url'.
+
+    Raises:
+        Any exceptions raised by _fetch_salesforce_access_token.
+    """
+    return token_cache.get(SALESFORCE_TOKEN_CACHE_KEY, _fetch_salesforce_access_token)
+
+def get_salesforce_connection() -> "Salesforce":
     """
     Initializes and returns a Salesforce connection using the simple_salesforce library.
 
     Uses the OAuth access token and instance_url obtained from get_salesforce_access_token.
-    The Salesforce API version is hardcoded to "55.0".
+    The Salesforce API version is hardcoded to "55.0". Requests go through the shared,
+    keep-alive HTTP session. simple_salesforce is imported on first use to keep it out of
+    the service's startup path.
     
     Returns:
         An instance of simple_salesforce.Salesforce.
@@ -70,48 +120,252 @@ def get_salesforce_connection() -> Salesforce:
     Raises:
         Any exceptions raised from get_salesforce_access_token or the connection initialization.
     """
-    auth_data = get_salesforce_access_token()
-    sf = Salesforce(
+    return _connection(get_salesforce_access_token())
+
+def _build_soql_where(
+    modified_since: Optional[datetime.datetime], targets: List[UploadTarget], after_id: Optional[str] = None
+) -> str:
+    """
+    Builds the WHERE clause of the Opportunity query, restricted to records modified since
+    `modified_since` (naive UTC) for incremental runs, to records matching some upload target,
+    and to records whose Id sorts after `after_id` for resumed runs.
+    """
+    soql_where = (
+        "StageName IN ('Admitted', 'Alumni') "
+        "AND Original_Lead_Created_Date_Time__c = LAST_90_DAYS"
+    )
+    target_condition = build_target_condition(targets)
+    if target_condition is not None:
+        soql_where += f" AND {target_condition}"
+    if modified_since is not None:
+        soql_where += f" AND SystemModstamp >= {modified_since.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+    if after_id is not None:
+        soql_where += f" AND Id > '{after_id}'"
+    return soql_where
+
+def _build_soql_query(
+    modified_since: Optional[datetime.datetime],
+    targets: Optional[List[UploadTarget]] = None,
+    after_id: Optional[str] = None,
+    order_by_id: bool = False,
+) -> str:
+    """
+    Builds the Opportunity SOQL query, restricted to records modified since
+    `modified_since` (naive UTC) for incremental runs. With upload targets, the fields
+    they filter on are selected too and only records matching some target are queried.
+    The email and phone fields of enhanced conversions are selected when configured.
+    With `order_by_id`, records are returned in Id order, so that a run can be resumed
+    from the records after `after_id`.
+    """
+    targets = targets or []
+    selected_fields = ["Id", "GCLID__c", "Original_Lead_Created_Date_Time__c", "Admission_Date__c", "SystemModstamp"]
+    selected_fields += [name for name in filter_fields(targets) if name not in selected_fields]
+    selected_fields += [name for name in identifier_fields() if name and name not in selected_fields]
+    soql_query = f"SELECT {', '.join(selected_fields)} FROM Opportunity WHERE {_build_soql_where(modified_since, targets, after_id)}"
+    if order_by_id:
+        soql_query += " ORDER BY Id"
+    return soql_query
+
+def _timed_query(query: Callable[[str], Dict[str, Any]], soql_query: str, operation: str) -> Dict[str, Any]:
+    """
+    Runs a simple_salesforce query method, recording its latency; failed calls are
+    recorded with the Salesforce error status when available.
+    """
+    from simple_salesforce.exceptions import SalesforceError  # type: ignore[import-untyped]
+
+    with http_timer("salesforce", operation) as outcome:
+        try:
+            result = query(soql_query)
+        except SalesforceError as exc:
+            outcome["status"] = exc.status
+            raise
+        outcome["status"] = 200
+    return result
+
+def _renew_session() -> Dict[str, str]:
+    """
+    Invalidates the cached Salesforce session, which Salesforce rejected, and returns a new one.
+    """
+    token_cache.invalidate(SALESFORCE_TOKEN_CACHE_KEY)
+    return get_salesforce_access_token()
+
+def _with_session_retry(call: Callable[[Dict[str, str]], Any]) -> Any:
+    """
+    Calls `call` with the cached Salesforce access token; if Salesforce rejects the cached
+    session, the token is invalidated and the call is retried once with a new session.
+    """
+    from simple_salesforce.exceptions import SalesforceExpiredSession
+
+    try:
+        return call(get_salesforce_access_token())
+    except SalesforceExpiredSession:
+        return call(_renew_session())
+
+def _connection(auth_data: Dict[str, str]) -> "Salesforce":
+    from simple_salesforce import Salesforce
+
+    return Salesforce(
         instance_url=auth_data["instance_url"],
         session_id=auth_data["access_token"],
-        version="55.0"
+        version="55.0",
+        session=http_client.get_http_session()
+    )
+
+def _choose_query_mode(
+    modified_since: Optional[datetime.datetime], targets: List[UploadTarget], after_id: Optional[str] = None
+) -> str:
+    """
+    Decides between REST and Bulk API 2.0 queries from SALESFORCE_QUERY_MODE ("rest", "bulk" or
+    "auto", the default). In auto mode a COUNT() query with the same filters is made first, and
+    bulk is used when at least SALESFORCE_BULK_THRESHOLD (default 50000) records are expected.
+    """
+    query_mode = os.getenv("SALESFORCE_QUERY_MODE", QUERY_MODE_AUTO).lower()
+    if query_mode in (QUERY_MODE_REST, QUERY_MODE_BULK):
+        return query_mode
+
+    count_query = f"SELECT COUNT() FROM Opportunity WHERE {_build_soql_where(modified_since, targets, after_id)}"
+    expected_count = _with_session_retry(lambda auth_data: _timed_query(_connection(auth_data).query, count_query, "count"))["totalSize"]
+    threshold = int(os.getenv("SALESFORCE_BULK_THRESHOLD", "50000"))
+    query_mode = QUERY_MODE_BULK if expected_count >= threshold else QUERY_MODE_REST
+    logger.info(f"Expecting {expected_count} Salesforce records; using the {query_mode} query mode.")
+    return query_mode
+
+def _iter_rest_records(soql_query: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the raw records of a REST query, requesting the next page only when the previous one
+    is consumed. If the session expires while paging, it is renewed and the page requested again.
+    """
+    from simple_salesforce.exceptions import SalesforceExpiredSession
+
+    def first_page(auth_data: Dict[str, str]) -> Tuple["Salesforce", Dict[str, Any]]:
+        sf = _connection(auth_data)
+        return sf, _timed_query(sf.query, soql_query, "query")
+
+    sf, page = _with_session_retry(first_page)
+    while True:
+        yield from page["records"]
+        if page["done"]:
+            return
+        next_records_url = page["nextRecordsUrl"]
+        query_more = lambda url: sf.query_more(url, identifier_is_url=True)
+        try:
+            page = _timed_query(query_more, next_records_url, "query_more")
+        except SalesforceExpiredSession:
+            logger.info("Salesforce session expired while paging through query results; renewing it.")
+            sf = _connection(_renew_session())
+            page = _timed_query(query_more, next_records_url, "query_more")
+
+def _iter_bulk_records(soql_query: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the raw records of a Bulk API 2.0 query job as they are downloaded. A session that
+    expires while the job is created or polled, or while its result pages are downloaded, is
+    renewed and the request made again.
+    """
+    return _with_session_retry(
+        lambda auth_data: iter_bulk_query(
+            auth_data["instance_url"], auth_data["access_token"], soql_query,
+            renew_access_token=lambda: _renew_session()["access_token"],
+        )
     )
-    return sf
 
-def query_salesforce() -> List[Dict[str, Any]]:
+def query_salesforce(
+    modified_since: Optional[datetime.datetime] = None,
+    targets: Optional[List[UploadTarget]] = None,
+    after_id: Optional[str] = None,
+    order_by_id: bool = False,
+) -> List[OpportunityRecord]:
     """
     Queries Salesforce data using its API.
 
     Executes the following SOQL query with hardcoded parameters:
-      • SELECT Id, GCLID__c, Name, Original_Lead_Created_Date_Time__c, Admission_Date__c
+      • SELECT Id, GCLID__c, Original_Lead_Created_Date_Time__c, Admission_Date__c, SystemModstamp
       • FROM Opportunity
       • WHERE StageName IN ('Admitted', 'Alumni')
       • AND Original_Lead_Created_Date_Time__c = LAST_90_DAYS
+      • AND SystemModstamp >= modified_since (only for incremental runs)
+      • AND Id > after_id (only for resumed runs)
+      • ORDER BY Id (only with order_by_id)
+
+    When upload targets are given, one query serves all of them: the fields their
+    filters use are added to the SELECT and kept on the records, and the WHERE clause
+    is narrowed to records matching any target (unless some target has no filter).
 
-    After retrieving the results, the function:
-      1. Removes the extraneous 'attributes' field from each record.
-      2. Filters out records where the 'GCLID__c' field is null.
+    Small result sets are read with REST query/queryMore pages of 2000 records. Large ones
+    (see SALESFORCE_QUERY_MODE and SALESFORCE_BULK_THRESHOLD) are extracted with a Bulk API 2.0
+    query job whose CSV results are streamed, avoiding thousands of serial page requests.
+
+    If Salesforce rejects the cached session, the token is invalidated and the query
+    is retried once with a new session.
+
+    Each result page is converted into compact OpportunityRecords as it arrives,
+    dropping records that cannot be uploaded, so raw results are only held for one page
+    at a time. Those are the records where the 'GCLID__c' field is null, unless enhanced
+    conversions are enabled (see enhanced_conversions.identifier_fields) and the record has
+    an email address or phone number to match on instead.
+
+    Args:
+        modified_since: Naive UTC datetime; when given, only records modified since then are returned.
+        targets: Upload targets the records will be routed to.
+        after_id: When given, only records whose Id sorts after it are returned.
+        order_by_id: Return the records in Id order, as checkpointed runs need.
 
     Returns:
-        A list of dictionaries representing the cleaned Salesforce records.
+        A list of OpportunityRecords.
     
     Raises:
         Any exceptions raised during the query or data processing.
     """
-    sf = get_salesforce_connection()
-    soql_query = (
-        "SELECT Id, GCLID__c, Name, Original_Lead_Created_Date_Time__c, Admission_Date__c "
-        "FROM Opportunity "
-        "WHERE StageName IN ('Admitted', 'Alumni') "
-        "AND Original_Lead_Created_Date_Time__c = LAST_90_DAYS"
-    )
-    result = sf.query_all(soql_query)
-    records = result.get("records", [])
-    
-    # Remove extraneous 'attributes' field from each record.
-    for record in records:
-        record.pop("attributes", None)
-    
-    # Filter out records with a null GCLID__c field.
-    filtered_records = [record for record in records if record.get("GCLID__c") is not None]
-    return filtered_records
+    return list(itertools.chain.from_iterable(
+        iter_salesforce_chunks(modified_since, SALESFORCE_PAGE_SIZE, targets, after_id, order_by_id)
+    ))
+
+def iter_salesforce_chunks(
+    modified_since: Optional[datetime.datetime] = None,
+    chunk_size: int = 2000,
+    targets: Optional[List[UploadTarget]] = None,
+    after_id: Optional[str] = None,
+    order_by_id: bool = False,
+) -> Iterator[List[OpportunityRecord]]:
+    """
+    Lazily queries the same records as query_salesforce, yielding them in chunks.
+
+    Result pages are only requested from Salesforce when the consumer asks for the
+    next chunk, so at most one page and one chunk are held in memory at a time.
+
+    Args:
+        modified_since: Naive UTC datetime; when given, only records modified since then are returned.
+        chunk_size: Maximum number of records per yielded chunk.
+        targets: Upload targets the records will be routed to.
+        after_id: When given, only records whose Id sorts after it are returned.
+        order_by_id: Return the records in Id order, as checkpointed runs need.
+
+    Yields:
+        Lists of at most `chunk_size` OpportunityRecords.
+
+    Raises:
+        Any exceptions raised during the query or data processing.
+    """
+    targets = targets or []
+    soql_query = _build_soql_query(modified_since, targets, after_id, order_by_id)
+    extra_fields = filter_fields(targets)
+    email_field, phone_field = identifier_fields()
+    if _choose_query_mode(modified_since, targets, after_id) == QUERY_MODE_BULK:
+        raw_records = _iter_bulk_records(soql_query)
+    else:
+        raw_records = _iter_rest_records(soql_query)
+
+    chunk: List[OpportunityRecord] = []
+    for raw_record in raw_records:
+        # Records without a GCLID can only be uploaded as enhanced conversions.
+        if raw_record.get("GCLID__c") is None and not (email_field or phone_field):
+            continue
+        record = OpportunityRecord.from_salesforce(raw_record, extra_fields, email_field, phone_field)
+        if record.gclid is None and record.email is None and record.phone is None:
+            continue
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
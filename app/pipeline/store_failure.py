@@ -0,0 +1,178 @@
+import os
+import json
+import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.core.database.sql_adaptor import SessionLocal
+from app.models.upload_failure import UploadFailure
+from app.models.opportunity_record import OpportunityRecord
+from app.pipeline.upload_targets import DEFAULT_TARGET_NAME
+
+# Google Ads conversion upload errors that retrying cannot fix.
+PERMANENT_ERROR_CODES = {
+    "UNPARSEABLE_GCLID",
+    "CONVERSION_PRECEDES_CLICK",
+    "CONVERSION_PRECEDES_EVENT",
+    "EXPIRED_CLICK",
+    "EXPIRED_EVENT",
+    "INVALID_CUSTOMER_FOR_CLICK",
+    "CLICK_CONVERSION_ALREADY_EXISTS",
+    "DUPLICATE_CLICK_CONVERSION_IN_REQUEST",
+    "INVALID_USER_IDENTIFIER",
+    "UNSUPPORTED_USER_IDENTIFIER",
+}
+
+def classify_upload_error(error: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+    """
+    Extracts the error code of a Google Ads partial failure error and decides whether it is permanent.
+
+    Args:
+        error: The "error" entry of an upload result, e.g.
+               {"errorCode": {"conversionUploadError": "UNPARSEABLE_GCLID"}, "message": ...}.
+
+    Returns:
+        A tuple of the error code (None if the error carries none, e.g. a failed request)
+        and whether the error is permanent.
+    """
+    error_code = next(iter(error.get("errorCode", {}).values()), None)
+    return error_code, error_code in PERMANENT_ERROR_CODES
+
+def _next_retry_at(attempts: int, now: datetime.datetime) -> datetime.datetime:
+    """
+    Exponential backoff: UPLOAD_RETRY_BASE_SECONDS (default 900) doubled for every
+    previous attempt, capped at UPLOAD_RETRY_MAX_SECONDS (default 86400).
+    """
+    base_delay = float(os.getenv("UPLOAD_RETRY_BASE_SECONDS", "900"))
+    max_delay = float(os.getenv("UPLOAD_RETRY_MAX_SECONDS", "86400"))
+    delay = min(base_delay * 2 ** (attempts - 1), max_delay)
+    return now + datetime.timedelta(seconds=delay)
+
+def _id_batches(salesforce_ids: List[str]) -> List[List[str]]:
+    batch_size = int(os.getenv("FILTER_BATCH_SIZE", "500"))
+    return [salesforce_ids[start:start + batch_size] for start in range(0, len(salesforce_ids), batch_size)]
+
+def _parse_datetime(value: Any) -> Any:
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    return value
+
+def store_failed_records(failure_data: List[Dict[str, Any]]) -> List[UploadFailure]:
+    """
+    Records failed conversion uploads in the upload_failure retry queue.
+
+    Each record in failure_data is expected to be a dictionary with the following keys:
+      - 'salesforce_id': str - The Salesforce Opportunity Id.
+      - 'target': str - The upload target name (defaults to "default").
+      - 'gclid': Optional[str] - The GCLID value from the Salesforce record.
+      - 'original_lead_created_datetime': datetime or ISO formatted str - When the lead was created.
+      - 'admission_date': datetime or ISO formatted str - The date of admission.
+      - 'hashed_email' / 'hashed_phone': Optional[str] - Hashed user identifiers of enhanced conversions.
+      - 'error': dict - The error returned by Google Ads for the conversion.
+
+    Queued failures are looked up per target in IN-list queries of FILTER_BATCH_SIZE IDs
+    (default 500). A conversion already in the queue for the same target has its attempt count
+    increased. A failure becomes permanent when its error code cannot be fixed by retrying or after UPLOAD_RETRY_MAX_ATTEMPTS
+    attempts (default 8); otherwise its next retry is scheduled with exponential backoff.
+
+    Returns:
+        The UploadFailure rows that were created or updated.
+
+    Raises:
+        Any exceptions raised during database operations.
+    """
+    if not failure_data:
+        return []
+
+    max_attempts = int(os.getenv("UPLOAD_RETRY_MAX_ATTEMPTS", "8"))
+    now = datetime.datetime.utcnow()
+    failures: List[UploadFailure] = []
+
+    with SessionLocal(expire_on_commit=False) as session:
+        # Look up the queued failures of each target in IN-list queries of FILTER_BATCH_SIZE IDs.
+        existing: Dict[Tuple[str, str], UploadFailure] = {}
+        ids_by_target: Dict[str, List[str]] = {}
+        for record in failure_data:
+            ids_by_target.setdefault(record.get("target", DEFAULT_TARGET_NAME), []).append(record["salesforce_id"])
+        for target, salesforce_ids in ids_by_target.items():
+            for batch in _id_batches(salesforce_ids):
+                existing.update(
+                    ((failure.salesforce_id, failure.target), failure)
+                    for failure in session.query(UploadFailure).filter(
+                        UploadFailure.salesforce_id.in_(batch), UploadFailure.target == target
+                    )
+                )
+
+        for record in failure_data:
+            key = (record["salesforce_id"], record.get("target", DEFAULT_TARGET_NAME))
+            failure = existing.get(key)
+            if failure is None:
+                failure = UploadFailure(salesforce_id=key[0], target=key[1], attempts=0, first_failed_at=now)
+                session.add(failure)
+                existing[key] = failure
+
+            error_code, permanent = classify_upload_error(record["error"])
+            failure.gclid = record.get("gclid")
+            failure.original_lead_created_datetime = _parse_datetime(record.get("original_lead_created_datetime"))
+            failure.admission_date = _parse_datetime(record.get("admission_date"))
+            failure.hashed_email = record.get("hashed_email")
+            failure.hashed_phone = record.get("hashed_phone")
+            failure.error_code = error_code
+            failure.error_details = json.dumps(record["error"])
+            failure.attempts += 1
+            failure.last_failed_at = now
+            failure.permanent = permanent or failure.attempts >= max_attempts
+            failure.next_retry_at = None if failure.permanent else _next_retry_at(failure.attempts, now)
+            failures.append(failure)
+
+        session.commit()
+
+    return failures
+
+def _as_utc(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=datetime.timezone.utc)
+
+def load_due_failures(limit: int) -> Dict[str, List[OpportunityRecord]]:
+    """
+    Loads retryable failures whose next retry time has passed, oldest first.
+
+    Returns:
+        Dictionary of upload target name to the OpportunityRecords that can be passed
+        to upload_conversions for that target again.
+    """
+    with SessionLocal() as session:
+        failures = (
+            session.query(UploadFailure)
+            .filter(UploadFailure.permanent.is_(False), UploadFailure.next_retry_at <= datetime.datetime.utcnow())
+            .order_by(UploadFailure.next_retry_at)
+            .limit(limit)
+            .all()
+        )
+        # Salesforce returns datetimes in UTC, which is how they were stored.
+        due_records: Dict[str, List[OpportunityRecord]] = {}
+        for failure in failures:
+            due_records.setdefault(failure.target, []).append(OpportunityRecord(
+                salesforce_id=failure.salesforce_id,
+                gclid=failure.gclid,
+                original_lead_created_datetime=_as_utc(failure.original_lead_created_datetime),
+                admission_date=_as_utc(failure.admission_date),
+                hashed_email=failure.hashed_email,
+                hashed_phone=failure.hashed_phone,
+            ))
+        return due_records
+
+
+def clear_failures(salesforce_ids: List[str], target: str = DEFAULT_TARGET_NAME) -> None:
+    """
+    Removes conversions of an upload target from the retry queue, e.g. after they were uploaded
+    successfully, in DELETEs of FILTER_BATCH_SIZE IDs (default 500) committed together.
+    """
+    if not salesforce_ids:
+        return
+    with SessionLocal() as session:
+        for batch in _id_batches(salesforce_ids):
+            session.query(UploadFailure).filter(
+                UploadFailure.salesforce_id.in_(batch), UploadFailure.target == target
+            ).delete(synchronize_session=False)
+        session.commit()
@@ -1,59 +1,125 @@
+import os
 import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-from sqlalchemy.orm import Session
-from app.core.database.sql_adaptor import SessionLocal
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql.dml import Insert
+from app.core.database.sql_adaptor import SessionLocal, AsyncSessionLocal, engine
 from app.models.upload_status import UploadStatus
+from app.pipeline.upload_targets import DEFAULT_TARGET_NAME
 
-def store_success_records(success_data: List[Dict[str, Any]]) -> List[UploadStatus]:
+def _insert_ignoring_duplicates() -> Insert:
+    """
+    Builds an INSERT into upload_status that skips rows whose salesforce_id is already stored
+    for the same target.
+    ON CONFLICT is only available on PostgreSQL and SQLite; other databases get a plain INSERT.
+    NULLs are rendered rather than omitted, so that rows with and without a GCLID (enhanced
+    conversions) share one statement and are still sent in multi-row batches.
+    """
+    statement: Insert
+    if engine.dialect.name == "postgresql":
+        statement = postgresql.insert(UploadStatus).on_conflict_do_nothing(index_elements=["salesforce_id", "target"])
+    elif engine.dialect.name == "sqlite":
+        statement = sqlite.insert(UploadStatus).on_conflict_do_nothing(index_elements=["salesforce_id", "target"])
+    else:
+        statement = insert(UploadStatus)
+    return statement.execution_options(render_nulls=True)
+
+def _build_rows(success_data: List[Dict[str, Any]], run_id: Optional[int]) -> List[Dict[str, Any]]:
+    """
+    Converts the success_data records into upload_status row values of the given pipeline run.
+    """
+    rows: List[Dict[str, Any]] = []
+    for record in success_data:
+        # Parse datetime fields if they are provided as strings.
+        # If they are already datetime objects, they remain unchanged.
+        original_lead_created_datetime = record.get("original_lead_created_datetime")
+        if isinstance(original_lead_created_datetime, str):
+            original_lead_created_datetime = datetime.datetime.fromisoformat(original_lead_created_datetime)
+
+        admission_date = record.get("admission_date")
+        if isinstance(admission_date, str):
+            admission_date = datetime.datetime.fromisoformat(admission_date)
+
+        rows.append({
+            "salesforce_id": record["salesforce_id"],
+            "target": record.get("target", DEFAULT_TARGET_NAME),
+            "gclid": record.get("gclid"),
+            "original_lead_created_datetime": original_lead_created_datetime,
+            "admission_date": admission_date,
+            "status": record["status"],
+            "error_details": record.get("error_details"),
+            "run_id": run_id,
+        })
+    return rows
+
+def store_success_records(success_data: List[Dict[str, Any]], run_id: Optional[int] = None) -> List[UploadStatus]:
     """
     Stores details of successful conversion uploads into the database.
     
     Each record in success_data is expected to be a dictionary with the following keys:
       - 'salesforce_id': str - The Salesforce Opportunity Id.
+      - 'target': str - The upload target name (defaults to "default").
       - 'gclid': Optional[str] - The GCLID value from the Salesforce record.
       - 'original_lead_created_datetime': datetime or ISO formatted str - When the lead was created.
       - 'admission_date': datetime or ISO formatted str - The date of admission.
       - 'status': str - The upload status, expected to be 'successful'.
       - 'error_details': Optional[str] - Should be None or empty for successful uploads.
+
+    The rows are tagged with `run_id`, the pipeline_run storing them, so that the results of
+    a run can be read back page by page (see upload_status_reader).
+
+    Rows are written with multi-row INSERT ... ON CONFLICT (salesforce_id, target) DO NOTHING
+    ... RETURNING statements of STORE_BATCH_SIZE rows (default 1000), so the generated
+    id and timestamp come back without a SELECT per row. Records whose salesforce_id
+    is already stored for the same target are skipped.
       
     Returns:
-        A list of UploadStatus instances that have been stored in the database.
+        A list of UploadStatus instances that have been inserted into the database.
     
     Raises:
         Any exceptions raised during database operations.
     """
+    batch_size = int(os.getenv("STORE_BATCH_SIZE", "1000"))
+    rows = _build_rows(success_data, run_id)
+    if not rows:
+        return []
+
     stored_records: List[UploadStatus] = []
-    
-    # Open a new database session.
-    with SessionLocal() as session:
-        # Iterate over each record from the input data.
-        for record in success_data:
-            # Parse datetime fields if they are provided as strings.
-            # If they are already datetime objects, they remain unchanged.
-            original_lead_created_datetime = record.get("original_lead_created_datetime")
-            if isinstance(original_lead_created_datetime, str):
-                original_lead_created_datetime = datetime.datetime.fromisoformat(original_lead_created_datetime)
-            
-            admission_date = record.get("admission_date")
-            if isinstance(admission_date, str):
-                admission_date = datetime.datetime.fromisoformat(admission_date)
-            
-            upload_status = UploadStatus(
-                salesforce_id=record["salesforce_id"],
-                gclid=record.get("gclid"),
-                original_lead_created_datetime=original_lead_created_datetime,
-                admission_date=admission_date,
-                status=record["status"],
-                error_details=record.get("error_details")
-            )
-            
-            session.add(upload_status)
-            stored_records.append(upload_status)
-        
+    statement = _insert_ignoring_duplicates().returning(UploadStatus)
+
+    # Open a new database session; returned rows must stay loaded after the commit.
+    with SessionLocal(expire_on_commit=False) as session:
+        for start in range(0, len(rows), batch_size):
+            stored_records.extend(session.scalars(statement, rows[start:start + batch_size]))
         session.commit()
-        # Refresh all instances to reflect data from the database (e.g., autogenerated id, timestamp)
-        for rec in stored_records:
-            session.refresh(rec)
-    
+
+    return stored_records
+
+async def store_success_records_async(success_data: List[Dict[str, Any]], run_id: Optional[int] = None) -> List[UploadStatus]:
+    """
+    Async version of store_success_records, writing the same batched
+    INSERT ... ON CONFLICT DO NOTHING ... RETURNING statements on the async engine, so that
+    the pipeline can store one chunk while it uploads the next (see PIPELINE_ASYNC_DB).
+
+    Returns:
+        A list of UploadStatus instances that have been inserted into the database.
+
+    Raises:
+        Any exceptions raised during database operations.
+    """
+    batch_size = int(os.getenv("STORE_BATCH_SIZE", "1000"))
+    rows = _build_rows(success_data, run_id)
+    if not rows:
+        return []
+
+    stored_records: List[UploadStatus] = []
+    statement = _insert_ignoring_duplicates().returning(UploadStatus)
+
+    async with AsyncSessionLocal() as session:
+        for start in range(0, len(rows), batch_size):
+            stored_records.extend(await session.scalars(statement, rows[start:start + batch_size]))
+        await session.commit()
+
     return stored_records
@@ -0,0 +1,82 @@
+import datetime
+from functools import partial
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+
+from app.models.upload_daily_summary_schema import UploadDailySummaryRead
+from app.models.upload_status_schema import UploadStatusPage, UploadStatusRead
+from app.pipeline.upload_status_reader import MAX_PAGE_SIZE, load_upload_status_page, upload_status_filters
+from app.pipeline.upload_summary import load_daily_summary
+
+router = APIRouter()
+
+
+@router.get("/upload-status", response_model=UploadStatusPage)
+async def get_upload_status(
+    run_id: Optional[int] = None,
+    target: Optional[str] = None,
+    upload_status: Optional[str] = Query(None, alias="status"),
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(1000, ge=1, le=MAX_PAGE_SIZE),
+) -> UploadStatusPage:
+    """
+    Returns one page of upload_status rows in id order, e.g. the records stored by a pipeline
+    run (its run_id is in the run summary). Pages are cursor-based: pass the next_cursor of a
+    page as `cursor` to get the next one, until next_cursor is null. Rows archived by the
+    retention policy are no longer returned.
+
+    Args:
+        run_id: Only rows stored by this pipeline run.
+        target: Only rows of this upload target.
+        status: Only rows with this upload status, e.g. "successful".
+        since, until: Inclusive range of UTC times the rows were recorded at; unbounded if omitted.
+        cursor: The next_cursor of the previous page; omitted for the first page.
+        limit: The maximum number of rows per page, up to MAX_PAGE_SIZE (default 1000).
+
+    Returns:
+        The rows of the page and the cursor of the next page.
+
+    Raises:
+        HTTPException(422): If since is after until.
+    """
+    if since is not None and until is not None and since > until:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="since must not be after until.")
+    filters = upload_status_filters(run_id, target, upload_status, since, until)
+    rows = await run_in_threadpool(partial(load_upload_status_page, filters, cursor, limit))
+    return UploadStatusPage(
+        items=[UploadStatusRead.model_validate(row) for row in rows],
+        next_cursor=rows[-1]["id"] if len(rows) == limit else None,
+    )
+
+
+@router.get("/upload-status/summary", response_model=List[UploadDailySummaryRead])
+async def get_upload_status_summary(
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    target: Optional[str] = None,
+    upload_status: Optional[str] = Query(None, alias="status"),
+) -> List[UploadDailySummaryRead]:
+    """
+    Returns the daily upload counts by upload target (and its conversion action) and status,
+    from the upload_daily_summary table that each pipeline run keeps up to date. The counts
+    of days whose upload_status rows were archived remain available here.
+
+    Args:
+        start, end: Inclusive range of UTC days (YYYY-MM-DD); unbounded if omitted.
+        target: Only counts of this upload target.
+        status: Only counts with this upload status, e.g. "successful".
+
+    Returns:
+        The matching summary rows, ordered by day, target and status.
+
+    Raises:
+        HTTPException(422): If start is after end.
+    """
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="start must not be after end.")
+    rows = await run_in_threadpool(partial(load_daily_summary, start, end, target, upload_status))
+    return [UploadDailySummaryRead.model_validate(row) for row in rows]
@@ -0,0 +1,108 @@
+import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.sql.elements import ColumnElement
+from app.core.database.sql_adaptor import SessionLocal
+from app.models.upload_status import UploadStatus
+from app.models.upload_status_schema import UploadStatusRead
+
+# Largest page served by /upload-status.
+MAX_PAGE_SIZE = 10000
+
+# Rows read per round trip while streaming the records of a run.
+STREAM_FETCH_SIZE = 5000
+
+
+def upload_status_filters(
+    run_id: Optional[int] = None,
+    target: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+) -> List[ColumnElement]:
+    """
+    Builds the conditions selecting upload_status rows; every argument left as None matches all rows.
+
+    Args:
+        run_id: Only rows stored by this pipeline run.
+        target: Only rows of this upload target.
+        status: Only rows with this upload status, e.g. "successful".
+        since, until: Only rows recorded in this (inclusive) range of UTC times.
+    """
+    filters: List[ColumnElement] = []
+    if run_id is not None:
+        filters.append(UploadStatus.run_id == run_id)
+    if target is not None:
+        filters.append(UploadStatus.target == target)
+    if status is not None:
+        filters.append(UploadStatus.status == status)
+    if since is not None:
+        filters.append(UploadStatus.timestamp >= since)
+    if until is not None:
+        filters.append(UploadStatus.timestamp <= until)
+    return filters
+
+
+def run_filters(summary: Dict[str, Any]) -> List[ColumnElement]:
+    """
+    Builds the conditions selecting the upload_status rows stored by a pipeline run.
+
+    Rows are tagged with the run's pipeline_run ID. Runs without checkpoints
+    (PIPELINE_CHECKPOINTS=false) have none; their rows are the untagged ones recorded while
+    the run was in progress, which includes those of any concurrent untagged run.
+
+    Args:
+        summary: The run's summary, as returned by pipeline_runner.run_pipeline.
+    """
+    if summary["run_id"] is not None:
+        return upload_status_filters(run_id=summary["run_id"])
+    return [UploadStatus.run_id.is_(None), *upload_status_filters(since=summary["started_at"], until=summary["finished_at"])]
+
+
+def load_upload_status_page(filters: List[ColumnElement], cursor: Optional[int], limit: int) -> List[Dict[str, Any]]:
+    """
+    Reads one page of matching upload_status rows in id order, using keyset pagination: the
+    page starts after the row whose id is `cursor`, so every page is an index range scan
+    however deep into the results it is, and rows inserted meanwhile do not shift the pages.
+
+    Args:
+        filters: Conditions from upload_status_filters or run_filters.
+        cursor: The id of the last row of the previous page; None for the first page.
+        limit: The maximum number of rows to return.
+
+    Returns:
+        The column values of the rows; fewer than `limit` rows means this is the last page.
+
+    Raises:
+        Any exceptions raised by database queries will propagate.
+    """
+    statement = select(UploadStatus.__table__).where(*filters)
+    if cursor is not None:
+        statement = statement.where(UploadStatus.id > cursor)
+    with SessionLocal() as session:
+        rows = session.execute(statement.order_by(UploadStatus.id).limit(limit)).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def iter_upload_status_ndjson(filters: List[ColumnElement]) -> Iterator[str]:
+    """
+    Yields the matching upload_status rows as JSON Lines (one UploadStatusRead object per
+    line), in id order.
+
+    Rows are read STREAM_FETCH_SIZE at a time, each page in its own short session, so neither
+    the rows nor a database connection are held while the client reads the stream. Each page
+    is yielded as one string, which keeps the number of writes (and, in a StreamingResponse,
+    thread pool hops) per row low.
+
+    Args:
+        filters: Conditions from upload_status_filters or run_filters.
+    """
+    cursor: Optional[int] = None
+    while True:
+        rows = load_upload_status_page(filters, cursor, STREAM_FETCH_SIZE)
+        if rows:
+            yield "".join(UploadStatusRead.model_validate(row).model_dump_json() + "\n" for row in rows)
+        if len(rows) < STREAM_FETCH_SIZE:
+            return
+        cursor = rows[-1]["id"]
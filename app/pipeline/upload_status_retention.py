@@ -0,0 +1,164 @@
+import os
+import gzip
+import json
+import datetime
+import logging
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from app.core.database.sql_adaptor import SessionLocal
+from app.models.upload_status import UploadStatus
+from app.pipeline.upload_summary import refresh_daily_summary
+
+logger = logging.getLogger(__name__)
+
+# Rows younger than this are still needed to skip records that Salesforce returns again
+# (the query covers leads created in the last 90 days), so they are never archived.
+MIN_RETENTION_DAYS = 91
+
+# Rows read per round trip while writing an archive.
+ARCHIVE_FETCH_SIZE = 5000
+
+
+def retention_days() -> Optional[int]:
+    """
+    Returns UPLOAD_STATUS_RETENTION_DAYS, or None if it is not set (rows are kept forever).
+
+    Raises:
+        ValueError: If it is below MIN_RETENTION_DAYS, since archived conversions would be
+            uploaded again.
+        EnvironmentError: If UPLOAD_STATUS_ARCHIVE_DIR is not set (see archive_directory).
+    """
+    value = os.getenv("UPLOAD_STATUS_RETENTION_DAYS")
+    if not value:
+        return None
+    days = int(value)
+    if days < MIN_RETENTION_DAYS:
+        raise ValueError(f"UPLOAD_STATUS_RETENTION_DAYS must be at least {MIN_RETENTION_DAYS}, got {days}.")
+    archive_directory()
+    return days
+
+
+def archive_directory() -> str:
+    """
+    Returns UPLOAD_STATUS_ARCHIVE_DIR, where archived rows are written before they are deleted.
+
+    There is no default: archived rows only exist in these files, so they must go to durable
+    storage (e.g. a mounted volume or bucket), which a path relative to the working directory
+    of a container is not.
+
+    Raises:
+        EnvironmentError: If UPLOAD_STATUS_ARCHIVE_DIR is not set.
+    """
+    archive_dir = os.getenv("UPLOAD_STATUS_ARCHIVE_DIR")
+    if not archive_dir:
+        raise EnvironmentError("UPLOAD_STATUS_ARCHIVE_DIR must be set to archive upload_status rows; none were deleted.")
+    return archive_dir
+
+
+def _month_start(value: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(value.year, value.month, 1)
+
+
+def _next_month(month: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _serialize(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def _archive_month(month: datetime.datetime, archive_dir: str, run_stamp: str) -> Tuple[Optional[str], int]:
+    """
+    Writes the upload_status rows recorded in `month` to a gzip-compressed JSON Lines file,
+    then deletes them.
+
+    The file is written under a temporary name and renamed once complete, and only rows that
+    were written are deleted, in one transaction; an interrupted run leaves the rows in place
+    to be archived again.
+    """
+    month_end = _next_month(month)
+    in_month = (UploadStatus.timestamp >= month, UploadStatus.timestamp < month_end)
+    path = os.path.join(archive_dir, f"upload_status-{month:%Y-%m}-{run_stamp}.jsonl.gz")
+
+    with SessionLocal() as session:
+        count = 0
+        max_id: Optional[int] = None
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as archive:
+            rows = session.execute(
+                select(UploadStatus.__table__).where(*in_month).order_by(UploadStatus.id)
+                .execution_options(yield_per=ARCHIVE_FETCH_SIZE)
+            )
+            for row in rows.mappings():
+                archive.write(json.dumps({key: _serialize(value) for key, value in row.items()}) + "\n")
+                count += 1
+                max_id = row["id"]
+
+        if not count:
+            os.remove(path + ".tmp")
+            return None, 0
+        os.replace(path + ".tmp", path)
+
+        session.execute(delete(UploadStatus).where(*in_month, UploadStatus.id <= max_id))
+        session.commit()
+    return path, count
+
+
+def archive_upload_status(days: Optional[int] = None, archive_dir: Optional[str] = None) -> List[str]:
+    """
+    Archives upload_status rows older than the retention period, one calendar month at a time.
+
+    upload_status is kept as a single table rather than natively partitioned, so that the
+    (salesforce_id, target) uniqueness used for deduplication keeps working on every database.
+    Each month is handled like a partition instead: once the whole month is older than the
+    retention period, its daily summaries are brought up to date, its rows are written to
+    `<archive_dir>/upload_status-<YYYY-MM>-<run>.jsonl.gz` and then deleted. The index on
+    timestamp keeps the month lookups cheap.
+
+    Args:
+        days: Retention period in days; retention_days() if None.
+        archive_dir: Directory for the archive files; archive_directory() if None. It is
+            created if missing.
+
+    Returns:
+        The paths of the archive files written, oldest month first.
+
+    Raises:
+        ValueError: If the retention period is below MIN_RETENTION_DAYS.
+        EnvironmentError: If no archive directory is given or configured; nothing is archived.
+        Any exceptions raised by database queries or file writes will propagate.
+    """
+    days = days if days is not None else retention_days()
+    if days is None:
+        return []
+    if days < MIN_RETENTION_DAYS:
+        raise ValueError(f"The retention period must be at least {MIN_RETENTION_DAYS} days, got {days}.")
+    archive_dir = archive_dir or archive_directory()
+
+    now = datetime.datetime.utcnow()
+    # Only whole months that ended before the retention cutoff are archived.
+    boundary = _month_start(now - datetime.timedelta(days=days))
+    run_stamp = now.strftime("%Y%m%dT%H%M%S")
+    paths: List[str] = []
+    archived_until = datetime.datetime.min
+    while True:
+        # Months without rows are skipped, so that the summaries of archived months are kept.
+        with SessionLocal() as session:
+            oldest = session.scalar(
+                select(func.min(UploadStatus.timestamp))
+                .where(UploadStatus.timestamp >= archived_until, UploadStatus.timestamp < boundary)
+            )
+        if oldest is None:
+            return paths
+
+        month = _month_start(oldest)
+        archived_until = _next_month(month)
+        os.makedirs(archive_dir, exist_ok=True)
+        refresh_daily_summary(month.date(), (archived_until - datetime.timedelta(days=1)).date())
+        path, count = _archive_month(month, archive_dir, run_stamp)
+        if path is not None:
+            logger.info(f"Archived {count} upload_status rows of {month:%Y-%m} to {path}.")
+            paths.append(path)
+
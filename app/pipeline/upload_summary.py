@@ -0,0 +1,130 @@
+import datetime
+import logging
+from typing import List, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from app.core.database.sql_adaptor import SessionLocal
+from app.models.upload_status import UploadStatus
+from app.models.upload_daily_summary import UploadDailySummary
+from app.pipeline.upload_targets import UploadTarget, load_upload_targets
+
+logger = logging.getLogger(__name__)
+
+# Attempts made when concurrent refreshes of the same days collide.
+REFRESH_ATTEMPTS = 3
+
+
+def _as_date(value: object) -> datetime.date:
+    # SQLite returns DATE() as an ISO string, PostgreSQL as a date.
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    raise TypeError(f"Expected a date, got {type(value).__name__}: {value!r}")
+
+
+def refresh_daily_summary(
+    start_day: datetime.date,
+    end_day: Optional[datetime.date] = None,
+    targets: Optional[List[UploadTarget]] = None,
+) -> int:
+    """
+    Recomputes the upload_daily_summary rows of the UTC days from `start_day` to `end_day`
+    (inclusive, default today) from the upload_status rows recorded on those days.
+
+    The counts are grouped by day, target and status in the database, using the index on
+    timestamp, and the conversion action of each target is taken from the current target
+    configuration. Days whose upload_status rows have been archived must not be refreshed,
+    since their counts would be lost; the pipeline only refreshes the days of the current run.
+
+    Args:
+        start_day: First day to recompute.
+        end_day: Last day to recompute; today (UTC) if None.
+        targets: The configured upload targets; loaded with load_upload_targets if None.
+
+    Returns:
+        The number of summary rows written.
+
+    Raises:
+        Any exceptions raised by database queries will propagate.
+    """
+    end_day = end_day or datetime.datetime.utcnow().date()
+    conversion_actions = {target.name: target.conversion_action for target in (targets or load_upload_targets())}
+
+    day = func.date(UploadStatus.timestamp)
+    counts_query = (
+        select(day, UploadStatus.target, UploadStatus.status, func.count())
+        .where(
+            UploadStatus.timestamp >= datetime.datetime.combine(start_day, datetime.time()),
+            UploadStatus.timestamp < datetime.datetime.combine(end_day + datetime.timedelta(days=1), datetime.time()),
+        )
+        .group_by(day, UploadStatus.target, UploadStatus.status)
+    )
+
+    for attempt in range(1, REFRESH_ATTEMPTS + 1):
+        with SessionLocal() as session:
+            now = datetime.datetime.utcnow()
+            rows = [
+                {
+                    "day": _as_date(row_day),
+                    "target": target,
+                    "status": status,
+                    "conversion_action": conversion_actions.get(target),
+                    "count": count,
+                    "updated_at": now,
+                }
+                for row_day, target, status, count in session.execute(counts_query)
+            ]
+            session.execute(
+                delete(UploadDailySummary).where(UploadDailySummary.day >= start_day, UploadDailySummary.day <= end_day)
+            )
+            if rows:
+                session.execute(insert(UploadDailySummary), rows)
+            try:
+                session.commit()
+                break
+            except IntegrityError:
+                # Another instance refreshed the same days concurrently; recompute.
+                session.rollback()
+                if attempt == REFRESH_ATTEMPTS:
+                    raise
+
+    logger.info(f"Refreshed {len(rows)} daily summary rows from {start_day.isoformat()} to {end_day.isoformat()}.")
+    return len(rows)
+
+
+def load_daily_summary(
+    start_day: Optional[datetime.date] = None,
+    end_day: Optional[datetime.date] = None,
+    target: Optional[str] = None,
+    status: Optional[str] = None,
+) -> List[UploadDailySummary]:
+    """
+    Retrieves the upload_daily_summary rows matching the given filters, ordered by day,
+    target and status.
+
+    Args:
+        start_day, end_day: Inclusive range of UTC days; unbounded if None.
+        target: Only rows of this upload target.
+        status: Only rows with this upload status.
+
+    Returns:
+        The matching UploadDailySummary rows.
+    """
+    query = select(UploadDailySummary).order_by(
+        UploadDailySummary.day, UploadDailySummary.target, UploadDailySummary.status
+    )
+    if start_day is not None:
+        query = query.where(UploadDailySummary.day >= start_day)
+    if end_day is not None:
+        query = query.where(UploadDailySummary.day <= end_day)
+    if target is not None:
+        query = query.where(UploadDailySummary.target == target)
+    if status is not None:
+        query = query.where(UploadDailySummary.status == status)
+
+    with SessionLocal() as session:
+        return list(session.scalars(query))
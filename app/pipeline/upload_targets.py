@@ -0,0 +1,156 @@
+import os
+import re
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.models.opportunity_record import OpportunityRecord
+
+# Target used when no GADS_UPLOAD_TARGETS are configured.
+DEFAULT_TARGET_NAME = "default"
+DEFAULT_CONVERSION_ACTION_ID = 462477827
+
+# Salesforce field names (optionally dotted relationship paths) allowed in target filters.
+_FIELD_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9_]*(\.[A-Za-z][A-Za-z0-9_]*)*$")
+
+
+@dataclass
+class UploadTarget:
+    """
+    A Google Ads customer and conversion action that matching Salesforce records are uploaded to.
+
+    `salesforce_filter` maps Salesforce fields to the values they must have, e.g.
+    {"Campus__c": ["Austin", "Dallas"]}; a record matches when every field holds one of
+    its values. An empty filter matches every record.
+    """
+    name: str
+    customer_id: Optional[str]
+    conversion_action_id: int
+    login_customer_id: Optional[str] = None
+    salesforce_filter: Dict[str, List[str]] = field(default_factory=dict)
+    max_workers: Optional[int] = None
+
+    @property
+    def conversion_action(self) -> str:
+        return f"customers/{self.customer_id}/conversionActions/{self.conversion_action_id}"
+
+    def matches(self, record: OpportunityRecord) -> bool:
+        return all(
+            record.field(field_name) in values
+            for field_name, values in self.salesforce_filter.items()
+        )
+
+
+def default_upload_target() -> UploadTarget:
+    """
+    Returns the single target used when none are configured: GADS_CUSTOMER and
+    GADS_LOGIN_CUSTOMER_ID with the default conversion action, for every record.
+    """
+    return UploadTarget(
+        name=DEFAULT_TARGET_NAME,
+        customer_id=os.getenv("GADS_CUSTOMER"),
+        conversion_action_id=DEFAULT_CONVERSION_ACTION_ID,
+        login_customer_id=os.getenv("GADS_LOGIN_CUSTOMER_ID"),
+    )
+
+
+def _parse_target(config: Dict[str, Any]) -> UploadTarget:
+    missing = [key for key in ("name", "customer_id", "conversion_action_id") if not config.get(key)]
+    if missing:
+        raise ValueError(f"Upload target {config!r} is missing {', '.join(missing)}.")
+
+    salesforce_filter: Dict[str, List[str]] = {}
+    for field_name, values in (config.get("salesforce_filter") or {}).items():
+        if not _FIELD_PATTERN.match(field_name):
+            raise ValueError(f"Upload target '{config['name']}' filters on invalid field name {field_name!r}.")
+        salesforce_filter[field_name] = [str(value) for value in (values if isinstance(values, list) else [values])]
+
+    return UploadTarget(
+        name=str(config["name"]),
+        customer_id=str(config["customer_id"]),
+        conversion_action_id=int(config["conversion_action_id"]),
+        login_customer_id=str(config.get("login_customer_id") or os.getenv("GADS_LOGIN_CUSTOMER_ID") or "") or None,
+        salesforce_filter=salesforce_filter,
+        max_workers=int(config["max_workers"]) if config.get("max_workers") else None,
+    )
+
+
+def load_upload_targets() -> List[UploadTarget]:
+    """
+    Loads the upload targets from GADS_UPLOAD_TARGETS (a JSON list) or, if that is not set,
+    from the JSON file at GADS_UPLOAD_TARGETS_FILE. Each entry has:
+      - name: Unique target name, stored with every upload status.
+      - customer_id: Google Ads customer the conversions are uploaded to.
+      - conversion_action_id: Conversion action of that customer.
+      - login_customer_id (optional): Manager account; defaults to GADS_LOGIN_CUSTOMER_ID.
+      - salesforce_filter (optional): Field to allowed values mapping selecting the records.
+      - max_workers (optional): Concurrent upload requests for this target; defaults to GADS_UPLOAD_MAX_WORKERS.
+
+    Returns:
+        The configured targets, or the default target if none are configured.
+
+    Raises:
+        ValueError: If the configuration is malformed or target names are not unique.
+    """
+    raw_config = os.getenv("GADS_UPLOAD_TARGETS")
+    if not raw_config and os.getenv("GADS_UPLOAD_TARGETS_FILE"):
+        with open(os.environ["GADS_UPLOAD_TARGETS_FILE"]) as config_file:
+            raw_config = config_file.read()
+    if not raw_config:
+        return [default_upload_target()]
+
+    configs = json.loads(raw_config)
+    if not isinstance(configs, list) or not configs:
+        raise ValueError("Upload targets must be configured as a non-empty JSON list.")
+
+    targets = [_parse_target(config) for config in configs]
+    names = [target.name for target in targets]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Upload target names must be unique: {names}.")
+    return targets
+
+
+def filter_fields(targets: List[UploadTarget]) -> List[str]:
+    """
+    Returns the Salesforce fields the targets filter on, which must be queried with the records.
+    """
+    return sorted({field_name for target in targets for field_name in target.salesforce_filter})
+
+
+def _soql_literal(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def build_target_condition(targets: List[UploadTarget]) -> Optional[str]:
+    """
+    Builds a SOQL condition selecting the records matched by any of the targets, so a single
+    Salesforce query serves all of them.
+
+    Returns:
+        The condition, or None if some target matches every record.
+    """
+    if any(not target.salesforce_filter for target in targets):
+        return None
+    conditions = []
+    for target in targets:
+        clauses = [
+            f"{field_name} IN ({', '.join(_soql_literal(value) for value in values)})"
+            for field_name, values in sorted(target.salesforce_filter.items())
+        ]
+        conditions.append("(" + " AND ".join(clauses) + ")")
+    return "(" + " OR ".join(conditions) + ")"
+
+
+def assign_targets(records: List[OpportunityRecord], targets: List[UploadTarget]) -> Dict[str, List[OpportunityRecord]]:
+    """
+    Assigns the records to every target whose filter they match.
+
+    Returns:
+        A dictionary of target name to its matching records, with an entry for every target.
+    """
+    assignments: Dict[str, List[OpportunityRecord]] = {target.name: [] for target in targets}
+    for record in records:
+        for target in targets:
+            if target.matches(record):
+                assignments[target.name].append(record)
+    return assignments
@@ -0,0 +1,100 @@
+"""
+Local stand-in for the Google Ads ConversionUploadService gRPC API.
+
+Serves UploadClickConversions over TLS with the certificate of a running FakeServiceServer,
+sharing its configuration: the same latency, the same deterministic conversion failures
+(reported as a GoogleAdsFailure partial failure) and the same per-customer upload quota
+(exceeded requests fail with RESOURCE_EXHAUSTED and a quota error carrying a retry delay).
+
+Clients must trust the certificate through GRPC_DEFAULT_SSL_ROOTS_FILE_PATH.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Tuple
+
+import grpc
+from google.ads.googleads.v18.errors.types.errors import GoogleAdsFailure
+from google.ads.googleads.v18.errors.types.conversion_upload_error import ConversionUploadErrorEnum
+from google.ads.googleads.v18.errors.types.quota_error import QuotaErrorEnum
+from google.ads.googleads.v18.services.types.conversion_upload_service import (
+    UploadClickConversionsRequest,
+    UploadClickConversionsResponse,
+)
+
+from benchmarks.fake_services import MAX_CONVERSIONS_PER_REQUEST, FakeServiceServer, conversion_fails, conversion_key
+
+# Trailing metadata key under which the google-ads client looks for a GoogleAdsFailure.
+FAILURE_METADATA_KEY = "google.ads.googleads.v18.errors.googleadsfailure-bin"
+
+_RequestPb = UploadClickConversionsRequest.pb()
+_ResponsePb = UploadClickConversionsResponse.pb()
+_FailurePb = GoogleAdsFailure.pb()
+
+
+def _upload_click_conversions(http_server: FakeServiceServer, request: Any, context: grpc.ServicerContext) -> Any:
+    config = http_server.config
+    time.sleep(config.latency_seconds)
+
+    if not http_server.take_upload_quota(request.customer_id):
+        failure = _FailurePb()
+        error = failure.errors.add()
+        error.error_code.quota_error = QuotaErrorEnum.QuotaError.RESOURCE_TEMPORARILY_EXHAUSTED
+        error.message = "Too many requests. Retry in 1 seconds."
+        error.details.quota_error_details.retry_delay.seconds = 1
+        context.set_trailing_metadata(((FAILURE_METADATA_KEY, failure.SerializeToString()), ("request-id", "fake")))
+        context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Resource has been exhausted (e.g. check quota).")
+
+    if len(request.conversions) > MAX_CONVERSIONS_PER_REQUEST:
+        context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Too many conversions in request.")
+
+    response = _ResponsePb()
+    failure = _FailurePb()
+    for index, conversion in enumerate(request.conversions):
+        result = response.results.add()
+        identifiers = [
+            {"hashedEmail": identifier.hashed_email, "hashedPhoneNumber": identifier.hashed_phone_number}
+            for identifier in conversion.user_identifiers
+        ]
+        if conversion_fails(conversion_key(conversion.gclid, identifiers), config.failure_rate):
+            error = failure.errors.add()
+            error.error_code.conversion_upload_error = ConversionUploadErrorEnum.ConversionUploadError.EVENT_NOT_FOUND
+            error.message = "The click associated with the given identifier could not be found."
+            element = error.location.field_path_elements.add()
+            element.field_name = "conversions"
+            element.index = index
+        else:
+            result.gclid = conversion.gclid
+            result.conversion_action = conversion.conversion_action
+            result.conversion_date_time = conversion.conversion_date_time
+
+    if failure.errors:
+        response.partial_failure_error.code = grpc.StatusCode.INVALID_ARGUMENT.value[0]
+        response.partial_failure_error.message = f"{len(failure.errors)} conversion(s) failed."
+        response.partial_failure_error.details.add().Pack(failure)
+    return response
+
+
+def start_fake_grpc_service(http_server: FakeServiceServer) -> Tuple[grpc.Server, str]:
+    """
+    Starts the fake ConversionUploadService next to a running FakeServiceServer.
+
+    Returns:
+        The running gRPC server and its endpoint (host:port) for GADS_GRPC_ENDPOINT.
+    """
+    handler = grpc.method_handlers_generic_handler(
+        "google.ads.googleads.v18.services.ConversionUploadService",
+        {
+            "UploadClickConversions": grpc.unary_unary_rpc_method_handler(
+                lambda request, context: _upload_click_conversions(http_server, request, context),
+                request_deserializer=_RequestPb.FromString,
+                response_serializer=_ResponsePb.SerializeToString,
+            ),
+        },
+    )
+    server = grpc.server(ThreadPoolExecutor(max_workers=32))
+    server.add_generic_rpc_handlers((handler,))
+    with open(http_server.keyfile, "rb") as keyfile, open(http_server.certfile, "rb") as certfile:
+        credentials = grpc.ssl_server_credentials(((keyfile.read(), certfile.read()),))
+    port = server.add_secure_port("127.0.0.1:0", credentials)
+    server.start()
+    return server, f"127.0.0.1:{port}"
@@ -0,0 +1,310 @@
+"""
+Local stand-ins for the Salesforce and Google APIs used by the pipeline.
+
+A single HTTPS server answers:
+  - POST /services/oauth2/token                        Salesforce password grant
+  - GET  /services/data/v55.0/query?q=...              first SOQL result page (or a COUNT() result)
+  - GET  /services/data/v55.0/query/<cursor>           following SOQL result pages
+  - POST /services/data/v55.0/jobs/query               Bulk API 2.0 query job creation
+  - GET  /services/data/v55.0/jobs/query/<id>          Bulk API 2.0 job status
+  - GET  /services/data/v55.0/jobs/query/<id>/results  Bulk API 2.0 CSV results, paged by Sforce-Locator
+  - POST /token                                        Google OAuth refresh
+  - POST /<version>/customers/<id>:uploadClickConversions
+
+Opportunities are generated on the fly, so record counts in the millions do not need memory.
+Conversions fail deterministically (by GCLID hash) at the configured rate, and every request
+waits for the configured latency before answering. With an upload quota, uploadClickConversions
+requests beyond that many per second and customer are rejected with 429 RESOURCE_EXHAUSTED.
+"""
+import io
+import os
+import csv
+import ssl
+import re
+import json
+import time
+import zlib
+import tempfile
+import threading
+import subprocess
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Salesforce REST query pages hold at most 2000 records.
+SALESFORCE_PAGE_SIZE = 2000
+
+# Google Ads rejects uploads of more than 2000 conversions per request.
+MAX_CONVERSIONS_PER_REQUEST = 2000
+
+
+@dataclass
+class FakeServiceConfig:
+    total_records: int = 1000
+    latency_seconds: float = 0.0
+    failure_rate: float = 0.0
+    upload_quota_rps: float = 0.0
+    missing_gclid_rate: float = 0.0
+
+
+def opportunity(index: int, missing_gclid_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Returns the generated Opportunity at position `index`. A deterministic `missing_gclid_rate`
+    share of them has no GCLID; all of them have an email address and a phone number, written
+    the untidy ways people enter them.
+    """
+    missing_gclid = zlib.crc32(f"missing-{index}".encode()) % 10000 < missing_gclid_rate * 10000
+    return {
+        "attributes": {"type": "Opportunity", "url": f"/services/data/v55.0/sobjects/Opportunity/{index}"},
+        "Id": f"006{index:015d}",
+        "GCLID__c": None if missing_gclid else f"gclid-{index:012d}",
+        "Email__c": f" Student.{index}@Example.com",
+        "Phone__c": f"(512) {index // 10000 % 1000:03d}-{index % 10000:04d}",
+        "Name": f"Benchmark opportunity {index}",
+        "Campus__c": ("Austin", "Dallas", "Houston")[index % 3],
+        "Original_Lead_Created_Date_Time__c": "2024-01-15T10:30:00.000+0000",
+        "Admission_Date__c": "2024-02-01T00:00:00.000+0000",
+        "SystemModstamp": "2024-02-02T08:00:00.000+0000",
+    }
+
+
+# Columns of the Bulk API CSV results, in the order the pipeline selects them.
+BULK_COLUMNS = [
+    "Id", "GCLID__c", "Original_Lead_Created_Date_Time__c", "Admission_Date__c", "SystemModstamp", "Campus__c",
+    "Email__c", "Phone__c",
+]
+
+
+def bulk_row(index: int, missing_gclid_rate: float = 0.0) -> List[str]:
+    """
+    Returns the generated Opportunity at position `index` as a Bulk API CSV row.
+    """
+    record = opportunity(index, missing_gclid_rate)
+    # Bulk API results format datetimes with a "Z" suffix and empty values as empty strings.
+    return [str(record[column] or "").replace(".000+0000", ".000Z") for column in BULK_COLUMNS]
+
+
+def first_index(soql: str) -> int:
+    """
+    Returns the position of the first generated Opportunity a REST query selects: records are
+    generated in Id order, and resumed runs only ask for those after a given Id.
+    """
+    match = re.search(r"Id > '006(\d+)'", soql)
+    return int(match.group(1)) + 1 if match else 0
+
+
+def conversion_key(gclid: str, user_identifiers: List[Dict[str, Any]]) -> str:
+    """
+    Returns what a conversion is matched on: its GCLID, or else its first hashed identifier.
+    """
+    if gclid or not user_identifiers:
+        return gclid
+    return user_identifiers[0].get("hashedEmail") or user_identifiers[0].get("hashedPhoneNumber", "")
+
+
+def conversion_fails(key: str, failure_rate: float) -> bool:
+    """
+    Decides deterministically whether the conversion matched on `key` (see conversion_key) is
+    reported as failed.
+    """
+    return zlib.crc32(key.encode()) % 10000 < failure_rate * 10000
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeServiceServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        self._send(status, json.dumps(body).encode(), "application/json")
+
+    def _send(self, status: int, payload: bytes, content_type: str, headers: Dict[str, str] = {}) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _bulk_results(self, query: Dict[str, List[str]]) -> None:
+        total = self.server.config.total_records
+        offset = int(query.get("locator", ["0"])[0])
+        end = min(offset + int(query.get("maxRecords", [str(total)])[0]), total)
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(BULK_COLUMNS)
+        writer.writerows(bulk_row(index, self.server.config.missing_gclid_rate) for index in range(offset, end))
+        locator = str(end) if end < total else "null"
+        self._send(200, output.getvalue().encode(), "text/csv", {"Sforce-Locator": locator})
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", "0")))
+
+    def _query_page(self, offset: int) -> Dict[str, Any]:
+        total = self.server.config.total_records
+        end = min(offset + SALESFORCE_PAGE_SIZE, total)
+        page = {
+            "totalSize": total,
+            "done": end >= total,
+            "records": [opportunity(index, self.server.config.missing_gclid_rate) for index in range(offset, end)],
+        }
+        if end < total:
+            page["nextRecordsUrl"] = f"/services/data/v55.0/query/01gBENCH-{end}"
+        return page
+
+    def do_GET(self) -> None:
+        time.sleep(self.server.config.latency_seconds)
+        url = urlparse(self.path)
+        path = url.path
+        query = parse_qs(url.query)
+        if path.endswith("/jobs/query/750BENCH/results"):
+            self._bulk_results(query)
+        elif path.endswith("/jobs/query/750BENCH"):
+            self._send_json(200, {"id": "750BENCH", "state": "JobComplete", "numberRecordsProcessed": self.server.config.total_records})
+        elif (path.endswith("/query/") or path.endswith("/query")) and "COUNT()" in query.get("q", [""])[0]:
+            remaining = self.server.config.total_records - first_index(query["q"][0])
+            self._send_json(200, {"totalSize": max(remaining, 0), "done": True, "records": []})
+        elif path.endswith("/query/") or path.endswith("/query"):
+            self._send_json(200, self._query_page(first_index(query.get("q", [""])[0])))
+        elif "/query/01gBENCH-" in path:
+            self._send_json(200, self._query_page(int(path.rsplit("-", 1)[1])))
+        else:
+            self._send_json(404, {"error": f"Unknown path {path}"})
+
+    def do_POST(self) -> None:
+        time.sleep(self.server.config.latency_seconds)
+        body = self._read_body()
+        path = urlparse(self.path).path
+        if path == "/services/oauth2/token":
+            self._send_json(200, {"access_token": "salesforce-token", "instance_url": self.server.base_url})
+        elif path.endswith("/jobs/query"):
+            self._send_json(200, {"id": "750BENCH", "state": "UploadComplete"})
+        elif path == "/token":
+            self._send_json(200, {"access_token": "google-token", "expires_in": 3599, "token_type": "Bearer"})
+        elif path.endswith(":uploadClickConversions"):
+            self._upload_click_conversions(path.rsplit("/", 1)[1].split(":")[0], json.loads(body))
+        else:
+            self._send_json(404, {"error": f"Unknown path {path}"})
+
+    def _upload_click_conversions(self, customer_id: str, request: Dict[str, Any]) -> None:
+        if not self.server.take_upload_quota(customer_id):
+            self._send_json(429, {"error": {
+                "code": 429,
+                "status": "RESOURCE_EXHAUSTED",
+                "message": "Resource has been exhausted (e.g. check quota).",
+                "details": [{
+                    "@type": "type.googleapis.com/google.ads.googleads.v18.errors.GoogleAdsFailure",
+                    "errors": [{
+                        "errorCode": {"quotaError": "RESOURCE_TEMPORARILY_EXHAUSTED"},
+                        "message": "Too many requests. Retry in 1 seconds.",
+                        "details": {"quotaErrorDetails": {"rateScope": "CUSTOMER", "rateName": "Requests per customer", "retryDelay": "1s"}},
+                    }],
+                }],
+            }})
+            return
+
+        conversions: List[Dict[str, Any]] = request.get("conversions", [])
+        if len(conversions) > MAX_CONVERSIONS_PER_REQUEST:
+            self._send_json(400, {"error": {"code": 400, "status": "INVALID_ARGUMENT", "message": "Too many conversions in request."}})
+            return
+
+        results: List[Dict[str, Any]] = []
+        errors: List[Dict[str, Any]] = []
+        for index, conversion in enumerate(conversions):
+            gclid = conversion.get("gclid", "")
+            if conversion_fails(conversion_key(gclid, conversion.get("userIdentifiers", [])), self.server.config.failure_rate):
+                results.append({})
+                errors.append({
+                    "errorCode": {"conversionUploadError": "EVENT_NOT_FOUND"},
+                    "message": "The click associated with the given identifier could not be found.",
+                    "location": {"fieldPathElements": [{"fieldName": "conversions", "index": index}]},
+                })
+            else:
+                results.append({
+                    "gclid": gclid,
+                    "conversionAction": conversion.get("conversionAction"),
+                    "conversionDateTime": conversion.get("conversionDateTime"),
+                })
+
+        response: Dict[str, Any] = {"results": results}
+        if errors:
+            response["partialFailureError"] = {
+                "code": 3,
+                "message": f"{len(errors)} conversion(s) failed.",
+                "details": [{"@type": "type.googleapis.com/google.ads.googleads.v18.errors.GoogleAdsFailure", "errors": errors}],
+            }
+        self._send_json(200, response)
+
+
+class FakeServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, config: FakeServiceConfig, certfile: str, keyfile: str) -> None:
+        super().__init__(("127.0.0.1", 0), FakeServiceHandler)
+        self.config = config
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.throttled_requests = 0
+        self._quota_buckets: Dict[str, Tuple[float, float]] = {}
+        self._quota_lock = threading.Lock()
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        self.socket = context.wrap_socket(self.socket, server_side=True)
+        self.base_url = f"https://127.0.0.1:{self.server_address[1]}"
+
+    def take_upload_quota(self, customer_id: str) -> bool:
+        """
+        Takes one request from the customer's upload quota, a token bucket refilled at
+        upload_quota_rps per second with one second of burst. Always succeeds without a quota.
+        """
+        rate = self.config.upload_quota_rps
+        if not rate:
+            return True
+        with self._quota_lock:
+            now = time.monotonic()
+            tokens, updated_at = self._quota_buckets.get(customer_id, (rate, now))
+            tokens = min(tokens + (now - updated_at) * rate, rate)
+            allowed = tokens >= 1.0
+            self._quota_buckets[customer_id] = (tokens - 1.0 if allowed else tokens, now)
+            if not allowed:
+                self.throttled_requests += 1
+            return allowed
+
+
+def create_certificate(directory: str) -> Tuple[str, str]:
+    """
+    Generates a self-signed certificate for 127.0.0.1 with the openssl command line tool.
+
+    Returns:
+        The certificate and private key paths.
+    """
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-keyout", keyfile, "-out", certfile, "-subj", "/CN=127.0.0.1",
+            "-addext", "subjectAltName=IP:127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return certfile, keyfile
+
+
+def start_fake_services(config: FakeServiceConfig) -> Tuple[FakeServiceServer, str]:
+    """
+    Starts the fake services on a background thread.
+
+    Returns:
+        The running server and the path of its certificate, which clients must trust
+        (e.g. through REQUESTS_CA_BUNDLE).
+    """
+    certfile, keyfile = create_certificate(tempfile.mkdtemp(prefix="fake-services-"))
+    server = FakeServiceServer(config, certfile, keyfile)
+    threading.Thread(target=server.serve_forever, name="fake-services", daemon=True).start()
+    return server, certfile
@@ -0,0 +1,157 @@
+"""
+Offline throughput benchmark for the pipeline.
+
+Starts the local Salesforce and Google stand-ins from benchmarks.fake_services and, for each
+requested record count, runs pipeline_runner.run_pipeline (the work behind /pipeline) in a
+fresh subprocess against an empty database. Reports wall time, throughput, peak resident
+memory and the per-stage time breakdown from the pipeline metrics.
+
+Usage:
+    python -m benchmarks.pipeline_benchmark --sizes 1000,100000,1000000 --latency-ms 50 --failure-rate 0.02
+
+By default every run uses its own SQLite file. When --db-url is given, the pipeline tables
+in that database are DROPPED and recreated before each run; only point it at a scratch database.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+from typing import Any, Dict, List
+
+from benchmarks.fake_services import FakeServiceConfig, start_fake_services
+
+
+def run_child() -> None:
+    """
+    Runs the pipeline once in this process and prints the measurements as JSON on the last line.
+    """
+    from prometheus_client import REGISTRY
+    from app.core.database.sql_adaptor import Base, engine
+    from app.pipeline.pipeline_runner import run_pipeline
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    start = time.perf_counter()
+    summary = run_pipeline()
+    wall_seconds = time.perf_counter() - start
+
+    stages: Dict[str, float] = {}
+    for metric in REGISTRY.collect():
+        if metric.name == "pipeline_stage_duration_seconds":
+            for sample in metric.samples:
+                if sample.name.endswith("_sum"):
+                    stages[sample.labels["stage"]] = sample.value
+
+    # ru_maxrss is reported in kilobytes on Linux.
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({
+        "wall_seconds": wall_seconds,
+        "peak_rss_mb": peak_rss_mb,
+        "stored": summary["stored"],
+        "stages": stages,
+    }))
+
+
+def run_size(size: int, base_url: str, certfile: str, args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    """
+    Runs the pipeline for `size` records in a subprocess and returns its measurements.
+    """
+    env = dict(os.environ)
+    env.update({
+        "DB_URL": args.db_url or f"sqlite:///{os.path.join(workdir, f'benchmark-{size}.db')}",
+        "REQUESTS_CA_BUNDLE": certfile,
+        "SSL_CERT_FILE": certfile,
+        "SALESFORCE_LOGIN_URL": base_url,
+        "SALESFORCE_CLIENT_ID": "benchmark",
+        "SALESFORCE_CLIENT_SECRET": "benchmark",
+        "SALESFORCE_USERNAME": "benchmark@example.com",
+        "SALESFORCE_PASSWORD": "benchmark",
+        "GOOGLE_TOKEN_URI": f"{base_url}/token",
+        "OAUTH_CLIENT_ID": "benchmark",
+        "OAUTH_CLIENT_SECRET": "benchmark",
+        "OAUTH_REFRESH_TOKEN": "benchmark",
+        "GADS_API_BASE_URL": base_url,
+        "GADS_CUSTOMER": "1234567890",
+        "GADS_DEVELOPER_TOKEN": "benchmark",
+        "GADS_LOGIN_CUSTOMER_ID": "1234567890",
+        "PIPELINE_STREAMING": "true" if args.streaming else "false",
+        "SALESFORCE_QUERY_MODE": args.query_mode,
+    })
+    if args.enhanced:
+        env.update({"SALESFORCE_EMAIL_FIELD": "Email__c", "SALESFORCE_PHONE_FIELD": "Phone__c"})
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.pipeline_benchmark", "--child"],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+        text=True,
+        check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["size"] = size
+    return result
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    stage_names = sorted({stage for result in results for stage in result["stages"]})
+    print(f"{'records':>10} {'wall s':>9} {'rec/s':>10} {'peak MB':>9} {'stored':>10} {'429s':>6}  stages (s)")
+    for result in results:
+        throughput = result["size"] / result["wall_seconds"] if result["wall_seconds"] else 0.0
+        stages = " ".join(f"{stage}={result['stages'][stage]:.2f}" for stage in stage_names if stage in result["stages"])
+        print(
+            f"{result['size']:>10} {result['wall_seconds']:>9.2f} {throughput:>10.0f} "
+            f"{result['peak_rss_mb']:>9.1f} {result['stored']:>10} {result.get('throttled', 0):>6}  {stages}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Comma-separated record counts to benchmark.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency added to every fake API response.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of conversions reported as failed.")
+    parser.add_argument("--upload-quota-rps", type=float, default=0.0, help="Upload requests per second and customer accepted by the fake Google Ads API; 0 for no quota.")
+    parser.add_argument("--missing-gclid-rate", type=float, default=0.0, help="Fraction of generated Opportunities without a GCLID.")
+    parser.add_argument("--enhanced", action="store_true", help="Upload enhanced conversions, matched on the generated email addresses and phone numbers.")
+    parser.add_argument("--streaming", action="store_true", help="Run the pipeline in streaming mode.")
+    parser.add_argument("--query-mode", choices=("auto", "rest", "bulk"), default="auto", help="Salesforce query mode.")
+    parser.add_argument("--db-url", help="Scratch database to use instead of a temporary SQLite file per run.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline logs.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        return
+
+    config = FakeServiceConfig(
+        latency_seconds=args.latency_ms / 1000,
+        failure_rate=args.failure_rate,
+        upload_quota_rps=args.upload_quota_rps,
+        missing_gclid_rate=args.missing_gclid_rate,
+    )
+    server, certfile = start_fake_services(config)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="pipeline-benchmark-") as workdir:
+        for size in (int(size) for size in args.sizes.split(",")):
+            config.total_records = size
+            throttled_before = server.throttled_requests
+            results.append(run_size(size, server.base_url, certfile, args, workdir))
+            results[-1]["throttled"] = server.throttled_requests - throttled_before
+            print_report(results[-1:])
+    server.shutdown()
+
+    print()
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
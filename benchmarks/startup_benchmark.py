@@ -0,0 +1,98 @@
+"""
+Cold start benchmark for the service.
+
+Starts fresh interpreters that import app.main (what uvicorn does before it can accept
+connections) and serve one request to /pipeline/scheduler through the ASGI interface.
+Reports the median import time, time to the first response, and which heavy integration
+clients were loaded along the way.
+
+Usage:
+    python -m benchmarks.startup_benchmark --runs 10
+
+No database connection is needed unless DB_CREATE_ALL is set; by default a SQLite URL
+that is never opened is used.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List
+
+# Integration clients that should not be imported until a pipeline run needs them.
+HEAVY_MODULES = ["simple_salesforce", "google.auth", "google.oauth2", "requests", "httpx"]
+
+
+def run_child() -> None:
+    """
+    Imports the app, serves one request and prints the measurements as JSON on the last line.
+    """
+    import asyncio
+
+    start = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    async def first_request() -> int:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/pipeline/scheduler", "raw_path": b"/pipeline/scheduler",
+            "query_string": b"", "root_path": "", "headers": [], "client": ("127.0.0.1", 0),
+            "server": ("127.0.0.1", 80),
+        }
+        messages: List[Dict[str, Any]] = []
+
+        async def receive() -> Dict[str, Any]:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message: Dict[str, Any]) -> None:
+            messages.append(message)
+
+        await app(scope, receive, send)
+        return next(message["status"] for message in messages if message["type"] == "http.response.start")
+
+    status = asyncio.run(first_request())
+    responded = time.perf_counter()
+
+    print(json.dumps({
+        "import_seconds": imported - start,
+        "first_response_seconds": responded - start,
+        "status": status,
+        "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="Number of cold starts to measure.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        return
+
+    env = dict(os.environ)
+    env.setdefault("DB_URL", "sqlite:///startup-benchmark.db")
+    results = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup_benchmark", "--child"],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True,
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result["process_seconds"] = time.perf_counter() - start
+        results.append(result)
+
+    for name in ("import_seconds", "first_response_seconds", "process_seconds"):
+        values = [result[name] for result in results]
+        print(f"{name:>24}: median {statistics.median(values) * 1000:8.1f} ms   min {min(values) * 1000:8.1f} ms")
+    print(f"{'first response status':>24}: {results[-1]['status']}")
+    print(f"{'heavy modules loaded':>24}: {', '.join(results[-1]['heavy_modules']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
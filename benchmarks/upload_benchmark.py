@@ -0,0 +1,132 @@
+"""
+Compares the REST and gRPC Google Ads upload backends.
+
+Starts the local Google stand-ins (benchmarks.fake_services and benchmarks.fake_grpc_service)
+and, for each backend and record count, uploads generated conversions with
+google_ads_upload.upload_conversions in a fresh subprocess. Reports wall time, throughput
+and the client's CPU time, which is where JSON and protobuf encoding costs show up.
+
+Usage:
+    python -m benchmarks.upload_benchmark --sizes 10000,100000 --latency-ms 50 --failure-rate 0.02
+
+Only the local stand-ins are supported: uploads to the real API would record the conversions.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from typing import Any, Dict, List
+
+from benchmarks.fake_services import FakeServiceConfig, opportunity, start_fake_services
+
+
+def run_child(size: int) -> None:
+    """
+    Uploads `size` generated conversions in this process and prints the measurements as JSON
+    on the last line.
+    """
+    from app.models.opportunity_record import OpportunityRecord
+    from app.pipeline.google_ads_upload import upload_conversions
+
+    records = [OpportunityRecord.from_salesforce(opportunity(index)) for index in range(size)]
+    # Warm up the connection and the OAuth token, as a long-running service would be.
+    upload_conversions(records[:1])
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    results = upload_conversions(records)
+    wall_seconds = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+
+    print(json.dumps({
+        "wall_seconds": wall_seconds,
+        "cpu_seconds": cpu_seconds,
+        "uploaded": sum(1 for result in results if "error" not in result),
+        "failed": sum(1 for result in results if "error" in result),
+    }))
+
+
+def run_backend(backend: str, size: int, env: Dict[str, str], verbose: bool) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.upload_benchmark", "--child", str(size)],
+        env={**env, "GADS_UPLOAD_BACKEND": backend},
+        stdout=subprocess.PIPE,
+        stderr=None if verbose else subprocess.DEVNULL,
+        text=True,
+        check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result.update(backend=backend, size=size)
+    return result
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    print(f"{'backend':>8} {'records':>10} {'wall s':>9} {'rec/s':>10} {'cpu s':>8} {'uploaded':>10} {'failed':>8}")
+    for result in results:
+        throughput = result["size"] / result["wall_seconds"] if result["wall_seconds"] else 0.0
+        print(
+            f"{result['backend']:>8} {result['size']:>10} {result['wall_seconds']:>9.2f} {throughput:>10.0f} "
+            f"{result['cpu_seconds']:>8.2f} {result['uploaded']:>10} {result['failed']:>8}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated conversion counts to upload.")
+    parser.add_argument("--backends", default="rest,grpc", help="Comma-separated upload backends to compare.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency added to every fake API response.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of conversions reported as failed.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    parser.add_argument("--verbose", action="store_true", help="Show the upload logs.")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child)
+        return
+
+    from benchmarks.fake_grpc_service import start_fake_grpc_service
+
+    server, certfile = start_fake_services(
+        FakeServiceConfig(latency_seconds=args.latency_ms / 1000, failure_rate=args.failure_rate)
+    )
+    grpc_server, grpc_endpoint = start_fake_grpc_service(server)
+    env = dict(os.environ)
+    env.setdefault("DB_URL", "sqlite://")
+    # The rate limiter is not under test; let it start at a rate the stand-ins never throttle.
+    env.setdefault("GADS_RATE_LIMIT_INITIAL_RPS", "1000")
+    env.setdefault("GADS_RATE_LIMIT_MAX_RPS", "1000")
+    env.update({
+        "REQUESTS_CA_BUNDLE": certfile,
+        "SSL_CERT_FILE": certfile,
+        "GRPC_DEFAULT_SSL_ROOTS_FILE_PATH": certfile,
+        "GOOGLE_TOKEN_URI": f"{server.base_url}/token",
+        "OAUTH_CLIENT_ID": "benchmark",
+        "OAUTH_CLIENT_SECRET": "benchmark",
+        "OAUTH_REFRESH_TOKEN": "benchmark",
+        "GADS_API_BASE_URL": server.base_url,
+        "GADS_GRPC_ENDPOINT": grpc_endpoint,
+        "GADS_CUSTOMER": "1234567890",
+        "GADS_DEVELOPER_TOKEN": "benchmark",
+        "GADS_LOGIN_CUSTOMER_ID": "1234567890",
+    })
+
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        for backend in args.backends.split(","):
+            results.append(run_backend(backend, size, env, args.verbose))
+            print_report(results[-1:])
+    grpc_server.stop(None)
+    server.shutdown()
+
+    print()
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
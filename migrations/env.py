@@ -0,0 +1,65 @@
+"""
+Alembic environment for the service's database.
+
+Runs migrations against DB_URL (loaded from .env like the app does), with the SQLAlchemy
+models as the target metadata for autogenerate.
+"""
+from dotenv import load_dotenv
+
+# Load environment variables before any other import
+load_dotenv()
+
+from logging.config import fileConfig
+from alembic import context
+from app.core.database.sql_adaptor import Base, engine
+
+# Import every model so that its table is registered on Base.metadata.
+import app.models.upload_status  # noqa: F401
+import app.models.upload_failure  # noqa: F401
+import app.models.sync_watermark  # noqa: F401
+import app.models.pipeline_lease  # noqa: F401
+import app.models.upload_daily_summary  # noqa: F401
+import app.models.pipeline_run  # noqa: F401
+import app.models.pipeline_run_chunk  # noqa: F401
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """
+    Emits the migration SQL for DB_URL to stdout instead of running it (alembic upgrade --sql).
+    """
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """
+    Runs the migrations on the app's engine. SQLite uses batch mode, since it cannot alter
+    constraints in place.
+    """
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
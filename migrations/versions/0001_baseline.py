@@ -0,0 +1,36 @@
+"""Baseline: the upload_status table as created by the original service
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "upload_status",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("salesforce_id", sa.String(), nullable=False),
+        sa.Column("gclid", sa.String(), nullable=True),
+        sa.Column("original_lead_created_datetime", sa.DateTime(), nullable=False),
+        sa.Column("admission_date", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("error_details", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_upload_status_id", "upload_status", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_upload_status_id", table_name="upload_status")
+    op.drop_table("upload_status")
@@ -0,0 +1,35 @@
+"""Sync watermarks for incremental Salesforce queries
+
+Creates the sync_watermark table. Databases that were created by create_all at an
+intermediate version may already have it, in which case it is left as is.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if "sync_watermark" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "sync_watermark",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("watermark", sa.DateTime(), nullable=True),
+        sa.Column("last_full_sync", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sync_watermark")
@@ -0,0 +1,36 @@
+"""Unique index on upload_status.salesforce_id
+
+Serves the IN-list lookups that filter out already processed records. Duplicate rows left
+by the original service are removed first, keeping the first row of each salesforce_id.
+Databases that were created by create_all at an intermediate version already have an index
+on salesforce_id (unique, or per target from revision 0005 on) and are left as they are.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("upload_status")}
+    if "ix_upload_status_salesforce_id" in indexes:
+        return
+    op.execute(
+        "DELETE FROM upload_status WHERE id NOT IN "
+        "(SELECT MIN(id) FROM upload_status GROUP BY salesforce_id)"
+    )
+    op.create_index("ix_upload_status_salesforce_id", "upload_status", ["salesforce_id"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_upload_status_salesforce_id", table_name="upload_status")
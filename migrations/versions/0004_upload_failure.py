@@ -0,0 +1,47 @@
+"""Failure queue
+
+Creates the upload_failure table, holding conversions that failed to upload until they are
+retried. Databases that were created by create_all at an intermediate version may already
+have it, in which case it is left to revision 0005 to bring up to date.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if "upload_failure" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "upload_failure",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("salesforce_id", sa.String(), nullable=False),
+        sa.Column("gclid", sa.String(), nullable=True),
+        sa.Column("original_lead_created_datetime", sa.DateTime(), nullable=False),
+        sa.Column("admission_date", sa.DateTime(), nullable=False),
+        sa.Column("error_code", sa.String(), nullable=True),
+        sa.Column("error_details", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("permanent", sa.Boolean(), nullable=False),
+        sa.Column("next_retry_at", sa.DateTime(), nullable=True),
+        sa.Column("first_failed_at", sa.DateTime(), nullable=False),
+        sa.Column("last_failed_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_upload_failure_id", "upload_failure", ["id"])
+    op.create_index("ix_upload_failure_salesforce_id", "upload_failure", ["salesforce_id"], unique=True)
+    op.create_index("ix_upload_failure_next_retry_at", "upload_failure", ["next_retry_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("upload_failure")
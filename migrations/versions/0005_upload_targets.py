@@ -0,0 +1,72 @@
+"""Upload targets
+
+Keys upload_status and upload_failure by (salesforce_id, target): existing rows belong to the
+default target. Databases that were created by create_all at an intermediate version may
+already have the target column or the new keys; they are brought up to date instead of
+being changed again.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _key_by_target(table: str) -> None:
+    """
+    Adds the target column to `table` (existing rows belong to the default target), removes
+    duplicate (salesforce_id, target) rows keeping the first, and replaces any unique index on
+    salesforce_id alone by a plain index and a unique constraint on (salesforce_id, target).
+    """
+    inspector = sa.inspect(op.get_bind())
+    if "target" not in {column["name"] for column in inspector.get_columns(table)}:
+        op.add_column(table, sa.Column("target", sa.String(), nullable=False, server_default="default"))
+
+    op.execute(
+        f"DELETE FROM {table} WHERE id NOT IN "
+        f"(SELECT MIN(id) FROM {table} GROUP BY salesforce_id, target)"
+    )
+
+    index_name = f"ix_{table}_salesforce_id"
+    indexes = {index["name"]: index for index in inspector.get_indexes(table)}
+    unique_constraints = {constraint["name"] for constraint in inspector.get_unique_constraints(table)}
+    with op.batch_alter_table(table) as batch:
+        if index_name in indexes and indexes[index_name]["unique"]:
+            batch.drop_index(index_name)
+            del indexes[index_name]
+        if index_name not in indexes:
+            batch.create_index(index_name, ["salesforce_id"])
+        if f"uq_{table}_salesforce_id_target" not in unique_constraints:
+            batch.create_unique_constraint(f"uq_{table}_salesforce_id_target", ["salesforce_id", "target"])
+
+
+def _unkey_by_target(table: str) -> None:
+    """
+    Reverts _key_by_target: drops the target column, keeping the first row of each
+    salesforce_id, and makes the salesforce_id index unique again.
+    """
+    op.execute(f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY salesforce_id)")
+    with op.batch_alter_table(table) as batch:
+        batch.drop_constraint(f"uq_{table}_salesforce_id_target", type_="unique")
+        batch.drop_index(f"ix_{table}_salesforce_id")
+        batch.drop_column("target")
+        batch.create_index(f"ix_{table}_salesforce_id", ["salesforce_id"], unique=True)
+
+
+def upgrade() -> None:
+    _key_by_target("upload_status")
+    _key_by_target("upload_failure")
+
+
+def downgrade() -> None:
+    _unkey_by_target("upload_failure")
+    _unkey_by_target("upload_status")
@@ -0,0 +1,37 @@
+"""Run leases
+
+Creates the pipeline_lease table, holding the lease of each pipeline run in progress.
+Databases that were created by create_all at an intermediate version may already have it,
+in which case it is left as is.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if "pipeline_lease" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "pipeline_lease",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("owner", sa.String(), nullable=False),
+        sa.Column("acquired_at", sa.DateTime(), nullable=False),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("pipeline_lease")
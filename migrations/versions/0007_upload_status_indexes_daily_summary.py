@@ -0,0 +1,46 @@
+"""Indexes on upload_status status and timestamp, and the daily upload summary table
+
+The summary is backfilled from the existing upload_status rows. Its conversion_action
+column is left empty for the backfilled days and filled in for days refreshed by pipeline
+runs, from the target configuration at that time.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_upload_status_status", "upload_status", ["status"])
+    op.create_index("ix_upload_status_timestamp", "upload_status", ["timestamp"])
+
+    op.create_table(
+        "upload_daily_summary",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("target", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), primary_key=True),
+        sa.Column("conversion_action", sa.String(), nullable=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO upload_daily_summary (day, target, status, count, updated_at) "
+        "SELECT DATE(timestamp), target, status, COUNT(*), CURRENT_TIMESTAMP "
+        "FROM upload_status GROUP BY DATE(timestamp), target, status"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("upload_daily_summary")
+    op.drop_index("ix_upload_status_timestamp", table_name="upload_status")
+    op.drop_index("ix_upload_status_status", table_name="upload_status")
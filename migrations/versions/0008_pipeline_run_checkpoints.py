@@ -0,0 +1,58 @@
+"""Pipeline run checkpoints
+
+Creates the pipeline_run table, recording each run's Salesforce query and how far it got,
+and the pipeline_run_chunk table, recording per chunk and upload target whether its
+upload results were stored.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pipeline_run",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("modified_since", sa.DateTime(), nullable=True),
+        sa.Column("last_salesforce_id", sa.String(), nullable=True),
+        sa.Column("watermark", sa.DateTime(), nullable=True),
+        sa.Column("chunks_committed", sa.Integer(), nullable=False),
+        sa.Column("records_committed", sa.Integer(), nullable=False),
+        sa.Column("resumed_count", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_pipeline_run_id", "pipeline_run", ["id"])
+    op.create_index("ix_pipeline_run_name", "pipeline_run", ["name"])
+
+    op.create_table(
+        "pipeline_run_chunk",
+        sa.Column("run_id", sa.Integer(), sa.ForeignKey("pipeline_run.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("chunk_index", sa.Integer(), primary_key=True),
+        sa.Column("target", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("uploaded_count", sa.Integer(), nullable=False),
+        sa.Column("failed_count", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("pipeline_run_chunk")
+    op.drop_table("pipeline_run")
@@ -0,0 +1,30 @@
+"""Hashed user identifiers on upload_failure
+
+Adds the hashed_email and hashed_phone columns, so that failed enhanced conversions can be
+retried from the failure queue.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("upload_failure", sa.Column("hashed_email", sa.String(), nullable=True))
+    op.add_column("upload_failure", sa.Column("hashed_phone", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("upload_failure") as batch:
+        batch.drop_column("hashed_phone")
+        batch.drop_column("hashed_email")
@@ -0,0 +1,31 @@
+"""Pipeline run ID on upload_status
+
+Adds the run_id column, set to the pipeline_run that stored the row, and an index on
+(run_id, id) so that the rows of one run can be read page by page. Existing rows keep a
+null run_id.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("upload_status", sa.Column("run_id", sa.Integer(), nullable=True))
+    op.create_index("ix_upload_status_run_id_id", "upload_status", ["run_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_upload_status_run_id_id", table_name="upload_status")
+    with op.batch_alter_table("upload_status") as batch:
+        batch.drop_column("run_id")
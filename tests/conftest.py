@@ -0,0 +1,33 @@
+"""
+Shared fixtures. The database adaptor reads DB_URL when it is first imported, so the tests
+point it at a throwaway SQLite file before any app module is imported.
+"""
+import os
+import tempfile
+from typing import Iterator
+
+import pytest
+
+_database_dir = tempfile.mkdtemp(prefix="pipeline-tests-")
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(_database_dir, 'test.db')}"
+
+
+@pytest.fixture
+def database() -> Iterator[None]:
+    """
+    Creates every table on the test database, and drops them after the test.
+    """
+    from app.core.database.sql_adaptor import Base, engine
+    import app.models.upload_status  # noqa: F401
+    import app.models.upload_failure  # noqa: F401
+    import app.models.sync_watermark  # noqa: F401
+    import app.models.pipeline_lease  # noqa: F401
+    import app.models.upload_daily_summary  # noqa: F401
+    import app.models.pipeline_run  # noqa: F401
+    import app.models.pipeline_run_chunk  # noqa: F401
+
+    Base.metadata.create_all(engine)
+    try:
+        yield
+    finally:
+        Base.metadata.drop_all(engine)
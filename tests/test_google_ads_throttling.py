@@ -0,0 +1,145 @@
+import datetime
+import email.utils
+import json
+import time
+from typing import Optional
+
+import pytest
+
+from app.core.rate_limiter.rate_limiter import AdaptiveRateLimiter
+from app.models.opportunity_record import OpportunityRecord
+from app.pipeline import google_ads_upload
+from app.pipeline.google_ads_upload import (
+    RequestThrottled,
+    UploadThrottled,
+    _is_throttled,
+    _retry_after,
+    call_with_throttling,
+)
+from app.pipeline.upload_targets import UploadTarget
+
+
+class _Response:
+    def __init__(self, status_code: int, body: Optional[dict] = None, headers: Optional[dict] = None) -> None:
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = json.dumps(body or {})
+        self._body = body
+
+    def json(self) -> dict:
+        if self._body is None:
+            raise ValueError("No JSON body.")
+        return self._body
+
+
+def _limiter() -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(name="test", rate=100.0, min_rate=1.0, max_rate=100.0, increase=1.0, decrease_factor=0.5)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setenv("GADS_RETRY_BACKOFF_SECONDS", "0.01")
+    monkeypatch.setenv("GADS_UPLOAD_MAX_RETRIES", "3")
+    monkeypatch.setenv("GADS_RETRY_MAX_DELAY_SECONDS", "1")
+
+
+def test_retry_after_header_in_seconds():
+    assert _retry_after(_Response(429, headers={"Retry-After": "7"})) == 7.0
+
+
+def test_retry_after_header_as_http_date():
+    when = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=30)
+    delay = _retry_after(_Response(429, headers={"Retry-After": email.utils.format_datetime(when, usegmt=True)}))
+
+    assert delay == pytest.approx(30, abs=2)
+
+
+def test_retry_delay_of_retry_info_details():
+    body = {"error": {"details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "12s"}]}}
+
+    assert _retry_after(_Response(429, body)) == 12.0
+
+
+def test_retry_delay_of_quota_error_details():
+    body = {"error": {"details": [{"errors": [{"details": {"quotaErrorDetails": {"retryDelay": "45s"}}}]}]}}
+
+    assert _retry_after(_Response(429, body)) == 45.0
+
+
+def test_no_retry_delay():
+    assert _retry_after(_Response(429, {"error": {"message": "Too many requests."}})) is None
+    assert _retry_after(_Response(429)) is None
+
+
+def test_resource_exhausted_counts_as_throttled():
+    assert _is_throttled(_Response(429))
+    assert _is_throttled(_Response(400, {"error": {"status": "RESOURCE_EXHAUSTED"}}))
+    assert not _is_throttled(_Response(400, {"error": {"status": "INVALID_ARGUMENT"}}))
+    assert not _is_throttled(_Response(200, {"results": []}))
+
+
+def test_throttled_requests_are_retried_after_the_requested_delay():
+    responses = [RequestThrottled("429", retry_after=0.2), RequestThrottled("429"), {"results": []}]
+    sent_at = []
+
+    def send():
+        sent_at.append(time.monotonic())
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    limiter = _limiter()
+    assert call_with_throttling(send, limiter) == {"results": []}
+    # The Retry-After delay is honoured, then the backoff applies to the second retry.
+    assert sent_at[1] - sent_at[0] >= 0.19
+    assert sent_at[2] - sent_at[1] >= 0.019
+    assert limiter.stats()["throttled"] == 2
+    assert limiter.rate == pytest.approx(100.0 * 0.5 * 0.5 + 1.0)
+
+
+def test_retries_stop_after_the_maximum():
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise RequestThrottled("429")
+
+    with pytest.raises(UploadThrottled, match="after 4 attempt"):
+        call_with_throttling(send, _limiter())
+    assert len(calls) == 4
+
+
+def test_delays_above_the_maximum_are_not_waited_for():
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise RequestThrottled("Daily quota exhausted.", retry_after=3600)
+
+    start = time.monotonic()
+    with pytest.raises(UploadThrottled, match="asked to wait 3600s"):
+        call_with_throttling(send, _limiter())
+    assert len(calls) == 1
+    assert time.monotonic() - start < 0.5
+
+
+def test_throttled_chunks_are_returned_as_retryable_failures(monkeypatch):
+    def throttled_chunk(url, headers, conversions, records, offset, limiter):
+        raise UploadThrottled("Still throttled.")
+
+    monkeypatch.setenv("GADS_DEVELOPER_TOKEN", "token")
+    monkeypatch.setattr(google_ads_upload, "get_access_token", lambda: "access-token")
+    monkeypatch.setattr(google_ads_upload, "_upload_chunk", throttled_chunk)
+    record = OpportunityRecord(
+        salesforce_id="006A",
+        gclid="gclid-006A",
+        original_lead_created_datetime=datetime.datetime(2026, 1, 5, tzinfo=datetime.timezone.utc),
+        admission_date=datetime.datetime(2026, 2, 1, tzinfo=datetime.timezone.utc),
+    )
+    target = UploadTarget(name="throttled", customer_id="1234567890", conversion_action_id=1)
+
+    results = google_ads_upload.upload_conversions([record], target)
+
+    assert [result["record"] for result in results] == [record]
+    assert results[0]["error"]["errorCode"] == {"quotaError": "RESOURCE_EXHAUSTED"}
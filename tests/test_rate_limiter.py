@@ -0,0 +1,82 @@
+import time
+from typing import Any, Dict
+
+import pytest
+
+from app.core.rate_limiter.rate_limiter import AdaptiveRateLimiter
+
+
+def _limiter(**overrides: Any) -> AdaptiveRateLimiter:
+    options: Dict[str, Any] = dict(name="test", rate=4.0, min_rate=0.5, max_rate=6.0, increase=1.0, decrease_factor=0.5)
+    options.update(overrides)
+    return AdaptiveRateLimiter(**options)
+
+
+def test_initial_rate_is_clamped_to_the_bounds():
+    assert _limiter(rate=100).rate == 6.0
+    assert _limiter(rate=0.01).rate == 0.5
+    assert _limiter(min_rate=2.0, max_rate=1.0).max_rate == 2.0
+
+
+def test_successes_increase_the_rate_additively_up_to_the_maximum():
+    limiter = _limiter()
+
+    rates = []
+    for _ in range(4):
+        limiter.record_success()
+        rates.append(limiter.rate)
+
+    assert rates == [5.0, 6.0, 6.0, 6.0]
+
+
+def test_throttles_decrease_the_rate_multiplicatively_down_to_the_minimum():
+    limiter = _limiter()
+
+    rates = []
+    for _ in range(4):
+        limiter.record_throttle(limiter.acquire() if limiter.rate > 1 else time.monotonic())
+        rates.append(limiter.rate)
+
+    assert rates == [2.0, 1.0, 0.5, 0.5]
+    assert limiter.stats()["decreases"] == 4
+
+
+def test_concurrent_throttles_cut_the_rate_once():
+    limiter = _limiter()
+    # Three requests in flight when the first throttling response arrives.
+    sent = [time.monotonic() for _ in range(3)]
+
+    for sent_at in sent:
+        limiter.record_throttle(sent_at)
+
+    assert limiter.rate == 2.0
+    assert limiter.stats() == {"requests": 0, "throttled": 3, "decreases": 1}
+
+    # A request sent after the cut that is throttled again cuts the rate again.
+    limiter.record_throttle(time.monotonic())
+    assert limiter.rate == 1.0
+
+
+def test_acquire_paces_requests_at_the_rate():
+    limiter = _limiter(rate=20.0, max_rate=20.0)
+    limiter.acquire()
+
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.acquire()
+    elapsed = time.monotonic() - start
+
+    assert elapsed == pytest.approx(0.2, abs=0.08)
+    assert limiter.stats()["requests"] == 5
+
+
+def test_retry_after_pauses_the_bucket():
+    limiter = _limiter(rate=50.0, max_rate=50.0)
+    sent_at = limiter.acquire()
+
+    limiter.record_throttle(sent_at, retry_after=0.3)
+    start = time.monotonic()
+    limiter.acquire()
+
+    assert time.monotonic() - start >= 0.29
+    assert limiter.rate == 25.0
@@ -0,0 +1,204 @@
+import datetime
+from typing import List, Optional
+
+import pytest
+
+from app.core.database.sql_adaptor import SessionLocal
+from app.models.opportunity_record import OpportunityRecord
+from app.models.pipeline_run import PipelineRun
+from app.models.pipeline_run_chunk import PipelineRunChunk
+from app.models.upload_status import UploadStatus
+from app.pipeline import pipeline_runner
+from app.pipeline.run_checkpoint import RUN_ABANDONED, RUN_FAILED, RUN_SUCCEEDED, start_run
+from app.pipeline.run_coordinator import LeaseLost
+
+MODSTAMP = datetime.datetime(2026, 3, 1, tzinfo=datetime.timezone.utc)
+
+
+def _record(index: int) -> OpportunityRecord:
+    return OpportunityRecord(
+        salesforce_id=f"006{index:03d}",
+        gclid=f"gclid-{index}",
+        original_lead_created_datetime=datetime.datetime(2026, 1, 5, tzinfo=datetime.timezone.utc),
+        admission_date=datetime.datetime(2026, 2, 1, tzinfo=datetime.timezone.utc),
+        system_modstamp=MODSTAMP + datetime.timedelta(minutes=index),
+    )
+
+
+def _store_data(record: OpportunityRecord) -> dict:
+    return {
+        "salesforce_id": record.salesforce_id,
+        "target": "default",
+        "gclid": record.gclid,
+        "original_lead_created_datetime": record.original_lead_created_datetime,
+        "admission_date": record.admission_date,
+        "status": "successful",
+        "error_details": None,
+    }
+
+
+def _run_status(run_id: int) -> str:
+    with SessionLocal() as session:
+        run = session.get(PipelineRun, run_id)
+        assert run is not None
+        return run.status
+
+
+def _stored_ids() -> list:
+    with SessionLocal() as session:
+        return [row.salesforce_id for row in session.query(UploadStatus).order_by(UploadStatus.salesforce_id)]
+
+
+def test_failed_run_is_resumed_after_its_last_committed_chunk(database):
+    checkpoint = start_run("pipeline", modified_since=None)
+    checkpoint.commit_chunk(0, [_record(0), _record(1)])
+    checkpoint.finish(RuntimeError("Salesforce timed out."))
+    assert _run_status(checkpoint.id) == RUN_FAILED
+
+    resumed = start_run("pipeline", modified_since=datetime.datetime(2026, 3, 2))
+
+    assert resumed.resumed
+    assert resumed.id == checkpoint.id
+    # The resumed run keeps its own query window and cursor.
+    assert resumed.modified_since is None
+    assert resumed.last_salesforce_id == "006001"
+    assert resumed.next_chunk_index == 1
+    assert resumed.records_committed == 2
+    assert resumed.watermark == datetime.datetime(2026, 3, 1, 0, 1)
+
+
+def test_stale_unfinished_runs_are_abandoned(database, monkeypatch):
+    monkeypatch.setenv("PIPELINE_RESUME_MAX_AGE_HOURS", "1")
+    stale = start_run("pipeline", modified_since=None)
+    with SessionLocal() as session:
+        session.get(PipelineRun, stale.id).started_at = datetime.datetime.utcnow() - datetime.timedelta(hours=2)
+        session.commit()
+
+    fresh = start_run("pipeline", modified_since=None)
+
+    assert not fresh.resumed
+    assert fresh.id != stale.id
+    assert _run_status(stale.id) == RUN_ABANDONED
+
+
+def test_runs_of_other_partitions_are_not_resumed(database):
+    checkpoint = start_run("pipeline:partition-0-of-2", modified_since=None)
+
+    other = start_run("pipeline:partition-1-of-2", modified_since=None)
+
+    assert not other.resumed
+    assert _run_status(checkpoint.id) == "running"
+
+
+def test_uploads_of_an_abandoned_run_are_replayed_by_the_next_run(database, monkeypatch):
+    monkeypatch.setenv("PIPELINE_RESUME_MAX_AGE_HOURS", "0")
+    abandoned = start_run("pipeline", modified_since=None)
+    stored, unstored = _record(0), _record(1)
+    abandoned.record_uploaded(0, "default", [_store_data(stored)], [])
+    abandoned.record_stored(0, "default")
+    abandoned.record_uploaded(1, "default", [_store_data(unstored)], [])
+
+    checkpoint = start_run("pipeline", modified_since=None)
+    assert _run_status(abandoned.id) == RUN_ABANDONED
+
+    pending = checkpoint.pending_uploads()
+    assert [(run_id, chunk_index, target) for run_id, chunk_index, target, _, _ in pending] == [(abandoned.id, 1, "default")]
+
+    pipeline_runner._replay_uploads(checkpoint)
+    assert _stored_ids() == ["006001"]
+    assert checkpoint.pending_uploads() == []
+
+    # A successful run drops its own chunks and those of the abandoned runs it replayed.
+    checkpoint.finish()
+    with SessionLocal() as session:
+        assert session.query(PipelineRunChunk).count() == 0
+    assert _run_status(checkpoint.id) == RUN_SUCCEEDED
+
+
+class _FakeSalesforce:
+    """
+    Serves records in Id order after the given cursor, as the checkpointed query does.
+    """
+
+    def __init__(self, records) -> None:
+        self.records = records
+        self.after_ids: List[Optional[str]] = []
+
+    def __call__(self, modified_since, targets, after_id=None, order_by_id=False):
+        self.after_ids.append(after_id)
+        return [record for record in self.records if after_id is None or record.salesforce_id > after_id]
+
+
+class _FakeUpload:
+    """
+    Accepts every conversion, failing the whole request once the given Salesforce Id comes up.
+    """
+
+    def __init__(self, fail_on=None) -> None:
+        self.fail_on = fail_on
+        self.uploaded: List[str] = []
+
+    def __call__(self, records, target):
+        if any(record.salesforce_id == self.fail_on for record in records):
+            raise ConnectionError("Google Ads unavailable.")
+        self.uploaded.extend(record.salesforce_id for record in records)
+        return [{"gclid": record.gclid, "record": record} for record in records]
+
+
+@pytest.fixture
+def pipeline(database, monkeypatch):
+    monkeypatch.setenv("PIPELINE_CHECKPOINT_SIZE", "2")
+    monkeypatch.setenv("PIPELINE_RETRY_FAILURES", "false")
+    salesforce = _FakeSalesforce([_record(index) for index in range(6)])
+    monkeypatch.setattr(pipeline_runner, "query_salesforce", salesforce)
+    return salesforce
+
+
+@pytest.mark.parametrize("async_db", ["false", "true"])
+def test_interrupted_pipeline_run_resumes_without_uploading_again(pipeline, monkeypatch, async_db):
+    monkeypatch.setenv("PIPELINE_ASYNC_DB", async_db)
+    failing_upload = _FakeUpload(fail_on="006004")
+    monkeypatch.setattr(pipeline_runner, "upload_conversions", failing_upload)
+    with pytest.raises(ConnectionError):
+        pipeline_runner.run_pipeline()
+    assert failing_upload.uploaded == ["006000", "006001", "006002", "006003"]
+
+    upload = _FakeUpload()
+    monkeypatch.setattr(pipeline_runner, "upload_conversions", upload)
+    summary = pipeline_runner.run_pipeline()
+
+    # The second run continues after the last committed chunk of the first.
+    assert pipeline.after_ids == [None, "006003"]
+    assert upload.uploaded == ["006004", "006005"]
+    assert summary["stored"] == 2
+    assert _stored_ids() == [f"006{index:03d}" for index in range(6)]
+    assert _run_status(summary["run_id"]) == RUN_SUCCEEDED
+
+
+def test_run_that_loses_its_lease_is_abandoned(pipeline, monkeypatch):
+    checks = []
+
+    def check_lease():
+        checks.append(1)
+        if len(checks) > 2:
+            raise LeaseLost("Lease lost.")
+
+    monkeypatch.setattr(pipeline_runner, "check_lease", check_lease)
+    upload = _FakeUpload()
+    monkeypatch.setattr(pipeline_runner, "upload_conversions", upload)
+
+    with pytest.raises(LeaseLost):
+        pipeline_runner.run_pipeline()
+
+    # The run stopped before the second chunk and will not be resumed.
+    assert upload.uploaded == ["006000", "006001"]
+    with SessionLocal() as session:
+        run = session.query(PipelineRun).one()
+    assert run.status == RUN_ABANDONED
+    assert run.chunks_committed == 1
+
+    monkeypatch.setattr(pipeline_runner, "check_lease", lambda: None)
+    summary = pipeline_runner.run_pipeline()
+    assert summary["run_id"] != run.id
+    assert pipeline.after_ids == [None, None]
+    assert _stored_ids() == [f"006{index:03d}" for index in range(6)]
@@ -0,0 +1,180 @@
+import datetime
+import threading
+import time
+
+import pytest
+
+from app.core.database.sql_adaptor import SessionLocal
+from app.models.pipeline_lease import PipelineLease
+from app.models.pipeline_run import PipelineRun
+from app.pipeline.run_checkpoint import RUN_ABANDONED, RUN_RUNNING, start_run
+from app.pipeline.run_coordinator import (
+    LeaseLost,
+    LeaseUnavailable,
+    Partition,
+    RunLease,
+    check_lease,
+    lease_name,
+    resolve_partition,
+    start_or_join,
+)
+
+
+@pytest.fixture
+def short_lease(monkeypatch):
+    monkeypatch.setenv("PIPELINE_LEASE_TTL_SECONDS", "1")
+    monkeypatch.setenv("PIPELINE_LEASE_HEARTBEAT_SECONDS", "0.1")
+
+
+def _expire(name: str) -> None:
+    with SessionLocal() as session:
+        session.query(PipelineLease).filter(PipelineLease.name == name).update(
+            {"expires_at": datetime.datetime.utcnow() - datetime.timedelta(seconds=1)}
+        )
+        session.commit()
+
+
+def test_held_lease_is_unavailable_to_other_owners(database):
+    lease = RunLease("pipeline")
+    lease.acquire()
+    try:
+        with pytest.raises(LeaseUnavailable, match=lease.owner):
+            RunLease("pipeline").acquire()
+        # Other leases are independent.
+        other = RunLease("pipeline:partition-0-of-2")
+        other.acquire()
+        other.release()
+    finally:
+        lease.release()
+
+    # A released lease is free again.
+    again = RunLease("pipeline")
+    again.acquire()
+    again.release()
+
+
+def test_lapsed_lease_is_taken_over(database):
+    stale = RunLease("pipeline")
+    stale.acquire()
+    stale._stop.set()
+    _expire("pipeline")
+
+    successor = RunLease("pipeline")
+    successor.acquire()
+    try:
+        assert not stale.renew()
+        with SessionLocal() as session:
+            assert session.get(PipelineLease, "pipeline").owner == successor.owner
+    finally:
+        successor.release()
+        stale.release()
+
+
+def test_heartbeat_keeps_the_lease_past_its_ttl(database, short_lease):
+    lease = RunLease("pipeline")
+    lease.acquire()
+    try:
+        time.sleep(1.5)
+        assert lease.held
+        with pytest.raises(LeaseUnavailable):
+            RunLease("pipeline").acquire()
+    finally:
+        lease.release()
+
+
+def test_heartbeat_detects_a_lease_taken_over(database, short_lease):
+    lease = RunLease("pipeline")
+    lease.acquire()
+    try:
+        with SessionLocal() as session:
+            session.query(PipelineLease).update({"owner": "another-instance"})
+            session.commit()
+        deadline = time.time() + 5
+        while not lease.lost and time.time() < deadline:
+            time.sleep(0.05)
+        assert lease.lost
+        assert not lease.held
+    finally:
+        lease.release()
+
+
+def test_lease_that_lapsed_without_renewal_is_not_held(database):
+    lease = RunLease("pipeline")
+    lease.acquire()
+    try:
+        assert lease.held
+        lease.expires_at = datetime.datetime.utcnow() - datetime.timedelta(seconds=1)
+        assert not lease.held
+    finally:
+        lease.release()
+
+
+def test_check_lease_outside_a_job_does_nothing():
+    check_lease()
+
+
+def test_job_stops_once_its_lease_is_lost(database, short_lease):
+    taken_over = threading.Event()
+
+    def run():
+        check_lease()
+        taken_over.wait(5)
+        check_lease()
+        return "finished"
+
+    job, joined = start_or_join(None, run)
+    assert not joined
+    # A second trigger in this instance joins the running job.
+    assert start_or_join(None, run) == (job, True)
+
+    with SessionLocal() as session:
+        session.query(PipelineLease).update({"owner": "another-instance"})
+        session.commit()
+    # Let the heartbeat find the lease taken over.
+    time.sleep(0.5)
+    taken_over.set()
+
+    with pytest.raises(LeaseLost):
+        job.future.result(5)
+    assert job.status == "failed"
+    # The lease of the other instance is left in place.
+    with SessionLocal() as session:
+        assert session.get(PipelineLease, "pipeline").owner == "another-instance"
+
+
+def test_job_releases_its_lease(database):
+    job, _ = start_or_join(None, lambda: "done")
+    assert job.future.result(5) == "done"
+    with SessionLocal() as session:
+        assert session.get(PipelineLease, "pipeline") is None
+
+
+def test_abandon_leaves_a_run_resumed_by_another_instance_alone(database):
+    checkpoint = start_run("pipeline", None)
+    # Another instance takes over the lapsed lease and resumes the same run.
+    resumed = start_run("pipeline", None)
+    assert resumed.id == checkpoint.id
+
+    checkpoint.abandon(LeaseLost("lost"))
+    with SessionLocal() as session:
+        assert session.get(PipelineRun, checkpoint.id).status == RUN_RUNNING
+
+    resumed.abandon(LeaseLost("lost"))
+    with SessionLocal() as session:
+        assert session.get(PipelineRun, checkpoint.id).status == RUN_ABANDONED
+
+
+def test_partitions_must_match_the_configured_count(monkeypatch):
+    assert resolve_partition(None, None) is None
+    assert resolve_partition(0, 1) is None
+    with pytest.raises(ValueError):
+        resolve_partition(0, 2)
+
+    monkeypatch.setenv("PIPELINE_PARTITIONS", "2")
+    assert resolve_partition(1, 2) == Partition(1, 2)
+    for index, count in ((None, None), (0, None), (0, 3), (2, 2)):
+        with pytest.raises(ValueError):
+            resolve_partition(index, count)
+    with pytest.raises(ValueError):
+        start_or_join(None, lambda: None)
+    assert lease_name(Partition(1, 2)) == "pipeline:partition-1-of-2"
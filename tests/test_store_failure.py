@@ -0,0 +1,193 @@
+import datetime
+
+import pytest
+
+from app.core.database.sql_adaptor import SessionLocal
+from app.models.upload_failure import UploadFailure
+from app.pipeline import pipeline_runner
+from app.pipeline.store_failure import (
+    _next_retry_at,
+    classify_upload_error,
+    clear_failures,
+    load_due_failures,
+    store_failed_records,
+)
+from app.pipeline.store_success import store_success_records
+from app.pipeline.upload_targets import DEFAULT_TARGET_NAME, default_upload_target
+
+LEAD_CREATED = datetime.datetime(2026, 1, 5, 12, 0)
+ADMISSION = datetime.datetime(2026, 2, 1)
+
+TRANSIENT_ERROR = {"errorCode": {"databaseError": "CONCURRENT_MODIFICATION"}, "message": "Try again."}
+PERMANENT_ERROR = {"errorCode": {"conversionUploadError": "EXPIRED_CLICK"}, "message": "Click too old."}
+
+
+def _failure_data(salesforce_id: str, error: dict) -> dict:
+    return {
+        "salesforce_id": salesforce_id,
+        "target": DEFAULT_TARGET_NAME,
+        "gclid": f"gclid-{salesforce_id}",
+        "original_lead_created_datetime": LEAD_CREATED,
+        "admission_date": ADMISSION,
+        "error": error,
+    }
+
+
+def _make_due(salesforce_id: str) -> None:
+    with SessionLocal() as session:
+        session.query(UploadFailure).filter(UploadFailure.salesforce_id == salesforce_id).update(
+            {"next_retry_at": datetime.datetime.utcnow() - datetime.timedelta(seconds=1)}
+        )
+        session.commit()
+
+
+def _queued_ids() -> list:
+    with SessionLocal() as session:
+        return [failure.salesforce_id for failure in session.query(UploadFailure).order_by(UploadFailure.salesforce_id)]
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (PERMANENT_ERROR, ("EXPIRED_CLICK", True)),
+        ({"errorCode": {"conversionUploadError": "UNPARSEABLE_GCLID"}}, ("UNPARSEABLE_GCLID", True)),
+        (TRANSIENT_ERROR, ("CONCURRENT_MODIFICATION", False)),
+        ({"errorCode": {"quotaError": "RESOURCE_EXHAUSTED"}}, ("RESOURCE_EXHAUSTED", False)),
+        ({"message": "Connection reset by peer"}, (None, False)),
+    ],
+)
+def test_classify_upload_error(error, expected):
+    assert classify_upload_error(error) == expected
+
+
+def test_backoff_doubles_per_attempt_up_to_the_maximum(monkeypatch):
+    monkeypatch.setenv("UPLOAD_RETRY_BASE_SECONDS", "900")
+    monkeypatch.setenv("UPLOAD_RETRY_MAX_SECONDS", "5000")
+    now = datetime.datetime(2026, 3, 1)
+
+    delays = [(_next_retry_at(attempts, now) - now).total_seconds() for attempts in range(1, 6)]
+
+    assert delays == [900, 1800, 3600, 5000, 5000]
+
+
+def test_transient_failures_are_rescheduled_with_backoff(database, monkeypatch):
+    monkeypatch.setenv("UPLOAD_RETRY_BASE_SECONDS", "60")
+
+    first = store_failed_records([_failure_data("006A", TRANSIENT_ERROR)])[0]
+    second = store_failed_records([_failure_data("006A", TRANSIENT_ERROR)])[0]
+
+    assert (first.attempts, first.permanent) == (1, False)
+    assert (second.attempts, second.permanent) == (2, False)
+    assert second.next_retry_at - second.last_failed_at == datetime.timedelta(seconds=120)
+    assert second.first_failed_at == first.first_failed_at
+    assert second.error_code == "CONCURRENT_MODIFICATION"
+    assert _queued_ids() == ["006A"]
+
+
+def test_permanent_errors_are_never_retried(database):
+    failure = store_failed_records([_failure_data("006A", PERMANENT_ERROR)])[0]
+
+    assert failure.permanent
+    assert failure.next_retry_at is None
+    assert load_due_failures(limit=10) == {}
+
+
+def test_failures_become_permanent_after_the_maximum_attempts(database, monkeypatch):
+    monkeypatch.setenv("UPLOAD_RETRY_MAX_ATTEMPTS", "3")
+
+    failures = [store_failed_records([_failure_data("006A", TRANSIENT_ERROR)])[0] for _ in range(3)]
+
+    assert [failure.permanent for failure in failures] == [False, False, True]
+    assert failures[-1].next_retry_at is None
+
+
+def test_failures_are_looked_up_and_cleared_in_batches_per_target(database, monkeypatch):
+    monkeypatch.setenv("FILTER_BATCH_SIZE", "2")
+    salesforce_ids = [f"006{index}" for index in range(5)]
+    store_failed_records([_failure_data(salesforce_id, TRANSIENT_ERROR) for salesforce_id in salesforce_ids])
+    store_failed_records([dict(_failure_data("0060", TRANSIENT_ERROR), target="other")])
+
+    failures = store_failed_records([_failure_data(salesforce_id, TRANSIENT_ERROR) for salesforce_id in salesforce_ids])
+    assert [failure.attempts for failure in failures] == [2] * 5
+
+    clear_failures(salesforce_ids)
+    with SessionLocal() as session:
+        assert [(failure.salesforce_id, failure.target) for failure in session.query(UploadFailure)] == [("0060", "other")]
+
+
+def test_only_due_failures_are_loaded(database):
+    store_failed_records([_failure_data("006A", TRANSIENT_ERROR), _failure_data("006B", TRANSIENT_ERROR)])
+    _make_due("006B")
+
+    due = load_due_failures(limit=10)
+
+    assert [record.salesforce_id for record in due[DEFAULT_TARGET_NAME]] == ["006B"]
+    assert due[DEFAULT_TARGET_NAME][0].gclid == "gclid-006B"
+    assert due[DEFAULT_TARGET_NAME][0].original_lead_created_datetime.tzinfo == datetime.timezone.utc
+
+
+def _accept_all(records, target):
+    return [{"gclid": record.gclid, "record": record} for record in records]
+
+
+def test_successful_retries_are_cleared_from_the_queue(database, monkeypatch):
+    monkeypatch.setattr(pipeline_runner, "upload_conversions", _accept_all)
+    store_failed_records([_failure_data("006A", TRANSIENT_ERROR), _failure_data("006B", TRANSIENT_ERROR)])
+    _make_due("006A")
+    _make_due("006B")
+
+    uploaded_ids = pipeline_runner.retry_failed_uploads([default_upload_target()])
+
+    assert sorted(uploaded_ids) == ["006A", "006B"]
+    assert _queued_ids() == []
+
+
+def test_retry_clears_failures_whose_upload_status_row_already_exists(database, monkeypatch):
+    monkeypatch.setattr(pipeline_runner, "upload_conversions", _accept_all)
+    # A run stored the conversion but was interrupted before clearing its failure.
+    store_success_records([{
+        "salesforce_id": "006A",
+        "target": DEFAULT_TARGET_NAME,
+        "gclid": "gclid-006A",
+        "original_lead_created_datetime": LEAD_CREATED,
+        "admission_date": ADMISSION,
+        "status": "successful",
+        "error_details": None,
+    }])
+    store_failed_records([_failure_data("006A", TRANSIENT_ERROR)])
+    _make_due("006A")
+
+    uploaded_ids = pipeline_runner.retry_failed_uploads([default_upload_target()])
+
+    assert uploaded_ids == ["006A"]
+    assert _queued_ids() == []
+
+
+def test_failed_retries_stay_queued_with_a_longer_backoff(database, monkeypatch):
+    def reject_all(records, target):
+        return [{"gclid": record.gclid, "record": record, "error": TRANSIENT_ERROR} for record in records]
+
+    monkeypatch.setattr(pipeline_runner, "upload_conversions", reject_all)
+    monkeypatch.setenv("UPLOAD_RETRY_BASE_SECONDS", "60")
+    store_failed_records([_failure_data("006A", TRANSIENT_ERROR)])
+    _make_due("006A")
+
+    assert pipeline_runner.retry_failed_uploads([default_upload_target()]) == []
+
+    with SessionLocal() as session:
+        failure = session.query(UploadFailure).one()
+    assert failure.attempts == 2
+    assert failure.next_retry_at - failure.last_failed_at == datetime.timedelta(seconds=120)
+
+
+def test_records_outside_the_partition_are_not_retried(database, monkeypatch):
+    monkeypatch.setattr(pipeline_runner, "upload_conversions", _accept_all)
+    store_failed_records([_failure_data(f"006{index}", TRANSIENT_ERROR) for index in range(6)])
+    for index in range(6):
+        _make_due(f"006{index}")
+    partition = pipeline_runner.Partition(0, 2)
+
+    uploaded_ids = pipeline_runner.retry_failed_uploads([default_upload_target()], partition)
+
+    assert uploaded_ids and all(partition.contains(salesforce_id) for salesforce_id in uploaded_ids)
+    assert sorted(uploaded_ids + _queued_ids()) == [f"006{index}" for index in range(6)]
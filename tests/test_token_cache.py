@@ -0,0 +1,95 @@
+import threading
+import time
+
+from app.core.token_cache.token_cache import TokenCache
+
+
+class _Fetcher:
+    """
+    A token fetch function that counts its calls and can be held until released.
+    """
+
+    def __init__(self, lifetime: float = 3600.0) -> None:
+        self.lifetime = lifetime
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            token = f"token-{self.calls}"
+        self.release.wait(5)
+        return token, time.time() + self.lifetime
+
+
+def test_concurrent_misses_fetch_once():
+    cache = TokenCache(expiry_margin=60, refresh_window=300)
+    fetch = _Fetcher()
+    fetch.release.clear()
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(cache.get("google", fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    fetch.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert fetch.calls == 1
+    assert tokens == ["token-1"] * 8
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 7
+
+
+def test_keys_are_fetched_independently():
+    cache = TokenCache()
+    fetch = _Fetcher()
+
+    assert cache.get("google", fetch) == "token-1"
+    assert cache.get("salesforce", fetch) == "token-2"
+    assert cache.get("google", fetch) == "token-1"
+    assert fetch.calls == 2
+
+
+def test_token_within_the_expiry_margin_is_fetched_again():
+    cache = TokenCache(expiry_margin=60, refresh_window=60)
+    fetch = _Fetcher(lifetime=30)
+
+    assert cache.get("google", fetch) == "token-1"
+    assert cache.get("google", fetch) == "token-2"
+    assert fetch.calls == 2
+
+
+def test_refresh_window_serves_the_cached_token_and_refreshes_once():
+    cache = TokenCache(expiry_margin=60, refresh_window=300)
+    fetch = _Fetcher(lifetime=120)
+    assert cache.get("google", fetch) == "token-1"
+
+    # The token is inside the refresh window: callers keep getting it while one refresh runs.
+    fetch.release.clear()
+    tokens = [cache.get("google", fetch) for _ in range(5)]
+    assert tokens == ["token-1"] * 5
+    fetch.release.set()
+
+    deadline = time.time() + 5
+    while cache.stats()["background_refreshes"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert fetch.calls == 2
+    assert cache.stats()["background_refreshes"] == 1
+
+
+def test_failed_background_refresh_keeps_the_cached_token():
+    cache = TokenCache(expiry_margin=60, refresh_window=300)
+    cache.get("google", lambda: ("token-1", time.time() + 120))
+
+    def failing_fetch():
+        raise RuntimeError("identity provider unavailable")
+
+    assert cache.get("google", failing_fetch) == "token-1"
+    deadline = time.time() + 5
+    while cache.stats()["refresh_errors"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.stats()["refresh_errors"] == 1
+    assert cache.get("google", failing_fetch) == "token-1"